@@ -1,24 +1,19 @@
 """
 FastAPI dependency injection — auth, DB session, Redis, permission guard.
 """
-import json
-import uuid as _uuid
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError
 from redis.asyncio import Redis
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_context import claims_from_scope
 from app.core.db import get_session, set_rls_context
 from app.core.permissions import Permission
 from app.core.redis import get_redis
-from app.core.security import decode_token
 from app.models.user import User
-
-_USER_CACHE_TTL = 300  # 5 minutes
+from app.services.user_cache import get_active_user
 
 bearer = HTTPBearer(auto_error=True)
 
@@ -31,20 +26,8 @@ RedisDep = Annotated[Redis, Depends(get_redis)]
 
 # ── Auth ──────────────────────────────────────────────────────────
 
-def _user_from_cache(d: dict) -> User:
-    """Reconstruct a detached User instance from cached dict (no DB needed)."""
-    u = User.__new__(User)
-    u.id = _uuid.UUID(d["id"])
-    u.email = d["email"]
-    u.system_role = d["system_role"]
-    u.is_active = d["is_active"]
-    u.must_change_password = d.get("must_change_password", False)
-    u.school_id = _uuid.UUID(d["school_id"]) if d.get("school_id") else None
-    u.staff_member_id = _uuid.UUID(d["staff_member_id"]) if d.get("staff_member_id") else None
-    return u
-
-
 async def get_current_user(
+    request: Request,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer)],
     session: SessionDep,
     redis: RedisDep,
@@ -54,45 +37,18 @@ async def get_current_user(
         detail="Invalid or expired token",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = decode_token(credentials.credentials)
-        if payload.get("type") != "access":
-            raise credentials_exception
-        user_id: str | None = payload.get("sub")
-        if not user_id:
-            raise credentials_exception
-    except (JWTError, KeyError, ValueError):
+    # Verified once per request by AuthContextMiddleware (see core.auth_context)
+    payload = claims_from_scope(request.scope)
+    if payload is None or payload.get("type") != "access":
+        raise credentials_exception
+    user_id: str | None = payload.get("sub")
+    if not user_id:
         raise credentials_exception
 
-    # ── Try Redis cache first — skip the DB round-trip on cache hit ───
-    user: User | None = None
-    cache_key = f"auth:user:{user_id}"
-    try:
-        raw = await redis.get(cache_key)
-        if raw:
-            user = _user_from_cache(json.loads(raw))
-    except Exception:
-        pass  # Redis unavailable — fall through to DB
-
+    # In-process LRU → Redis → DB (see services.user_cache)
+    user = await get_active_user(user_id, redis, session)
     if user is None:
-        user = await session.scalar(
-            select(User).where(User.id == user_id, User.is_active.is_(True))
-        )
-        if not user:
-            raise credentials_exception
-        # Populate cache for subsequent requests
-        try:
-            await redis.setex(cache_key, _USER_CACHE_TTL, json.dumps({
-                "id": str(user.id),
-                "email": user.email,
-                "system_role": user.system_role,
-                "is_active": user.is_active,
-                "must_change_password": user.must_change_password,
-                "school_id": str(user.school_id) if user.school_id else None,
-                "staff_member_id": str(user.staff_member_id) if user.staff_member_id else None,
-            }))
-        except Exception:
-            pass  # Cache write failure is non-fatal
+        raise credentials_exception
 
     # SUPERADMIN has no school scope — RLS intentionally skipped
     if user.system_role == "SUPERADMIN":
@@ -127,6 +83,7 @@ def require(permission: Permission):
     Usage:  @router.get("/scores", dependencies=[Depends(require(Permission.VIEW_SCORES))])
     """
     async def _check(
+        request: Request,
         current_user: CurrentUser,
         redis: RedisDep,
         session: SessionDep,
@@ -136,8 +93,11 @@ def require(permission: Permission):
         if current_user.system_role in ("STUDENT", "PARENT"):
             raise HTTPException(status.HTTP_403_FORBIDDEN, "Access denied")
 
+        # Bit test against the token's permission mask while it is current
         from app.services.permissions import check_permission
-        allowed = await check_permission(current_user, permission, redis, session)
+        allowed = await check_permission(
+            current_user, permission, redis, session, claims_from_scope(request.scope),
+        )
         if not allowed:
             raise HTTPException(
                 status.HTTP_403_FORBIDDEN,
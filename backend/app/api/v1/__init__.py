@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.v1 import attendance, auth, dashboard, health, profile, public, settings, staff, students, subject_registration
+from app.api.v1 import attendance, auth, dashboard, health, metrics, profile, public, settings, staff, students, subject_registration
 
 api_router = APIRouter()
 api_router.include_router(health.router)
+api_router.include_router(metrics.router)
 api_router.include_router(public.router)   # no auth — must be before auth middleware
 api_router.include_router(auth.router)
 api_router.include_router(profile.router)
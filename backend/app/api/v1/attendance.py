@@ -3,29 +3,59 @@ Attendance API — daily class register.
 
 Endpoints:
   GET  /attendance/register   — fetch register for a class on a date
-  POST /attendance/register   — submit/update the register (upsert)
-  GET  /attendance/summary    — per-student summary for a term
+  POST /attendance/register   — submit/update the register (set-based upsert)
+  POST /attendance/sync       — push offline registers and pull changes since a cursor
+  GET  /attendance/summary    — per-student summary for a term (one class or many)
+  GET  /attendance/export     — streamed students x school-days sheet (CSV/XLSX)
+  GET  /attendance/trends/*   — term trends by class, gender and week (materialized view)
+  GET  /attendance/roll-call/stream — live "X of Y classes marked" (Server-Sent Events)
   GET  /attendance/classes    — classes available to mark for the current user
 """
-from datetime import date, datetime, timezone
+import asyncio
+import json
+from datetime import UTC, date, datetime
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import selectinload
 
 from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.core.permissions import Permission
+from app.services.attendance import (
+    DailyMark, attendance_changes_since, decode_sync_cursor, record_class_submitted,
+    save_daily_records, save_synced_records, submitted_class_ids,
+)
+from app.services.attendance_analytics import (
+    mark_attendance_analytics_dirty, trend_by_class, trend_by_gender, trend_by_week,
+)
+from app.services.attendance_export import (
+    CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, csv_chunks, header_row, iter_student_rows,
+    term_school_days, xlsx_chunks,
+)
+from app.services.calendar_cache import (
+    DayInfo, TermInfo, get_calendar_day, get_current_term, get_current_year,
+)
+from app.services.dashboard_tiles import mark_dashboard_dirty
 from app.services.permissions import resolve_all_permissions
+from app.services.roll_call import hub as roll_call_hub, publish_class_submitted
 from app.models.academic import (
     AcademicTerm, AcademicYear, Class, ClassTeacher, SchoolCalendar,
 )
-from app.models.attendance import AttendanceRecord
+from app.models.attendance import AttendanceRecord, AttendanceTally
 from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
 from app.schemas.common import OrmBase
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
+_VALID_STATUSES = {"PRESENT", "ABSENT", "LATE", "EXCUSED"}
+_SYNC_MAX_REGISTERS = 100   # per POST /sync
+_SYNC_PAGE_SIZE = 2000      # changes returned per POST /sync
+_ROLL_CALL_KEEPALIVE = 15.0  # seconds between SSE comments on a quiet stream
+_ROLL_CALL_MAX_AGE = 3600.0  # seconds before the server ends a stream (EventSource reconnects)
+
 
 # ── Response models ───────────────────────────────────────────────────────────
 
@@ -70,6 +100,77 @@ class MarkResponse(OrmBase):
     date: str
     class_id: UUID
     marked: int
+    created: int              # rows inserted by this submission
+    updated: int              # rows that already existed and were overwritten
+
+
+class SyncEntry(OrmBase):
+    term_enrollment_id: UUID
+    status: str               # PRESENT | ABSENT | LATE | EXCUSED
+    note: str | None = None
+    marked_at: datetime       # when the teacher marked it on the device
+
+
+class SyncRegister(OrmBase):
+    class_id: UUID
+    date: str                 # YYYY-MM-DD
+    records: list[SyncEntry]
+
+
+class SyncRequest(OrmBase):
+    cursor: str | None = None          # from the previous sync; None = full pull
+    class_ids: list[UUID] = []         # classes to pull changes for (pushed classes are added)
+    registers: list[SyncRegister] = []
+
+
+class SyncRejection(OrmBase):
+    index: int                # position in SyncRequest.registers
+    class_id: UUID
+    date: str
+    detail: str
+
+
+class SyncRecord(OrmBase):
+    term_enrollment_id: UUID
+    class_id: UUID
+    date: str
+    status: str
+    note: str | None
+    marked_at: datetime
+    marked_by: UUID
+
+
+class SyncResponse(OrmBase):
+    created: int
+    updated: int
+    stale: int                # pushed records older than the server's copy (ignored)
+    rejected: list[SyncRejection]
+    changes: list[SyncRecord]
+    cursor: str               # send back on the next sync
+    has_more: bool            # sync again straight away to fetch the rest
+
+
+class TrendCounts(OrmBase):
+    school_days: int          # days with at least one record
+    marked: int
+    present: int
+    absent: int
+    late: int
+    excused: int
+    rate: float               # (present + late) / marked x 100
+
+
+class ClassTrend(TrendCounts):
+    class_id: UUID
+    class_name: str
+
+
+class GenderTrend(TrendCounts):
+    gender: str
+
+
+class WeekTrend(TrendCounts):
+    week_start: str           # Monday, YYYY-MM-DD
 
 
 class SummaryStudent(OrmBase):
@@ -102,12 +203,8 @@ class AttendableClass(OrmBase):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-async def _current_term(school_id: UUID, session) -> AcademicTerm:
-    term = await session.scalar(
-        select(AcademicTerm)
-        .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
-        .where(AcademicYear.school_id == school_id, AcademicTerm.is_current.is_(True))
-    )
+async def _current_term(school_id: UUID, redis, session) -> TermInfo:
+    term = await get_current_term(school_id, redis, session)
     if not term:
         raise HTTPException(
             status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -116,24 +213,45 @@ async def _current_term(school_id: UUID, session) -> AcademicTerm:
     return term
 
 
-async def _calendar_entry(
-    school_id: UUID, target_date: date, session
-) -> SchoolCalendar:
-    entry = await session.scalar(
-        select(SchoolCalendar)
-        .join(AcademicTerm, SchoolCalendar.academic_term_id == AcademicTerm.id)
+async def _resolve_term(
+    term_id: UUID | None, school_id: UUID, redis, session
+) -> AcademicTerm | TermInfo:
+    """The given term (must belong to the school), or the current one."""
+    if term_id is None:
+        return await _current_term(school_id, redis, session)
+    term = await session.scalar(
+        select(AcademicTerm)
         .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
-        .where(
-            SchoolCalendar.school_id == school_id,
-            SchoolCalendar.date == target_date,
-            AcademicYear.school_id == school_id,
-        )
-        .limit(1)
+        .where(AcademicTerm.id == term_id, AcademicYear.school_id == school_id)
     )
+    if not term:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Term not found")
+    return term
+
+
+def _trend_counts(
+    days: int, marked: int, present: int, absent: int, late: int, excused: int
+) -> dict:
+    return {
+        "school_days": days,
+        "marked": marked,
+        "present": present,
+        "absent": absent,
+        "late": late,
+        "excused": excused,
+        "rate": round((present + late) / marked * 100, 1) if marked else 0.0,
+    }
+
+
+async def _calendar_entry(
+    school_id: UUID, target_date: date, redis, session
+) -> DayInfo:
+    entry = await get_calendar_day(school_id, target_date, redis, session)
     if not entry:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND,
-            f"{target_date} has no calendar entry. Ensure a term covers this date and the calendar has been generated.",
+            f"{target_date} has no calendar entry. Ensure a term covers this date "
+            "and the calendar has been generated.",
         )
     if entry.day_type != "SCHOOL_DAY":
         raise HTTPException(
@@ -155,6 +273,91 @@ async def _get_class(class_id: UUID, school_id: UUID, session) -> Class:
     return cls
 
 
+async def _class_summaries(
+    classes: list[Class], term: AcademicTerm | TermInfo, school_id: UUID, session
+) -> list[ClassSummary]:
+    """
+    Build term summaries for one or more classes with a single query: the
+    roster is left-joined to attendance_tally on its primary key, so no
+    attendance_record rows are scanned.
+    """
+    total_days_sq = (
+        select(func.count(SchoolCalendar.id))
+        .where(
+            SchoolCalendar.school_id == school_id,
+            SchoolCalendar.academic_term_id == term.id,
+            SchoolCalendar.day_type == "SCHOOL_DAY",
+        )
+        .scalar_subquery()
+    )
+
+    rows = await session.execute(
+        select(
+            Student,
+            StudentClassEnrollment.class_id,
+            StudentClassEnrollment.register_number,
+            total_days_sq.label("total_days"),
+            func.coalesce(AttendanceTally.present, 0),
+            func.coalesce(AttendanceTally.absent, 0),
+            func.coalesce(AttendanceTally.late, 0),
+            func.coalesce(AttendanceTally.excused, 0),
+        )
+        .join(StudentClassEnrollment, StudentClassEnrollment.student_id == Student.id)
+        .join(
+            StudentTermEnrollment,
+            and_(
+                StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+                StudentTermEnrollment.academic_term_id == term.id,
+            ),
+        )
+        .join(AcademicYear, AcademicYear.id == StudentClassEnrollment.academic_year_id)
+        .outerjoin(
+            AttendanceTally,
+            AttendanceTally.student_term_enrollment_id == StudentTermEnrollment.id,
+        )
+        .where(
+            Student.school_id == school_id,
+            Student.is_active.is_(True),
+            StudentClassEnrollment.class_id.in_([c.id for c in classes]),
+            StudentClassEnrollment.status == "ACTIVE",
+            AcademicYear.is_current.is_(True),
+        )
+        .order_by(Student.last_name, Student.first_name)
+    )
+
+    # total_days rides along on every row; fall back to a count only for empty rosters
+    total_days: int | None = None
+    by_class: dict[UUID, list[SummaryStudent]] = {c.id: [] for c in classes}
+    for s, cls_id, register_number, days, present, absent, late, excused in rows:
+        total_days = days
+        pct = round((present + late) / days * 100, 1) if days > 0 else 0.0
+        by_class[cls_id].append(SummaryStudent(
+            student_id=s.id,
+            full_name=s.full_name,
+            register_number=register_number,
+            total_school_days=days,
+            present=present,
+            absent=absent,
+            late=late,
+            excused=excused,
+            percentage=pct,
+        ))
+    if total_days is None:
+        total_days = await session.scalar(select(total_days_sq)) or 0
+
+    return [
+        ClassSummary(
+            class_id=cls.id,
+            class_name=cls.name,
+            term_id=term.id,
+            term_name=term.name,
+            total_school_days=total_days,
+            students=by_class[cls.id],
+        )
+        for cls in classes
+    ]
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
 @router.get("/classes", response_model=list[AttendableClass],
@@ -167,12 +370,7 @@ async def my_classes(user: CurrentUser, redis: RedisDep, session: SessionDep):
     school_id = user.school_id
     today = date.today()
 
-    current_year = await session.scalar(
-        select(AcademicYear).where(
-            AcademicYear.school_id == school_id,
-            AcademicYear.is_current.is_(True),
-        )
-    )
+    current_year = await get_current_year(school_id, redis, session)
     if not current_year:
         return []
 
@@ -202,41 +400,19 @@ async def my_classes(user: CurrentUser, redis: RedisDep, session: SessionDep):
     classes = list(class_rows.scalars())
 
     # Check which classes have attendance submitted today
-    today_calendar = await session.scalar(
-        select(SchoolCalendar).where(
-            SchoolCalendar.school_id == school_id,
-            SchoolCalendar.date == today,
-        )
-    )
+    today_calendar = await get_calendar_day(school_id, today, redis, session)
 
-    submitted_class_ids: set[UUID] = set()
+    submitted: set[UUID] = set()
     if today_calendar and today_calendar.day_type == "SCHOOL_DAY":
-        # A class is "submitted" if any attendance record exists for it today
-        for cls in classes:
-            count = await session.scalar(
-                select(func.count(AttendanceRecord.id))
-                .join(
-                    StudentTermEnrollment,
-                    AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
-                )
-                .join(
-                    StudentClassEnrollment,
-                    StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
-                )
-                .where(
-                    StudentClassEnrollment.class_id == cls.id,
-                    AttendanceRecord.school_calendar_id == today_calendar.id,
-                )
-            )
-            if count:
-                submitted_class_ids.add(cls.id)
+        # One SMEMBERS on the hot path; a single SELECT DISTINCT on a cold cache
+        submitted = await submitted_class_ids(today_calendar, redis, session)
 
     return [
         AttendableClass(
             class_id=cls.id,
             class_name=cls.name,
             education_level=cls.education_level,
-            today_submitted=cls.id in submitted_class_ids,
+            today_submitted=cls.id in submitted,
         )
         for cls in classes
     ]
@@ -247,6 +423,7 @@ async def my_classes(user: CurrentUser, redis: RedisDep, session: SessionDep):
 async def get_register(
     class_id: UUID,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
     target_date: str | None = None,
 ):
@@ -254,9 +431,9 @@ async def get_register(
     school_id = user.school_id
     d = date.fromisoformat(target_date) if target_date else date.today()
 
-    cal = await _calendar_entry(school_id, d, session)
+    cal = await _calendar_entry(school_id, d, redis, session)
     cls = await _get_class(class_id, school_id, session)
-    term = await _current_term(school_id, session)
+    term = await _current_term(school_id, redis, session)
 
     # Get all active students in this class for the current year, with term enrollments
     rows = await session.execute(
@@ -287,6 +464,7 @@ async def get_register(
     if term_enrollment_ids:
         att_rows = await session.scalars(
             select(AttendanceRecord).where(
+                AttendanceRecord.attendance_date == cal.date,
                 AttendanceRecord.school_calendar_id == cal.id,
                 AttendanceRecord.student_term_enrollment_id.in_(term_enrollment_ids),
                 AttendanceRecord.school_period_id.is_(None),
@@ -327,142 +505,465 @@ async def get_register(
 async def submit_register(
     body: MarkRequest,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
-    """Submit (or update) attendance for a class on a given date."""
+    """
+    Submit (or update) attendance for a class on a given date.
+
+    Saved with one set-based INSERT … ON CONFLICT on the attendance slot key
+    (see save_daily_records), so the round-trip count is constant whatever
+    the class size.
+    """
     school_id = user.school_id
     target_date = date.fromisoformat(body.date)
 
-    cal = await _calendar_entry(school_id, target_date, session)
-    await _get_class(body.class_id, school_id, session)
-
-    now = datetime.now(timezone.utc)
-    marked = 0
-
     for entry in body.records:
-        valid = {"PRESENT", "ABSENT", "LATE", "EXCUSED"}
-        if entry.status not in valid:
+        if entry.status not in _VALID_STATUSES:
             raise HTTPException(
                 status.HTTP_422_UNPROCESSABLE_ENTITY,
-                f"Invalid status '{entry.status}'. Must be one of {valid}",
+                f"Invalid status '{entry.status}'. Must be one of {_VALID_STATUSES}",
             )
 
-        # Upsert: update if exists, insert if not
-        existing = await session.scalar(
-            select(AttendanceRecord).where(
-                AttendanceRecord.school_calendar_id == cal.id,
-                AttendanceRecord.student_term_enrollment_id == entry.term_enrollment_id,
-                AttendanceRecord.school_period_id.is_(None),
-            )
+    cal = await _calendar_entry(school_id, target_date, redis, session)
+    await _get_class(body.class_id, school_id, session)
+
+    # Last entry wins if a student appears twice — ON CONFLICT cannot touch a row twice
+    entries = {e.term_enrollment_id: e for e in body.records}
+    if not entries:
+        return MarkResponse(date=body.date, class_id=body.class_id, marked=0, created=0, updated=0)
+
+    # Every term enrollment must belong to this class — one query for the whole register
+    in_class = set(await session.scalars(
+        select(StudentTermEnrollment.id)
+        .join(
+            StudentClassEnrollment,
+            StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+        )
+        .where(
+            StudentClassEnrollment.class_id == body.class_id,
+            StudentTermEnrollment.id.in_(list(entries)),
+        )
+    ))
+    foreign = [str(i) for i in entries if i not in in_class]
+    if foreign:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f"Term enrollments not in this class: {', '.join(foreign)}",
         )
-        if existing:
-            existing.status = entry.status
-            existing.note = entry.note
-            existing.marked_by = user.id
-            existing.marked_at = now
-        else:
-            session.add(AttendanceRecord(
-                school_id=school_id,
-                student_term_enrollment_id=entry.term_enrollment_id,
-                school_calendar_id=cal.id,
-                school_period_id=None,
-                status=entry.status,
-                marked_by=user.id,
-                marked_at=now,
-                note=entry.note,
-            ))
-        marked += 1
 
+    created, updated = await save_daily_records(
+        session,
+        school_id=school_id,
+        school_calendar_id=cal.id,
+        attendance_date=cal.date,
+        marked_by=user.id,
+        marked_at=datetime.now(UTC),
+        entries={ste_id: (e.status, e.note) for ste_id, e in entries.items()},
+    )
     await session.commit()
-    return MarkResponse(date=body.date, class_id=body.class_id, marked=marked)
+    await record_class_submitted(cal.id, body.class_id, redis)
+    await mark_attendance_analytics_dirty(redis)
+    await publish_class_submitted(
+        redis, school_id=school_id, attendance_date=cal.date, class_id=body.class_id,
+    )
+    await mark_dashboard_dirty(redis, school_id, class_ids=[body.class_id])
+
+    return MarkResponse(
+        date=body.date,
+        class_id=body.class_id,
+        marked=created + updated,
+        created=created,
+        updated=updated,
+    )
 
 
-@router.get("/summary", response_model=ClassSummary,
-            dependencies=[require(Permission.VIEW_ATTENDANCE)])
-async def attendance_summary(
-    class_id: UUID,
+@router.post("/sync", response_model=SyncResponse,
+             dependencies=[require(Permission.MARK_ATTENDANCE)])
+async def sync_registers(
+    body: SyncRequest,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
-    term_id: UUID | None = None,
 ):
-    """Per-student attendance summary for a class in a term."""
+    """
+    Offline sync: apply many registers and return what changed since cursor.
+
+    Pushed registers are validated up front with one query per kind of check
+    (calendar days, classes, enrollments) and written with a single upsert.
+    A register that fails validation is reported in `rejected` and does not
+    block the rest. Conflicts are resolved by marked_at — the later mark wins,
+    and a mark from the future is clamped to the server clock.
+
+    The pull covers the current term for `class_ids` plus every pushed class.
+    Store the returned cursor and send it next time; when has_more is true,
+    sync again to fetch the next page.
+    """
     school_id = user.school_id
+    if len(body.registers) > _SYNC_MAX_REGISTERS:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f"At most {_SYNC_MAX_REGISTERS} registers per sync",
+        )
+    if body.cursor:
+        try:
+            decode_sync_cursor(body.cursor)
+        except ValueError:
+            raise HTTPException(
+                status.HTTP_422_UNPROCESSABLE_ENTITY, "Invalid sync cursor",
+            ) from None
 
-    if term_id:
-        term = await session.get(AcademicTerm, term_id)
-        if not term:
-            raise HTTPException(status.HTTP_404_NOT_FOUND, "Term not found")
-    else:
-        term = await _current_term(school_id, session)
+    term = await _current_term(school_id, redis, session)
+    rejected: list[SyncRejection] = []
 
-    cls = await _get_class(class_id, school_id, session)
+    def _reject(index: int, reg: SyncRegister, detail: str) -> None:
+        rejected.append(SyncRejection(
+            index=index, class_id=reg.class_id, date=reg.date, detail=detail,
+        ))
 
-    # Count total school days in the term
-    total_days = await session.scalar(
-        select(func.count(SchoolCalendar.id)).where(
-            SchoolCalendar.school_id == school_id,
-            SchoolCalendar.academic_term_id == term.id,
-            SchoolCalendar.day_type == "SCHOOL_DAY",
+    dated: list[tuple[int, SyncRegister, date]] = []
+    for i, reg in enumerate(body.registers):
+        try:
+            dated.append((i, reg, date.fromisoformat(reg.date)))
+        except ValueError:
+            _reject(i, reg, f"Invalid date '{reg.date}'")
+
+    pull_ids = set(body.class_ids)
+    pushed_ids = {reg.class_id for _, reg, _ in dated}
+    active_ids = set(await session.scalars(
+        select(Class.id).where(
+            Class.id.in_(pull_ids | pushed_ids),
+            Class.school_id == school_id,
+            Class.is_active.is_(True),
         )
-    ) or 0
+    )) if pull_ids | pushed_ids else set()
+    if pull_ids - active_ids:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Class not found")
 
-    # Get students in this class for the term
-    rows = await session.execute(
-        select(Student, StudentClassEnrollment, StudentTermEnrollment)
-        .join(StudentClassEnrollment, StudentClassEnrollment.student_id == Student.id)
-        .join(
-            StudentTermEnrollment,
-            and_(
-                StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
-                StudentTermEnrollment.academic_term_id == term.id,
-            ),
-        )
-        .join(AcademicYear, AcademicYear.id == StudentClassEnrollment.academic_year_id)
-        .where(
-            Student.school_id == school_id,
-            Student.is_active.is_(True),
-            StudentClassEnrollment.class_id == class_id,
-            StudentClassEnrollment.status == "ACTIVE",
-            AcademicYear.is_current.is_(True),
+    calendars: dict[date, SchoolCalendar] = {}
+    membership: dict[UUID, UUID] = {}
+    if dated:
+        calendars = {
+            c.date: c for c in await session.scalars(
+                select(SchoolCalendar).where(
+                    SchoolCalendar.school_id == school_id,
+                    SchoolCalendar.date.in_({d for *_, d in dated}),
+                )
+            )
+        }
+        ste_ids = {e.term_enrollment_id for _, reg, _ in dated for e in reg.records}
+        if ste_ids:
+            membership = dict((await session.execute(
+                select(StudentTermEnrollment.id, StudentClassEnrollment.class_id)
+                .join(
+                    StudentClassEnrollment,
+                    StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+                )
+                .where(StudentTermEnrollment.id.in_(ste_ids))
+            )).all())
+
+    now = datetime.now(UTC)
+    marks: list[DailyMark] = []
+    submitted: set[tuple[UUID, UUID]] = set()
+    for i, reg, d in dated:
+        cal = calendars.get(d)
+        if reg.class_id not in active_ids:
+            _reject(i, reg, "Class not found")
+        elif cal is None:
+            _reject(i, reg, f"{d} has no calendar entry")
+        elif cal.day_type != "SCHOOL_DAY":
+            _reject(i, reg, f"{d} is a {cal.day_type.lower().replace('_', ' ')}")
+        elif bad := sorted({e.status for e in reg.records} - _VALID_STATUSES):
+            _reject(i, reg, f"Invalid status {', '.join(bad)}")
+        elif foreign := [
+            str(e.term_enrollment_id) for e in reg.records
+            if membership.get(e.term_enrollment_id) != reg.class_id
+        ]:
+            _reject(i, reg, f"Term enrollments not in this class: {', '.join(foreign)}")
+        else:
+            for e in reg.records:
+                marked_at = e.marked_at if e.marked_at.tzinfo else e.marked_at.replace(tzinfo=UTC)
+                marks.append(DailyMark(
+                    e.term_enrollment_id, cal.id, cal.date, e.status, e.note, min(marked_at, now),
+                ))
+            submitted.add((cal.id, reg.class_id))
+
+    created, updated, stale = await save_synced_records(
+        session, school_id=school_id, marked_by=user.id, marks=marks,
+    )
+    await session.commit()
+    cal_dates = {c.id: c.date for c in calendars.values()}
+    for cal_id, class_id in submitted:
+        await record_class_submitted(cal_id, class_id, redis)
+        await publish_class_submitted(
+            redis, school_id=school_id, attendance_date=cal_dates[cal_id], class_id=class_id,
         )
-        .order_by(Student.last_name, Student.first_name)
+    if marks:
+        await mark_attendance_analytics_dirty(redis)
+        await mark_dashboard_dirty(redis, school_id, class_ids=list({c for _, c in submitted}))
+
+    changes, cursor, has_more = await attendance_changes_since(
+        session,
+        class_ids=pull_ids | {class_id for _, class_id in submitted},
+        since_date=term.start_date,
+        cursor=body.cursor,
+        limit=_SYNC_PAGE_SIZE,
     )
-    student_rows = rows.all()
-
-    students = []
-    for s, sce, ste in student_rows:
-        counts = await session.execute(
-            select(AttendanceRecord.status, func.count(AttendanceRecord.id))
-            .where(
-                AttendanceRecord.student_term_enrollment_id == ste.id,
-                AttendanceRecord.school_period_id.is_(None),
+    return SyncResponse(
+        created=created,
+        updated=updated,
+        stale=stale,
+        rejected=rejected,
+        changes=[
+            SyncRecord(
+                term_enrollment_id=c.term_enrollment_id,
+                class_id=c.class_id,
+                date=c.attendance_date.isoformat(),
+                status=c.status,
+                note=c.note,
+                marked_at=c.marked_at,
+                marked_by=c.marked_by,
             )
-            .group_by(AttendanceRecord.status)
+            for c in changes
+        ],
+        cursor=cursor,
+        has_more=has_more,
+    )
+
+
+@router.get("/summary", response_model=ClassSummary | list[ClassSummary],
+            dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def attendance_summary(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    class_id: UUID | None = None,
+    class_ids: list[UUID] | None = Query(None),
+    term_id: UUID | None = None,
+):
+    """
+    Per-student attendance summary for a class in a term.
+
+    Pass class_id for a single class, or repeat class_ids=… to get a list of
+    summaries for many classes (e.g. the whole school) in one request.
+    """
+    school_id = user.school_id
+    if (class_id is None) == (not class_ids):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "Provide either class_id or class_ids",
         )
-        count_map: dict[str, int] = {row[0]: row[1] for row in counts}
-        present  = count_map.get("PRESENT", 0)
-        absent   = count_map.get("ABSENT", 0)
-        late     = count_map.get("LATE", 0)
-        excused  = count_map.get("EXCUSED", 0)
-        pct = round((present + late) / total_days * 100, 1) if total_days > 0 else 0.0
-
-        students.append(SummaryStudent(
-            student_id=s.id,
-            full_name=s.full_name,
-            register_number=sce.register_number,
-            total_school_days=total_days,
-            present=present,
-            absent=absent,
-            late=late,
-            excused=excused,
-            percentage=pct,
+
+    term = await _resolve_term(term_id, school_id, redis, session)
+
+    if class_id is not None:
+        cls = await _get_class(class_id, school_id, session)
+        return (await _class_summaries([cls], term, school_id, session))[0]
+
+    wanted = set(class_ids)
+    classes = list(await session.scalars(
+        select(Class)
+        .options(selectinload(Class.learning_area))
+        .where(Class.id.in_(wanted), Class.school_id == school_id, Class.is_active.is_(True))
+        .order_by(Class.level, Class.year, Class.stream)
+    ))
+    if len(classes) != len(wanted):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Class not found")
+    return await _class_summaries(classes, term, school_id, session)
+
+
+@router.get("/export", dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def export_attendance(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    class_id: UUID | None = None,
+    term_id: UUID | None = None,
+    fmt: Literal["csv", "xlsx"] = Query("csv", alias="format"),
+):
+    """
+    Download a term attendance sheet: one row per student, one column per
+    school day, plus term totals. Omit class_id for the whole school.
+
+    Rows are streamed from a server-side cursor (see attendance_export), so
+    memory stays flat however large the school is.
+    """
+    school_id = user.school_id
+    term = await _resolve_term(term_id, school_id, redis, session)
+
+    if class_id is not None:
+        classes = [await _get_class(class_id, school_id, session)]
+    else:
+        classes = list(await session.scalars(
+            select(Class)
+            .options(selectinload(Class.learning_area))
+            .where(Class.school_id == school_id, Class.is_active.is_(True))
         ))
+    days = await term_school_days(session, school_id, term.id)
 
-    return ClassSummary(
-        class_id=cls.id,
-        class_name=cls.name,
+    rows = iter_student_rows(
+        session,
+        school_id=school_id,
         term_id=term.id,
-        term_name=term.name,
-        total_school_days=total_days,
-        students=students,
+        class_names={c.id: c.name for c in classes},
+        days=days,
+    )
+    scope = classes[0].name if class_id is not None else "All_Classes"
+    stem = f"Attendance_{scope}_{term.name}".replace(" ", "_").replace("/", "-")
+
+    if fmt == "xlsx":
+        body, media_type = xlsx_chunks(term.name, header_row(days), rows), XLSX_MEDIA_TYPE
+    else:
+        body, media_type = csv_chunks(header_row(days), rows), CSV_MEDIA_TYPE
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{stem}.{fmt}"'},
+    )
+
+
+@router.get("/trends/classes", response_model=list[ClassTrend],
+            dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def trends_by_class(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    term_id: UUID | None = None,
+):
+    """Term attendance rate per class, lowest first. Read from mv_attendance_summary."""
+    school_id = user.school_id
+    term = await _resolve_term(term_id, school_id, redis, session)
+    rows = await trend_by_class(session, school_id, term.id)
+
+    classes = {
+        c.id: c for c in await session.scalars(
+            select(Class)
+            .options(selectinload(Class.learning_area))
+            .where(Class.id.in_([r[0] for r in rows]), Class.school_id == school_id)
+        )
+    } if rows else {}
+    trends = [
+        ClassTrend(class_id=cls_id, class_name=classes[cls_id].name, **_trend_counts(*counts))
+        for cls_id, *counts in rows
+        if cls_id in classes
+    ]
+    return sorted(trends, key=lambda t: (t.rate, t.class_name))
+
+
+@router.get("/trends/gender", response_model=list[GenderTrend],
+            dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def trends_by_gender(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    class_id: UUID | None = None,
+    term_id: UUID | None = None,
+):
+    """Term attendance by gender, for the school or one class."""
+    school_id = user.school_id
+    term = await _resolve_term(term_id, school_id, redis, session)
+    rows = await trend_by_gender(session, school_id, term.id, class_id)
+    return [GenderTrend(gender=gender, **_trend_counts(*counts)) for gender, *counts in rows]
+
+
+@router.get("/trends/weekly", response_model=list[WeekTrend],
+            dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def trends_by_week(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    class_id: UUID | None = None,
+    term_id: UUID | None = None,
+):
+    """Attendance per week of the term, for the school or one class."""
+    school_id = user.school_id
+    term = await _resolve_term(term_id, school_id, redis, session)
+    rows = await trend_by_week(session, school_id, term.id, class_id)
+    return [
+        WeekTrend(week_start=week.isoformat(), **_trend_counts(*counts))
+        for week, *counts in rows
+    ]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/roll-call/stream", dependencies=[require(Permission.VIEW_ATTENDANCE)])
+async def roll_call_stream(
+    user: CurrentUser,
+    redis: RedisDep,
+    session: SessionDep,
+    target_date: date | None = None,
+):
+    """
+    Server-Sent Events: live roll-call progress for a school day (default today).
+
+    Sends one `snapshot` event ({date, school_day, submitted, total,
+    class_ids}), then a `submitted` event ({class_id, class_name, first,
+    submitted, total}) each time a register is saved — `first` is false for a
+    re-submission, which does not move the count. Comment lines keep idle
+    connections alive.
+
+    The database is used only for the snapshot; the connection is returned
+    to the pool before the first event is sent. Events arrive through the
+    per-process Redis subscription in app.services.roll_call. The server ends
+    the stream after an hour, or if the client falls too far behind, and
+    EventSource reconnects to a fresh snapshot.
+    """
+    school_id = user.school_id
+    day = target_date or date.today()
+    cal = await get_calendar_day(school_id, day, redis, session)
+    school_day = cal is not None and cal.day_type == "SCHOOL_DAY"
+
+    async def events():
+        # Subscribe before the snapshot so no submission falls between the two
+        async with roll_call_hub.subscribe(school_id, redis) as sub:
+            classes = {
+                c.id: c.name for c in await session.scalars(
+                    select(Class)
+                    .options(selectinload(Class.learning_area))
+                    .where(Class.school_id == school_id, Class.is_active.is_(True))
+                )
+            }
+            submitted = (
+                await submitted_class_ids(cal, redis, session) & classes.keys()
+                if school_day else set()
+            )
+            await session.close()
+
+            yield _sse("snapshot", {
+                "date": day.isoformat(),
+                "school_day": school_day,
+                "submitted": len(submitted),
+                "total": len(classes),
+                "class_ids": sorted(str(c) for c in submitted),
+            })
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + _ROLL_CALL_MAX_AGE
+            while not sub.overflowed and loop.time() < deadline:
+                try:
+                    event_date, class_id = await asyncio.wait_for(
+                        sub.queue.get(), _ROLL_CALL_KEEPALIVE,
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event_date != day or class_id not in classes:
+                    continue
+                first = class_id not in submitted
+                submitted.add(class_id)
+                yield _sse("submitted", {
+                    "class_id": str(class_id),
+                    "class_name": classes[class_id],
+                    "first": first,
+                    "submitted": len(submitted),
+                    "total": len(classes),
+                })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
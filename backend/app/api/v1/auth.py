@@ -15,12 +15,14 @@ from app.core.security import (
     create_access_token,
     create_refresh_token,
     decode_token,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
 )
 from app.models.school import School
 from app.models.user import User
-from app.services.permissions import resolve_all_permissions
+from app.services.permissions import resolve_all_permissions, token_permission_claims
+from app.services.user_cache import invalidate_user
 
 logger = logging.getLogger(__name__)
 
@@ -63,22 +65,28 @@ class ChangePasswordRequest(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(body: LoginRequest, response: Response, session: SessionDep) -> TokenResponse:
+async def login(
+    body: LoginRequest, response: Response, redis: RedisDep, session: SessionDep
+) -> TokenResponse:
     user = await session.scalar(
         select(User).where(User.email == body.email, User.is_active.is_(True))
     )
-    if not user or not verify_password(body.password, user.password_hash):
+    if not user or not await verify_password_async(body.password, user.password_hash):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid email or password")
 
     if not user.is_verified:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Account not verified — check your email")
 
     access_token = create_access_token(
-        str(user.id), str(user.school_id) if user.school_id else None, user.system_role
+        str(user.id), str(user.school_id) if user.school_id else None, user.system_role,
+        await token_permission_claims(user, redis, session),
     )
     refresh_token = create_refresh_token(str(user.id))
 
     user.last_login_at = datetime.now(UTC)
+    # Argon2 parameters changed since this hash was made — upgrade it now
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await hash_password_async(body.password)
     await session.commit()
 
     response.set_cookie(_REFRESH_COOKIE, refresh_token, **_COOKIE_OPTS)
@@ -86,7 +94,9 @@ async def login(body: LoginRequest, response: Response, session: SessionDep) ->
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh(request: Request, response: Response, session: SessionDep) -> TokenResponse:
+async def refresh(
+    request: Request, response: Response, redis: RedisDep, session: SessionDep
+) -> TokenResponse:
     token = request.cookies.get(_REFRESH_COOKIE)
     if not token:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "No refresh token")
@@ -104,7 +114,8 @@ async def refresh(request: Request, response: Response, session: SessionDep) ->
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found or inactive")
 
     access_token = create_access_token(
-        str(user.id), str(user.school_id) if user.school_id else None, user.system_role
+        str(user.id), str(user.school_id) if user.school_id else None, user.system_role,
+        await token_permission_claims(user, redis, session),
     )
     new_refresh = create_refresh_token(str(user.id))
     response.set_cookie(_REFRESH_COOKIE, new_refresh, **_COOKIE_OPTS)
@@ -148,15 +159,19 @@ async def me(current_user: CurrentUser, redis: RedisDep, session: SessionDep) ->
 async def change_password(
     body: ChangePasswordRequest,
     current_user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ) -> None:
-    if not verify_password(body.current_password, current_user.password_hash):
+    # current_user is a cached snapshot without the hash — load the row itself
+    user = await session.get(User, current_user.id)
+    if not user or not await verify_password_async(body.current_password, user.password_hash):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Current password is incorrect")
     if len(body.new_password) < 8:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Password must be at least 8 characters")
-    current_user.password_hash = hash_password(body.new_password)
-    current_user.must_change_password = False
+    user.password_hash = await hash_password_async(body.new_password)
+    user.must_change_password = False
     await session.commit()
+    await invalidate_user(redis, user.id)
 
 
 # ── Invite flow ───────────────────────────────────────────────────────────────
@@ -199,7 +214,7 @@ async def accept_invite(token: str, body: AcceptInviteRequest, session: SessionD
     if len(body.password) < 8:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Password must be at least 8 characters")
 
-    user.password_hash = hash_password(body.password)
+    user.password_hash = await hash_password_async(body.password)
     user.is_active = True
     user.is_verified = True
     user.invite_token = None
@@ -280,7 +295,9 @@ async def get_reset_info(token: str, session: SessionDep) -> ResetTokenInfoRespo
 
 
 @router.post("/reset-password/{token}", status_code=204)
-async def reset_password(token: str, body: ResetPasswordRequest, session: SessionDep) -> None:
+async def reset_password(
+    token: str, body: ResetPasswordRequest, redis: RedisDep, session: SessionDep
+) -> None:
     user = await session.scalar(
         select(User).where(User.password_reset_token == token)
     )
@@ -291,8 +308,9 @@ async def reset_password(token: str, body: ResetPasswordRequest, session: Sessio
     if len(body.password) < 8:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Password must be at least 8 characters")
 
-    user.password_hash = hash_password(body.password)
+    user.password_hash = await hash_password_async(body.password)
     user.must_change_password = False
     user.password_reset_token = None
     user.password_reset_expires_at = None
     await session.commit()
+    await invalidate_user(redis, user.id)
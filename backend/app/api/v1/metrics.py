@@ -0,0 +1,41 @@
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.auth_context import bearer_token
+from app.core.config import settings
+from app.core.query_metrics import render_metrics
+from app.core.security import password_hash_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    Per-route SQL histograms (see core.query_metrics) and the password-hash
+    thread pool's queue gauges (see core.security), Prometheus text format.
+    Values are per process. Requires `Bearer METRICS_TOKEN` when that is set;
+    otherwise served only outside production. Exempt from rate limiting.
+    """
+    if settings.METRICS_TOKEN:
+        token = bearer_token(request.scope["headers"]) or ""
+        if not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+            )
+    elif settings.is_production:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(
+        render_metrics() + _password_hashing(), media_type="text/plain; version=0.0.4",
+    )
+
+
+def _password_hashing() -> str:
+    lines = []
+    for name, value in password_hash_stats.snapshot().items():
+        metric = f"password_hash_{name}"
+        kind = "counter" if name == "calls" else "gauge"
+        lines += [f"# TYPE {metric} {kind}", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
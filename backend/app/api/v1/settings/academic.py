@@ -5,10 +5,12 @@ from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
-from app.api.deps import CurrentUser, SessionDep, require
+from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.api.v1.settings._helpers import _school_id, _current_year, _require_shs
 from app.core.permissions import Permission
+from app.services.calendar_cache import invalidate_school_calendar
 from app.services.calendar_generator import generate_term_calendar
+from app.services.dashboard_tiles import mark_dashboard_dirty
 from app.models.academic import (
     AcademicTerm, AcademicYear, Class, ClassSubject, ClassTeacher,
     LearningArea, SchoolSubject, SubjectTeacher,
@@ -86,7 +88,7 @@ async def create_academic_year(
 @router.patch("/academic-years/{year_id}", response_model=AcademicYearResponse,
               dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
 async def update_academic_year(
-    year_id: UUID, body: AcademicYearUpdate, user: CurrentUser, session: SessionDep
+    year_id: UUID, body: AcademicYearUpdate, user: CurrentUser, redis: RedisDep, session: SessionDep
 ):
     year = await session.scalar(
         select(AcademicYear)
@@ -98,6 +100,7 @@ async def update_academic_year(
     for field, value in body.model_dump(exclude_none=True).items():
         setattr(year, field, value)
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
     year = await session.scalar(
         select(AcademicYear)
         .where(AcademicYear.id == year_id)
@@ -108,7 +111,9 @@ async def update_academic_year(
 
 @router.post("/academic-years/{year_id}/activate", response_model=AcademicYearResponse,
              dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def activate_academic_year(year_id: UUID, user: CurrentUser, session: SessionDep):
+async def activate_academic_year(
+    year_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep
+):
     school_id = _school_id(user)
     all_years = await session.scalars(
         select(AcademicYear).where(AcademicYear.school_id == school_id)
@@ -116,6 +121,7 @@ async def activate_academic_year(year_id: UUID, user: CurrentUser, session: Sess
     for y in all_years:
         y.is_current = y.id == year_id
     await session.commit()
+    await invalidate_school_calendar(school_id, redis)
     year = await session.scalar(
         select(AcademicYear)
         .where(AcademicYear.id == year_id, AcademicYear.school_id == school_id)
@@ -126,7 +132,9 @@ async def activate_academic_year(year_id: UUID, user: CurrentUser, session: Sess
 
 @router.delete("/academic-years/{year_id}", status_code=204,
                dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def delete_academic_year(year_id: UUID, user: CurrentUser, session: SessionDep):
+async def delete_academic_year(
+    year_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep
+):
     year = await session.scalar(
         select(AcademicYear)
         .where(AcademicYear.id == year_id, AcademicYear.school_id == _school_id(user))
@@ -137,6 +145,7 @@ async def delete_academic_year(year_id: UUID, user: CurrentUser, session: Sessio
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cannot delete the current academic year")
     await session.delete(year)
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
 
 
 # ── Terms ─────────────────────────────────────────────────────────────────────
@@ -169,7 +178,9 @@ async def create_term(
 
 @router.patch("/terms/{term_id}", response_model=AcademicTermResponse,
               dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def update_term(term_id: UUID, body: AcademicTermUpdate, user: CurrentUser, session: SessionDep):
+async def update_term(
+    term_id: UUID, body: AcademicTermUpdate, user: CurrentUser, redis: RedisDep, session: SessionDep
+):
     term = await session.scalar(
         select(AcademicTerm)
         .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
@@ -180,13 +191,14 @@ async def update_term(term_id: UUID, body: AcademicTermUpdate, user: CurrentUser
     for field, value in body.model_dump(exclude_none=True).items():
         setattr(term, field, value)
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
     await session.refresh(term)
     return AcademicTermResponse.model_validate(term)
 
 
 @router.post("/terms/{term_id}/activate", response_model=AcademicTermResponse,
              dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def activate_term(term_id: UUID, user: CurrentUser, session: SessionDep):
+async def activate_term(term_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep):
     term = await session.scalar(
         select(AcademicTerm)
         .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
@@ -202,13 +214,14 @@ async def activate_term(term_id: UUID, user: CurrentUser, session: SessionDep):
     await session.flush()
     await generate_term_calendar(term, str(_school_id(user)), session, str(user.id))
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
     await session.refresh(term)
     return AcademicTermResponse.model_validate(term)
 
 
 @router.post("/terms/{term_id}/generate-calendar", status_code=204,
              dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def regenerate_calendar(term_id: UUID, user: CurrentUser, session: SessionDep):
+async def regenerate_calendar(term_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep):
     """Regenerate the school calendar for a term (idempotent — safe to re-run)."""
     term = await session.scalar(
         select(AcademicTerm)
@@ -219,11 +232,12 @@ async def regenerate_calendar(term_id: UUID, user: CurrentUser, session: Session
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Term not found")
     await generate_term_calendar(term, str(_school_id(user)), session, str(user.id))
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
 
 
 @router.delete("/terms/{term_id}", status_code=204,
                dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def delete_term(term_id: UUID, user: CurrentUser, session: SessionDep):
+async def delete_term(term_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep):
     term = await session.scalar(
         select(AcademicTerm)
         .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
@@ -235,6 +249,7 @@ async def delete_term(term_id: UUID, user: CurrentUser, session: SessionDep):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cannot delete the current term")
     await session.delete(term)
     await session.commit()
+    await invalidate_school_calendar(_school_id(user), redis)
 
 
 # ── School Subjects ───────────────────────────────────────────────────────────
@@ -608,7 +623,7 @@ async def get_class_detail(class_id: UUID, user: CurrentUser, session: SessionDe
 @router.put("/classes/{class_id}/teacher", response_model=ClassDetailResponse,
             dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
 async def assign_class_teacher(
-    class_id: UUID, body: ClassTeacherAssign, user: CurrentUser, session: SessionDep
+    class_id: UUID, body: ClassTeacherAssign, user: CurrentUser, redis: RedisDep, session: SessionDep
 ):
     school_id = _school_id(user)
 
@@ -641,7 +656,9 @@ async def assign_class_teacher(
             ClassTeacher.academic_year_id == current_year.id,
         )
     )
+    affected = [body.staff_member_id]
     if existing:
+        affected.append(existing.staff_member_id)
         existing.staff_member_id = body.staff_member_id
     else:
         session.add(ClassTeacher(
@@ -651,12 +668,15 @@ async def assign_class_teacher(
         ))
 
     await session.commit()
+    await mark_dashboard_dirty(redis, school_id, staff_member_ids=affected)
     return await _class_detail(class_id, school_id, session)
 
 
 @router.delete("/classes/{class_id}/teacher", status_code=204,
                dependencies=[require(Permission.MANAGE_ACADEMIC_STRUCTURE)])
-async def remove_class_teacher(class_id: UUID, user: CurrentUser, session: SessionDep):
+async def remove_class_teacher(
+    class_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep
+):
     school_id = _school_id(user)
     await _get_class_owned(class_id, school_id, session)
 
@@ -673,6 +693,7 @@ async def remove_class_teacher(class_id: UUID, user: CurrentUser, session: Sessi
     if ct:
         await session.delete(ct)
         await session.commit()
+        await mark_dashboard_dirty(redis, school_id, staff_member_ids=[ct.staff_member_id])
 
 
 # ── Class Subjects ────────────────────────────────────────────────────────────
@@ -802,6 +823,7 @@ async def assign_subject_teacher(
     subject_id: UUID,
     body: SubjectTeacherAssign,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     school_id = _school_id(user)
@@ -837,6 +859,7 @@ async def assign_subject_teacher(
     if existing:
         existing.is_active = True
         await session.commit()
+        await mark_dashboard_dirty(redis, school_id, staff_member_ids=[staff.id])
         return SubjectTeacherInfo(
             id=existing.id,
             staff_member_id=staff.id,
@@ -850,6 +873,7 @@ async def assign_subject_teacher(
     )
     session.add(st)
     await session.commit()
+    await mark_dashboard_dirty(redis, school_id, staff_member_ids=[staff.id])
     await session.refresh(st)
     return SubjectTeacherInfo(id=st.id, staff_member_id=staff.id, staff_name=staff.full_name)
 
@@ -861,9 +885,10 @@ async def assign_subject_teacher(
 )
 async def remove_subject_teacher(
     class_id: UUID, subject_id: UUID, st_id: UUID,
-    user: CurrentUser, session: SessionDep,
+    user: CurrentUser, redis: RedisDep, session: SessionDep,
 ):
-    await _get_class_owned(class_id, _school_id(user), session)
+    school_id = _school_id(user)
+    await _get_class_owned(class_id, school_id, session)
 
     st = await session.scalar(
         select(SubjectTeacher).where(
@@ -876,6 +901,7 @@ async def remove_subject_teacher(
 
     await session.delete(st)
     await session.commit()
+    await mark_dashboard_dirty(redis, school_id, staff_member_ids=[st.staff_member_id])
 
 
 # ── Teaching staff list ───────────────────────────────────────────────────────
@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
-from app.api.deps import CurrentUser, SessionDep, require
+from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.api.v1.settings._helpers import _school_id, _require_houses
 from app.core.permissions import Permission
 from app.models.academic import House
@@ -16,6 +16,8 @@ from app.schemas.settings import (
     UserAccountResponse, UserAccountUpdate,
 )
 from app.schemas.staff import PositionCreate, PositionUpdate, PositionResponse
+from app.services.permissions import invalidate_school_permissions
+from app.services.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -83,7 +85,7 @@ async def create_position(body: PositionCreate, user: CurrentUser, session: Sess
 @router.patch("/positions/{pos_id}", response_model=PositionResponse,
               dependencies=[require(Permission.MANAGE_USERS)])
 async def update_position(
-    pos_id: UUID, body: PositionUpdate, user: CurrentUser, session: SessionDep
+    pos_id: UUID, body: PositionUpdate, user: CurrentUser, redis: RedisDep, session: SessionDep
 ):
     pos = await session.scalar(
         select(StaffPosition)
@@ -108,13 +110,15 @@ async def update_position(
             session.add(PositionPermission(position_id=pos.id, permission_key=perm_key, granted=True))
 
     await session.commit()
+    if body.permissions is not None:
+        await invalidate_school_permissions(_school_id(user), redis)
     await session.refresh(pos, ["permissions"])
     return _position_to_response(pos)
 
 
 @router.delete("/positions/{pos_id}", status_code=204,
                dependencies=[require(Permission.MANAGE_USERS)])
-async def delete_position(pos_id: UUID, user: CurrentUser, session: SessionDep):
+async def delete_position(pos_id: UUID, user: CurrentUser, redis: RedisDep, session: SessionDep):
     pos = await session.scalar(
         select(StaffPosition)
         .where(StaffPosition.id == pos_id, StaffPosition.school_id == _school_id(user))
@@ -125,6 +129,7 @@ async def delete_position(pos_id: UUID, user: CurrentUser, session: SessionDep):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cannot delete system positions")
     await session.delete(pos)
     await session.commit()
+    await invalidate_school_permissions(_school_id(user), redis)
 
 
 # ── User Accounts ─────────────────────────────────────────────────────────────
@@ -165,7 +170,8 @@ async def list_school_users(user: CurrentUser, session: SessionDep):
 @router.patch("/users/{target_user_id}", response_model=UserAccountResponse,
               dependencies=[require(Permission.MANAGE_USERS)])
 async def update_school_user(
-    target_user_id: UUID, body: UserAccountUpdate, user: CurrentUser, session: SessionDep
+    target_user_id: UUID, body: UserAccountUpdate, user: CurrentUser, redis: RedisDep,
+    session: SessionDep,
 ):
     target = await session.scalar(
         select(User)
@@ -184,6 +190,7 @@ async def update_school_user(
     if body.must_change_password is not None:
         target.must_change_password = body.must_change_password
     await session.commit()
+    await invalidate_user(redis, target.id)
     await session.refresh(target, ["staff_member", "user_roles"])
     return _user_to_response(target)
 
@@ -18,7 +18,8 @@ from app.schemas.staff import (
     StaffPermissionsResponse,
     UserRoleResponse,
 )
-from app.services.permissions import invalidate_cache, resolve_all_permissions
+from app.services.permissions import invalidate_school_permissions, resolve_all_permissions
+from app.services.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -118,9 +119,7 @@ async def set_permission_override(
     await session.commit()
     await session.refresh(override)
 
-    linked = await _linked_user(member, session)
-    if linked:
-        await invalidate_cache(linked.id, redis)
+    await invalidate_school_permissions(user.school_id, redis)
 
     return PermissionOverrideResponse.model_validate(override)
 
@@ -149,9 +148,7 @@ async def remove_permission_override(
     await session.delete(override)
     await session.commit()
 
-    linked = await _linked_user(member, session)
-    if linked:
-        await invalidate_cache(linked.id, redis)
+    await invalidate_school_permissions(user.school_id, redis)
 
 
 # ── Roles ─────────────────────────────────────────────────────────────────────
@@ -218,7 +215,8 @@ async def assign_role(
     session.add(ur)
     await session.commit()
     await session.refresh(ur)
-    await invalidate_cache(linked.id, redis)
+    await invalidate_school_permissions(user.school_id, redis)
+    await invalidate_user(redis, linked.id)
 
     return UserRoleResponse(
         id=ur.id,
@@ -252,4 +250,5 @@ async def remove_role(
 
     await session.delete(ur)
     await session.commit()
-    await invalidate_cache(linked.id, redis)
+    await invalidate_school_permissions(user.school_id, redis)
+    await invalidate_user(redis, linked.id)
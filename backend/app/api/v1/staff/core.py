@@ -12,7 +12,7 @@ from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.api.v1.staff._helpers import _get_member, _linked_user, _current_rank, _to_response
 from app.core.config import settings
 from app.core.permissions import Permission
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.models.school import School
 from app.models.staff import StaffMember, StaffPosition
 from app.models.user import User, UserRole
@@ -29,6 +29,7 @@ from app.schemas.staff import (
 )
 from app.schemas.common import PagedResponse
 from app.services.storage import ALLOWED_IMAGE_TYPES, get_storage
+from app.services.user_cache import invalidate_user
 
 logger = logging.getLogger(__name__)
 
@@ -234,6 +235,7 @@ async def update_staff(
 async def deactivate_staff(
     staff_id: UUID,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     member = await _get_member(staff_id, user.school_id, session)
@@ -242,6 +244,8 @@ async def deactivate_staff(
     if linked:
         linked.is_active = False
     await session.commit()
+    if linked:
+        await invalidate_user(redis, linked.id)
 
 
 # ── Photo upload ──────────────────────────────────────────────────────────────
@@ -314,7 +318,7 @@ async def send_invite(
     else:
         new_user = User(
             email=str(body.email),
-            password_hash=hash_password(secrets.token_hex(32)),
+            password_hash=await hash_password_async(secrets.token_hex(32)),
             system_role="SCHOOL_STAFF",
             school_id=user.school_id,
             staff_member_id=member.id,
@@ -351,6 +355,7 @@ async def send_invite(
 async def reset_password(
     staff_id: UUID,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     member = await _get_member(staff_id, user.school_id, session)
@@ -365,6 +370,7 @@ async def reset_password(
     linked.invite_token = token
     linked.invite_expires_at = expires_at
     await session.commit()
+    await invalidate_user(redis, linked.id)
 
     sms_sent = False
     if member.phone and settings.AT_API_KEY:
@@ -386,6 +392,7 @@ async def reset_password(
 async def reactivate_staff(
     staff_id: UUID,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     member = await _get_member(staff_id, user.school_id, session)
@@ -394,3 +401,5 @@ async def reactivate_staff(
     if linked:
         linked.is_active = True
     await session.commit()
+    if linked:
+        await invalidate_user(redis, linked.id)
@@ -6,13 +6,14 @@ from fastapi import APIRouter, File, HTTPException, UploadFile, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy import func, select
 
-from app.api.deps import CurrentUser, SessionDep, require
+from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.core.permissions import Permission
 from app.models.academic import AcademicYear, Class
 from app.models.school import School, SchoolConfig
 from app.models.student import Guardian, Student, StudentClassEnrollment, StudentTermEnrollment
 from app.models.academic import AcademicTerm
 from app.schemas.staff import BulkRowError, BulkUploadResponse
+from app.services.dashboard_tiles import mark_dashboard_dirty
 
 router = APIRouter()
 
@@ -232,6 +233,7 @@ def _parse_csv(content: bytes) -> list[dict]:
              dependencies=[require(Permission.ENROLL_STUDENTS)])
 async def bulk_upload(
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
     file: UploadFile = File(...),
 ):
@@ -275,6 +277,7 @@ async def bulk_upload(
     created = 0
     skipped = 0
     errors: list[BulkRowError] = []
+    enrolled_class_ids: set[uuid.UUID] = set()
 
     for i, raw in enumerate(rows, start=2):
         row = {
@@ -356,6 +359,7 @@ async def bulk_upload(
                 )
                 session.add(enrollment)
                 await session.flush()
+                enrolled_class_ids.add(enrollment.class_id)
 
                 for term in year_terms:
                     session.add(StudentTermEnrollment(
@@ -382,5 +386,6 @@ async def bulk_upload(
         await session.rollback()
     else:
         await session.commit()
+        await mark_dashboard_dirty(redis, school_id, class_ids=list(enrolled_class_ids))
 
     return BulkUploadResponse(created=created, skipped=skipped, errors=errors)
@@ -4,12 +4,13 @@ from datetime import date
 from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import select
 
-from app.api.deps import CurrentUser, SessionDep, require
+from app.api.deps import CurrentUser, RedisDep, SessionDep, require
 from app.core.permissions import Permission
 from app.models.academic import AcademicTerm, AcademicYear, Class
 from app.models.school import School
 from app.models.student import StudentClassEnrollment, StudentTermEnrollment
 from app.schemas.student import EnrollmentCreate, EnrollmentResponse, EnrollmentUpdate
+from app.services.dashboard_tiles import mark_dashboard_dirty
 
 from ._helpers import (
     _enrollment_response, _generate_register_number,
@@ -44,6 +45,7 @@ async def enroll_student(
     student_id: uuid.UUID,
     body: EnrollmentCreate,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     school_id = user.school_id
@@ -117,6 +119,7 @@ async def enroll_student(
         ))
 
     await session.commit()
+    await mark_dashboard_dirty(redis, school_id, class_ids=[body.class_id])
     await session.refresh(enrollment)
     return await _enrollment_response(enrollment, session)
 
@@ -129,6 +132,7 @@ async def update_enrollment(
     enrollment_id: uuid.UUID,
     body: EnrollmentUpdate,
     user: CurrentUser,
+    redis: RedisDep,
     session: SessionDep,
 ):
     await _get_student(student_id, user.school_id, session)
@@ -142,9 +146,13 @@ async def update_enrollment(
     if not enrollment:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Enrollment not found")
 
+    previous_class_id = enrollment.class_id
     for field, value in body.model_dump(exclude_unset=True).items():
         setattr(enrollment, field, value)
 
     await session.commit()
+    await mark_dashboard_dirty(
+        redis, user.school_id, class_ids=list({previous_class_id, enrollment.class_id}),
+    )
     await session.refresh(enrollment)
     return await _enrollment_response(enrollment, session)
@@ -0,0 +1,119 @@
+"""
+Per-request auth context — the bearer token is verified once, at the edge.
+
+AuthContextMiddleware (pure ASGI, outside the rate limiter) reads the
+Authorization header, verifies the JWT and stores its claims in the ASGI
+scope under SCOPE_KEY:
+
+    scope["auth_claims"]  →  claims dict  valid access or refresh token
+                          →  None         no bearer token, or it did not verify
+
+RateLimitMiddleware keys on it and get_current_user reads it, so a request
+pays for one signature check instead of two.
+
+The middleware also opens a RequestAuth context (a ContextVar) for the
+request: the same claims plus a memo of resolved permission masks, so the
+require() guard, the handler and TeacherScope share one permission lookup
+(see services.permissions.effective_permission_mask).
+
+Verified tokens are also remembered in a process-local LRU keyed by jti, each
+entry expiring with the token's own exp. A hit still requires the presented
+token to equal the cached one byte for byte, so a jti alone never
+authenticates anything. Failed verifications are not cached.
+"""
+import hmac
+import time
+from collections.abc import MutableMapping
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.lru import MISSING, LRUCache
+from app.core.security import decode_token
+
+SCOPE_KEY = "auth_claims"
+
+_verified = LRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def verify_bearer(token: str) -> dict | None:
+    """Claims of a valid token, or None. Served from the jti LRU when possible."""
+    try:
+        jti = jwt.get_unverified_claims(token).get("jti")
+    except JWTError:
+        return None
+    if jti:
+        cached = _verified.get(jti)
+        if cached is not MISSING and hmac.compare_digest(cached[0], token):
+            return cached[1]
+
+    try:
+        claims = decode_token(token)
+    except JWTError:
+        return None
+    if jti and isinstance(claims.get("exp"), (int, float)):
+        remaining = claims["exp"] - time.time()
+        if remaining > 0:
+            _verified.set(jti, (token, claims), ttl=min(remaining, _verified.ttl))
+    return claims
+
+
+def bearer_token(headers: list[tuple[bytes, bytes]]) -> str | None:
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and credentials:
+                return credentials.strip()
+            return None
+    return None
+
+
+def claims_from_scope(scope: MutableMapping[str, Any]) -> dict | None:
+    """
+    Claims stored by AuthContextMiddleware. If the middleware did not run
+    (e.g. an app assembled without it), verify the header here instead.
+    """
+    if SCOPE_KEY in scope:
+        return scope[SCOPE_KEY]
+    token = bearer_token(scope.get("headers", []))
+    claims = verify_bearer(token) if token else None
+    scope[SCOPE_KEY] = claims
+    return claims
+
+
+def clear_token_cache() -> None:
+    _verified.clear()
+
+
+@dataclass
+class RequestAuth:
+    claims: dict | None
+    permission_masks: dict[str, int] = field(default_factory=dict)  # user id → mask
+
+
+_request_auth: ContextVar[RequestAuth | None] = ContextVar("request_auth", default=None)
+
+
+def current_request_auth() -> RequestAuth | None:
+    """The serving request's auth context, or None outside a request (workers, scripts)."""
+    return _request_auth.get()
+
+
+class AuthContextMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_auth.set(RequestAuth(claims_from_scope(scope)))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_auth.reset(token)
@@ -0,0 +1,69 @@
+"""
+Per-process Redis subscription that keeps in-process cache tiers in step
+with invalidations made by other processes.
+
+A cache module registers its channel with two callbacks: one run for each
+published message (drop the entries it names) and one run after every
+(re)subscribe (drop everything, since anything cached while the
+subscription was down may have missed a message). One subscription carries
+every registered channel; the app lifespan starts and closes it.
+"""
+import asyncio
+import logging
+from collections.abc import Callable
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+_RETRY_DELAY = 1.0
+
+
+class CacheInvalidationListener:
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self._channels: dict[str, tuple[Callable[[str], None], Callable[[], None]]] = {}
+
+    def register(
+        self, channel: str, on_message: Callable[[str], None], on_resubscribe: Callable[[], None]
+    ) -> None:
+        """Route messages on `channel` to `on_message`. Call at import time."""
+        self._channels[channel] = (on_message, on_resubscribe)
+
+    def start(self, redis: Redis) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(redis))
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _listen(self, redis: Redis) -> None:
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(*self._channels)
+                for _, on_resubscribe in self._channels.values():
+                    on_resubscribe()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        on_message, _ = self._channels[message["channel"]]
+                        on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Cache invalidation subscription lost: %s", exc)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass  # Connection already gone
+            await asyncio.sleep(_RETRY_DELAY)
+
+
+listener = CacheInvalidationListener()
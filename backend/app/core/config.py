@@ -1,6 +1,8 @@
 from functools import lru_cache
+from typing import Annotated
+
 from pydantic import field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -20,6 +22,9 @@ class Settings(BaseSettings):
 
     # ── Database ──────────────────────────────────────────────────
     DATABASE_URL: str
+    # Streaming replicas for GET requests (comma-separated); empty = primary only
+    DATABASE_REPLICA_URLS: Annotated[list[str], NoDecode] = []
+    READ_YOUR_WRITES_SECONDS: int = 5   # a user's GETs stay on the primary this long after a write
 
     # ── Redis ─────────────────────────────────────────────────────
     REDIS_URL: str
@@ -28,6 +33,14 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str = "HS256"
+    TOKEN_CACHE_SIZE: int = 10000  # verified access tokens kept per process (see core.auth_context)
+
+    # ── Password hashing (Argon2id) ───────────────────────────────
+    # Changing the cost parameters rehashes each password at its next login.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536     # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_CONCURRENCY: int = 2  # hashes running at once per process (thread pool size)
 
     # ── Permissions ───────────────────────────────────────────────
     PERMISSION_CACHE_TTL: int = 900  # 15 minutes
@@ -36,6 +49,10 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = 300        # per authenticated user
     RATE_LIMIT_UNAUTH_PER_MINUTE: int = 30  # per IP for unauthenticated
 
+    # ── Query metrics ─────────────────────────────────────────────
+    N_PLUS_ONE_THRESHOLD: int = 10   # warn when one statement shape runs more often in a request
+    METRICS_TOKEN: str | None = None  # bearer token for /metrics; unset = open outside production
+
     # ── Sentry ────────────────────────────────────────────────────
     SENTRY_DSN: str | None = None
 
@@ -66,6 +83,13 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in v.split(",")]
         return v
 
+    @field_validator("DATABASE_REPLICA_URLS", mode="before")
+    @classmethod
+    def parse_replica_urls(cls, v: str | list) -> list[str]:
+        if isinstance(v, str):
+            return [url.strip() for url in v.split(",") if url.strip()]
+        return v
+
     @property
     def is_production(self) -> bool:
         return self.APP_ENV == "production"
@@ -1,31 +1,152 @@
+import itertools
 from collections.abc import AsyncGenerator
+from fastapi import Depends, Request
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy import text, event
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.selectable import GenerativeSelect
+from app.core.auth_context import claims_from_scope
 from app.core.config import settings
+from app.core.redis import get_redis
+
+
+def _make_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        pool_size=10,
+        max_overflow=20,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=settings.APP_ENV == "development",
+    )
+
+
+engine = _make_engine(settings.DATABASE_URL)
+replica_engines: list[AsyncEngine] = [_make_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+_next_replica = itertools.cycle(replica_engines)
+
+
+class RLSSession(Session):
+    """
+    Session that applies the Row Level Security school context lazily.
+
+    set_rls_context only records the school in session.info. The after_begin
+    hook below issues set_config on the connection when a transaction
+    actually starts — i.e. together with the request's first statement — and
+    again for every transaction after a commit (set_config(..., true) is
+    transaction-local). A request answered entirely from cache never checks
+    out a pooled connection.
+    """
+
+
+@event.listens_for(RLSSession, "after_begin")
+def _apply_rls_context(session: Session, transaction, connection) -> None:
+    school_id = session.info.get("school_id")
+    if school_id:
+        connection.execute(
+            text("SELECT set_config('app.school_id', :school_id, true)"),
+            {"school_id": school_id},
+        )
+
+
+# ── Read-replica routing ──────────────────────────────────────────
+# get_session pins a GET request's session to one replica (round-robin over
+# DATABASE_REPLICA_URLS) unless the caller wrote within the last
+# READ_YOUR_WRITES_SECONDS. Inside a session only plain SELECTs go to the
+# replica: DML, text() statements, SELECT … FOR UPDATE, bare connection()
+# calls and flushes always go to the primary, and once the session has
+# written every later statement does too. Commits that wrote set the caller's
+# read-your-writes marker. Both engines' transactions get the RLS context
+# through RLSSession.after_begin.
+
+def _recent_write_key(user_id: str) -> str:
+    return f"db:rw:{user_id}"
+
+
+def _read_only(clause) -> bool:
+    """A SELECT (or UNION of them) that takes no row locks."""
+    return isinstance(clause, GenerativeSelect) and clause._for_update_arg is None
+
+
+class RoutingSession(RLSSession):
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        replica = self.info.get("replica")
+        if (
+            replica is None
+            or self.info.get("wrote")
+            or self._flushing
+            or not _read_only(clause)
+        ):
+            return super().get_bind(mapper, clause=clause, **kw)
+        return replica.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flag_flush(session: Session, flush_context) -> None:
+    session.info["wrote"] = session.info["unmarked_write"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _flag_dml(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = state.session.info["unmarked_write"] = True
+
+
+class RoutingAsyncSession(AsyncSession):
+    async def commit(self) -> None:
+        await super().commit()
+        if self.info.pop("unmarked_write", False):
+            await mark_recent_write(self)
+
+
+async def mark_recent_write(session: AsyncSession) -> None:
+    """Keep the session's user on the primary for READ_YOUR_WRITES_SECONDS."""
+    redis, user_id = session.info.get("redis"), session.info.get("user_id")
+    if not replica_engines or redis is None or not user_id:
+        return
+    try:
+        await redis.set(_recent_write_key(user_id), "1", ex=settings.READ_YOUR_WRITES_SECONDS)
+    except Exception:
+        pass  # Marker is best-effort; the write itself succeeded
+
+
+async def route_session(
+    session: AsyncSession, method: str, claims: dict | None, redis: Redis
+) -> None:
+    """Pin a request's session to a replica when that is safe."""
+    user_id = claims.get("sub") if claims else None
+    session.info["redis"], session.info["user_id"] = redis, user_id
+    if not replica_engines or method not in ("GET", "HEAD"):
+        return
+    if user_id:
+        try:
+            if await redis.exists(_recent_write_key(user_id)):
+                return
+        except Exception:
+            return  # Redis unavailable — the primary is always correct
+    session.info["replica"] = next(_next_replica)
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.APP_ENV == "development",
-)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
-    class_=AsyncSession,
+    class_=RoutingAsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autoflush=False,
 )
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(
+    request: Request, redis: Redis = Depends(get_redis)
+) -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
+        await route_session(session, request.method, claims_from_scope(request.scope), redis)
         try:
             yield session
         except Exception:
@@ -34,11 +155,24 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def set_rls_context(session: AsyncSession, school_id: str) -> None:
-    """Set the PostgreSQL session variable for Row Level Security."""
-    await session.execute(
-        text("SELECT set_config('app.school_id', :school_id, true)"),
-        {"school_id": str(school_id)},
-    )
+    """
+    Set the PostgreSQL session variable for Row Level Security.
+
+    Deferred to the next transaction start (see RLSSession). If a transaction
+    is already open it is also applied at once, on every connection the
+    session holds — a replica session may have both the primary and the
+    replica open.
+    """
+    session.info["school_id"] = str(school_id)
+    if session.in_transaction():
+        await session.run_sync(_apply_to_open_connections)
+
+
+def _apply_to_open_connections(session: Session) -> None:
+    transaction = session.get_transaction()
+    # _connections maps both the Connection and its Engine to the same entry
+    for connection in {conn for conn, *_ in transaction._connections.values()}:
+        _apply_rls_context(session, transaction, connection)
 
 
 async def check_db_health() -> bool:
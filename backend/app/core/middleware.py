@@ -1,94 +1,209 @@
-import time
-from collections.abc import Callable
+"""
+Pure ASGI middleware — rate limiting, request IDs and SQL query metrics.
+
+Both are plain ASGI callables rather than BaseHTTPMiddleware subclasses:
+no extra task or memory stream per request, and StreamingResponse bodies
+(XLSX templates, exports, the roll-call SSE stream) pass through chunk by
+chunk instead of being relayed through a buffer.
+"""
+import logging
+import re
+import uuid
+from contextvars import ContextVar
+
+import sentry_sdk
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import rate_limit
+from app.core.auth_context import claims_from_scope
+from app.core.config import settings
+from app.core.query_metrics import QueryStats, query_stats_var, record_request
 
-from fastapi import Request, Response, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+logger = logging.getLogger(__name__)
 
-from app.core.config import settings
+# Request ID of the request being served in this context ("-" outside one)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_INCOMING_ID = re.compile(r"[A-Za-z0-9._-]{1,128}")
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
-    Sliding-window rate limiter backed by Redis.
+    Token-bucket rate limiter backed by Redis (see core.rate_limit).
 
     Key strategy:
-    - Authenticated requests (Bearer token present): keyed by user_id decoded
-      from the JWT — no DB lookup, just a local verify. Each user gets their
-      own RATE_LIMIT_PER_MINUTE bucket.
+    - Authenticated requests (Bearer token present): keyed by user_id from the
+      claims AuthContextMiddleware already verified — no DB lookup, no second
+      decode. Each user gets their own RATE_LIMIT_PER_MINUTE bucket.
     - Unauthenticated requests: keyed by real client IP resolved from
       X-Forwarded-For / X-Real-IP (covers reverse-proxy and Docker setups).
       Budget is RATE_LIMIT_UNAUTH_PER_MINUTE (stricter, brute-force protection).
 
-    Always exempt: /health, /verify (public doc verification).
+    Costs at most one Redis round trip per request, and none for a client
+    that is already being refused. Responses carry RateLimit-* headers.
+
+    Always exempt: /health, /metrics, /verify (public doc verification).
     """
 
-    EXEMPT_PREFIXES = ("/api/v1/health", "/api/v1/verify", "/api/v1/public")
+    EXEMPT_PREFIXES = ("/api/v1/health", "/api/v1/metrics", "/api/v1/verify", "/api/v1/public")
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-    def _resolve_key(self, request: Request) -> tuple[str, int]:
+    def _resolve_key(self, scope: Scope) -> tuple[str, int]:
         """Return (redis_key, limit) for this request."""
 
         # ── Authenticated: key by user_id from JWT ─────────────────
-        auth = request.headers.get("Authorization", "")
-        if auth.startswith("Bearer "):
-            try:
-                from jose import JWTError, jwt as _jwt
-                payload = _jwt.decode(
-                    auth[7:],
-                    settings.SECRET_KEY,
-                    algorithms=[settings.ALGORITHM],
-                )
-                user_id = payload.get("sub", "")
-                if user_id:
-                    return f"ratelimit:u:{user_id}", settings.RATE_LIMIT_PER_MINUTE
-            except Exception:
-                pass  # invalid/expired token — fall through to IP-based limit
+        # Invalid/expired tokens have no claims — fall through to IP-based limit
+        claims = claims_from_scope(scope)
+        user_id = claims.get("sub") if claims else None
+        if user_id:
+            return f"ratelimit:u:{user_id}", settings.RATE_LIMIT_PER_MINUTE
 
         # ── Unauthenticated: key by real IP ────────────────────────
         # X-Forwarded-For may be a comma-separated list; leftmost is the client.
-        forwarded = request.headers.get("X-Forwarded-For", "")
+        headers = Headers(scope=scope)
+        forwarded = headers.get("x-forwarded-for", "")
+        client = scope.get("client")
         real_ip = (
             forwarded.split(",")[0].strip()
-            or request.headers.get("X-Real-IP", "")
-            or (request.client.host if request.client else "unknown")
+            or headers.get("x-real-ip", "")
+            or (client[0] if client else "unknown")
         )
         return f"ratelimit:ip:{real_ip}", settings.RATE_LIMIT_UNAUTH_PER_MINUTE
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if any(request.url.path.startswith(p) for p in self.EXEMPT_PREFIXES):
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
         from app.core.redis import get_redis
 
+        decision = None
         try:
-            redis = get_redis()
-            key, limit = self._resolve_key(request)
-            minute = int(time.time() // 60)
-            bucket = f"{key}:{minute}"
-
-            count = await redis.incr(bucket)
-            if count == 1:
-                await redis.expire(bucket, 60)
-
-            if count > limit:
-                return JSONResponse(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    content={"detail": "Rate limit exceeded. Try again in a minute."},
-                    headers={"Retry-After": "60", "X-RateLimit-Limit": str(limit)},
-                )
+            key, limit = self._resolve_key(scope)
+            decision = await rate_limit.hit(get_redis(), key, limit)
         except Exception:
             # Redis unavailable — fail open rather than blocking traffic
             pass
 
-        return await call_next(request)
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not decision.allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Try again shortly."},
+                headers=decision.headers(),
+            )
+            await response(scope, receive, send)
+            return
+
+        extra = [(k.lower().encode(), v.encode()) for k, v in decision.headers().items()]
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *extra]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class RequestIDMiddleware:
+    """
+    Attach a request ID to every response for traceability.
+
+    A well-formed X-Request-ID from the proxy is kept; otherwise a UUID is
+    generated. The ID is available to log records as %(request_id)s (see
+    install_request_id_logging) and tagged on Sentry events.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get("x-request-id", "")
+        request_id = incoming if _INCOMING_ID.fullmatch(incoming) else str(uuid.uuid4())
+        token = request_id_var.set(request_id)
+        if settings.SENTRY_DSN:
+            sentry_sdk.set_tag("request_id", request_id)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []), (b"x-request-id", request_id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class QueryMetricsMiddleware:
+    """
+    Count and time the SQL each request runs (see core.query_metrics).
+
+    Outside production, responses carry X-DB-Query-Count, X-DB-Time-Ms and
+    X-DB-Repeated-Max (runs of the most repeated statement shape), as of the
+    moment headers are sent. When the request finishes, its totals go to the
+    per-route histograms, and any statement shape run more than
+    N_PLUS_ONE_THRESHOLD times is logged as a likely N+1 loop.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats_var.set(stats)
+
+        async def send_with_metrics(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                most = stats.shapes.most_common(1)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()),
+                    (b"x-db-repeated-max", str(most[0][1] if most else 0).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send if settings.is_production else send_with_metrics)
+        finally:
+            query_stats_var.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            record_request(route, stats)
+            for shape, n in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "Possible N+1: %s %s ran the same statement %d times: %.300s",
+                    scope["method"], route, n, shape,
+                )
+
 
+def install_request_id_logging() -> None:
+    """Give every log record a request_id attribute (idempotent)."""
+    current = logging.getLogRecordFactory()
+    if getattr(current, "_adds_request_id", False):
+        return
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Attach a unique request ID to every response for traceability."""
+    def factory(*args, **kwargs) -> logging.LogRecord:
+        record = current(*args, **kwargs)
+        record.request_id = request_id_var.get()
+        return record
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        import uuid
-        request_id = str(uuid.uuid4())
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        return response
+    factory._adds_request_id = True
+    logging.setLogRecordFactory(factory)
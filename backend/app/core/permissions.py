@@ -126,3 +126,61 @@ POSITION_DEFAULTS: dict[str, dict[str, bool]] = {
         Permission.GENERATE_REPORTS: True,
     },
 }
+
+
+# ── Bitmask encoding ──────────────────────────────────────────────
+# A user's resolved permissions travel as one integer (bit i = PERMISSION_BITS[i])
+# in the Redis cache and in access-token claims. The order is APPEND-ONLY:
+# add new permissions at the end. Removing or reordering bits requires
+# bumping PERMISSION_BITS_VERSION, which makes every cached mask and every
+# outstanding token's mask fall back to a fresh resolve.
+
+PERMISSION_BITS_VERSION = 1
+
+PERMISSION_BITS: tuple[Permission, ...] = (
+    Permission.VIEW_STUDENTS,
+    Permission.ENROLL_STUDENTS,
+    Permission.TRANSFER_STUDENTS,
+    Permission.VIEW_STAFF,
+    Permission.MANAGE_STAFF,
+    Permission.MANAGE_PROMOTIONS,
+    Permission.VIEW_SCORES,
+    Permission.ENTER_SCORES,
+    Permission.APPROVE_SCORES,
+    Permission.MANAGE_TIMETABLE,
+    Permission.MARK_ATTENDANCE,
+    Permission.VIEW_ATTENDANCE,
+    Permission.GENERATE_REPORTS,
+    Permission.REVOKE_DOCUMENTS,
+    Permission.VIEW_FEES,
+    Permission.RECORD_PAYMENTS,
+    Permission.MANAGE_FEE_STRUCTURE,
+    Permission.WAIVE_FEES,
+    Permission.SEND_SMS,
+    Permission.SEND_ANNOUNCEMENTS,
+    Permission.MANAGE_HOUSES,
+    Permission.MANAGE_EXEATS,
+    Permission.NIGHT_ROLL_CALL,
+    Permission.MANAGE_SCHOOL_CONFIG,
+    Permission.MANAGE_ACADEMIC_STRUCTURE,
+    Permission.MANAGE_USERS,
+    Permission.VIEW_ANALYTICS,
+)
+
+_BIT: dict[str, int] = {p.value: 1 << i for i, p in enumerate(PERMISSION_BITS)}
+
+
+def permissions_to_mask(perms: dict[str, bool]) -> int:
+    mask = 0
+    for key, granted in perms.items():
+        if granted and key in _BIT:
+            mask |= _BIT[key]
+    return mask
+
+
+def mask_to_permissions(mask: int) -> dict[str, bool]:
+    return {p: bool(mask & _BIT[p]) for p in ALL_PERMISSIONS}
+
+
+def mask_has(mask: int, permission: Permission | str) -> bool:
+    return bool(mask & _BIT.get(str(permission), 0))
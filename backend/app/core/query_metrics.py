@@ -0,0 +1,138 @@
+"""
+Per-request SQL metrics and an N+1 detector.
+
+Cursor events on every Engine (primary, replicas, worker and test engines)
+time each statement and add it to the QueryStats of the request being
+served, if any — QueryMetricsMiddleware (core.middleware) opens one per HTTP
+request through a ContextVar. Statements outside a request cost one
+ContextVar lookup.
+
+Each statement is reduced to a fingerprint: parameters, literals and the
+expanded placeholder lists of IN (…) collapse to "?", so a per-row loop
+shows up as one shape repeated many times. At the end of a request the
+middleware feeds the route's histograms and logs a warning for any shape
+run more than N_PLUS_ONE_THRESHOLD times.
+
+Histograms are process-local and rendered in the Prometheus text format by
+GET /api/v1/metrics. Not thread-safe — event loop only.
+"""
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    db_time: float = 0.0            # seconds
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes run more than `threshold` times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+# Stats of the request being served in this context (None outside one)
+query_stats_var: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+\b|\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Statement shape: whitespace, literals and parameters normalised."""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if query_stats_var.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = query_stats_var.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.count += 1
+    stats.db_time += time.perf_counter() - started.pop()
+    stats.shapes[fingerprint(statement)] += 1
+
+
+# ── Histograms ────────────────────────────────────────────────────────────────
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, Prometheus-style."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        # label value → (bucket counts, [sum])
+        self._series: dict[str, tuple[list[int], list[float]]] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        counts, total = self._series.setdefault(label_value, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(self._series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total[0]:g}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+queries_per_request = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", "route",
+    (1, 2, 5, 10, 20, 50, 100, 200),
+)
+db_seconds_per_request = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", "route",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+def record_request(route: str, stats: QueryStats) -> None:
+    queries_per_request.observe(route, stats.count)
+    db_seconds_per_request.observe(route, stats.db_time)
+
+
+def render_metrics() -> str:
+    lines = [*queries_per_request.render(), *db_seconds_per_request.render()]
+    return "\n".join(lines) + "\n"
+
+
+def clear_metrics() -> None:
+    queries_per_request.clear()
+    db_seconds_per_request.clear()
@@ -0,0 +1,119 @@
+"""
+Token-bucket rate limiting — one atomic Redis script per request.
+
+Each key owns a bucket of `limit` tokens that refills continuously over
+_WINDOW_MS, so a client can never burst past `limit` requests in any 60 s
+span (unlike fixed minute windows, which allowed 2× at the boundary).
+The bucket lives in a small Redis hash updated by a Lua script, invoked by
+EVALSHA — a single round trip that reads, refills, spends and re-arms the
+TTL atomically. Time comes from the Redis server, so API processes with
+skewed clocks still share one bucket.
+
+Denials are remembered in-process until the bucket could next admit a
+request: a client hammering while over its limit is rejected locally,
+without touching Redis at all.
+"""
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+from app.core.lru import MISSING, LRUCache
+
+_WINDOW_MS = 60_000
+
+# KEYS[1] bucket hash; ARGV[1] capacity, ARGV[2] full-refill window (ms).
+# Returns {allowed, remaining, retry_after_ms, reset_ms}.
+_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = capacity / window
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), retry, math.ceil((capacity - tokens) / rate)}
+"""
+_TOKEN_BUCKET_SHA = hashlib.sha1(_TOKEN_BUCKET.encode()).hexdigest()
+
+# key → (limit, monotonic deadline) of a denial still in force
+_denied = LRUCache(maxsize=10_000, ttl=_WINDOW_MS / 1000)
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int          # seconds until the bucket is full again
+    retry_after: int    # seconds until the next request can succeed (0 when allowed)
+
+    def headers(self) -> dict[str, str]:
+        """IETF RateLimit-* fields (plus Retry-After on denial)."""
+        h = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": f"{self.limit};w={_WINDOW_MS // 1000}",
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(self.retry_after)
+        return h
+
+
+async def hit(redis: Redis, key: str, limit: int) -> RateLimitDecision:
+    """Spend one token from `key`'s bucket. Raises on Redis errors (caller fails open)."""
+    denied_until = _denied.get(key)
+    if denied_until is not MISSING:
+        return _local_denial(limit, denied_until)
+
+    allowed, remaining, retry_ms, reset_ms = await _eval(redis, key, limit)
+    decision = RateLimitDecision(
+        allowed=bool(allowed),
+        limit=limit,
+        remaining=int(remaining),
+        reset=math.ceil(int(reset_ms) / 1000),
+        retry_after=math.ceil(int(retry_ms) / 1000),
+    )
+    if not decision.allowed:
+        ttl = int(retry_ms) / 1000
+        _denied.set(key, time.monotonic() + ttl, ttl=ttl)
+    return decision
+
+
+def clear_local_denials() -> None:
+    _denied.clear()
+
+
+async def _eval(redis: Redis, key: str, limit: int) -> list:
+    try:
+        return await redis.evalsha(_TOKEN_BUCKET_SHA, 1, key, limit, _WINDOW_MS)
+    except NoScriptError:
+        # First call after a Redis restart/flush — EVAL loads the script
+        return await redis.eval(_TOKEN_BUCKET, 1, key, limit, _WINDOW_MS)
+
+
+def _local_denial(limit: int, denied_until: float) -> RateLimitDecision:
+    wait = max(1, math.ceil(denied_until - time.monotonic()))
+    return RateLimitDecision(
+        allowed=False, limit=limit, remaining=0,
+        reset=_WINDOW_MS // 1000, retry_after=wait,
+    )
@@ -41,12 +41,17 @@ async def check_redis_health() -> bool:
 
 # ── Helpers ───────────────────────────────────────────────────────
 
-async def invalidate_permission_cache(redis: Redis, user_id: str) -> None:
-    """Drop the entire permission cache entry for a user on any permission change."""
-    await redis.delete(f"perm:{user_id}")
+def permission_generation_key(school_id: str) -> str:
+    return f"perm:gen:{school_id}"
 
 
 async def invalidate_school_permission_cache(redis: Redis, school_id: str) -> None:
-    """Drop all staff permission caches for a school (e.g. on position rename)."""
-    async for key in redis.scan_iter(f"perm:school:{school_id}:*"):
-        await redis.delete(key)
+    """
+    Invalidate every staff permission cache entry of a school with one INCR.
+
+    Entries are keyed perm:{school_id}:{generation}:{user_id} (see
+    services.permissions); moving the generation orphans them all at once and
+    they expire on their own TTL. Access tokens embed the generation too, so
+    their permission masks stop being trusted at the same moment.
+    """
+    await redis.incr(permission_generation_key(school_id))
@@ -1,19 +1,67 @@
+import asyncio
 import hashlib
 import hmac
+import logging
 import secrets
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 
 from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
 from jose import JWTError, jwt
 
 from app.core.config import settings
 
-_ph = PasswordHasher()
+logger = logging.getLogger(__name__)
+
+_ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
 
 
 # ── Passwords ─────────────────────────────────────────────────────
+# Argon2 takes tens of milliseconds of CPU per call. Async handlers use the
+# *_async variants, which run on a small dedicated thread pool (argon2-cffi
+# releases the GIL) so the event loop keeps serving other requests. The pool
+# size caps concurrent hashes; excess calls queue, and the time they spend
+# queued is recorded in password_hash_stats (scraped via GET /api/v1/metrics).
+
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_CONCURRENCY, thread_name_prefix="argon2",
+)
+_SLOW_QUEUE_WAIT = 0.25  # seconds; log when a hash waited longer than this
+
+
+@dataclass
+class PasswordHashStats:
+    calls: int = 0
+    in_flight: int = 0              # queued + running
+    queue_wait_total: float = 0.0   # seconds
+    queue_wait_max: float = 0.0
+    hash_time_total: float = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "waiting": max(0, self.in_flight - settings.PASSWORD_HASH_CONCURRENCY),
+            "queue_wait_avg_ms": (
+                round(self.queue_wait_total / self.calls * 1000, 2) if self.calls else 0.0
+            ),
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+            "hash_time_avg_ms": (
+                round(self.hash_time_total / self.calls * 1000, 2) if self.calls else 0.0
+            ),
+        }
+
+
+password_hash_stats = PasswordHashStats()
+
 
 def hash_password(password: str) -> str:
     return _ph.hash(password)
@@ -26,9 +74,61 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
+def password_needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with other parameters than the current Settings."""
+    try:
+        return _ph.check_needs_rehash(hashed)
+    except InvalidHashError:
+        return False
+
+
+async def hash_password_async(password: str) -> str:
+    return await _off_loop(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _off_loop(verify_password, plain, hashed)
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter()
+
+
+async def _off_loop(fn, *args):
+    loop = asyncio.get_running_loop()
+    stats = password_hash_stats
+    stats.in_flight += 1
+    submitted = time.perf_counter()
+    try:
+        result, started, finished = await loop.run_in_executor(_hash_pool, _timed, fn, *args)
+    finally:
+        stats.in_flight -= 1
+
+    waited = started - submitted
+    stats.calls += 1
+    stats.queue_wait_total += waited
+    stats.queue_wait_max = max(stats.queue_wait_max, waited)
+    stats.hash_time_total += finished - started
+    if waited > _SLOW_QUEUE_WAIT:
+        logger.warning(
+            "Password hash waited %.0f ms for a worker (%d in flight) — "
+            "consider raising PASSWORD_HASH_CONCURRENCY",
+            waited * 1000, stats.in_flight,
+        )
+    return result
+
+
 # ── JWT ───────────────────────────────────────────────────────────
 
-def create_access_token(user_id: str, school_id: str | None, system_role: str) -> str:
+def create_access_token(
+    user_id: str,
+    school_id: str | None,
+    system_role: str,
+    perm_claims: dict | None = None,
+) -> str:
+    """perm_claims: permission mask claims from services.permissions.token_permission_claims."""
     expire = datetime.now(UTC) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {
         "sub": str(user_id),
@@ -37,6 +137,7 @@ def create_access_token(user_id: str, school_id: str | None, system_role: str) -
         "exp": expire,
         "type": "access",
         "jti": str(uuid.uuid4()),
+        **(perm_claims or {}),
     }
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
@@ -1,3 +1,4 @@
+import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -9,22 +10,40 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 
 from app.core.config import settings
-from app.core.middleware import RateLimitMiddleware, RequestIDMiddleware
-from app.core.redis import init_redis, close_redis
+from app.core.auth_context import AuthContextMiddleware
+from app.core.cache_listener import listener as cache_listener
+from app.core.middleware import (
+    QueryMetricsMiddleware,
+    RateLimitMiddleware,
+    RequestIDMiddleware,
+    install_request_id_logging,
+)
+from app.core.redis import get_redis, init_redis, close_redis
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ── Startup ───────────────────────────────────────────────────
     await init_redis()
+    cache_listener.start(get_redis())
     if settings.STORAGE_BACKEND == "local":
         Path(settings.UPLOADS_DIR).mkdir(parents=True, exist_ok=True)
     yield
     # ── Shutdown ──────────────────────────────────────────────────
+    from app.services.roll_call import hub as roll_call_hub
+    await roll_call_hub.close()
+    await cache_listener.close()
     await close_redis()
 
 
 def create_app() -> FastAPI:
+    install_request_id_logging()
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
+        )
+
     if settings.SENTRY_DSN:
         sentry_sdk.init(
             dsn=settings.SENTRY_DSN,
@@ -52,6 +71,8 @@ def create_app() -> FastAPI:
         allow_headers=["Content-Type", "Authorization"],
     )
     app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(AuthContextMiddleware)   # verifies the JWT once, before the limiter
+    app.add_middleware(QueryMetricsMiddleware)  # inside RequestID, so N+1 warnings carry the ID
     app.add_middleware(RequestIDMiddleware)
 
     # ── Routers ───────────────────────────────────────────────────
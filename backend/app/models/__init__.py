@@ -35,7 +35,7 @@ from app.models.student import (  # noqa: F401
     StudentTermEnrollment,
     StudentBehaviourRecord,
 )
-from app.models.attendance import AttendanceRecord  # noqa: F401
+from app.models.attendance import AttendanceRecord, AttendanceTally  # noqa: F401
 from app.models.assessment import StudentSubjectRegistration, Score  # noqa: F401
 from app.models.fees import FeeStructure, FeePayment  # noqa: F401
 from app.models.document import DocumentRecord, ImportBatch  # noqa: F401
@@ -52,7 +52,7 @@ __all__ = [
     "House", "Class", "ClassSubject", "ClassTeacher", "SubjectTeacher",
     "Student", "Guardian",
     "StudentClassEnrollment", "StudentTermEnrollment", "StudentBehaviourRecord",
-    "AttendanceRecord",
+    "AttendanceRecord", "AttendanceTally",
     "StudentSubjectRegistration", "Score",
     "FeeStructure", "FeePayment",
     "DocumentRecord", "ImportBatch",
@@ -1,8 +1,8 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, UniqueConstraint
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -23,11 +23,23 @@ class AttendanceRecord(UUIDPrimaryKey, TimestampMixin, Base):
 
     Attendance % formula:
         present / COUNT(SchoolCalendar WHERE day_type='SCHOOL_DAY' AND period IS NULL)
+
+    The table is RANGE-partitioned by attendance_date (one partition per
+    month, created by generate_term_calendar — see migration 20250604_017).
+    attendance_date duplicates school_calendar.date so queries can prune to
+    a single partition; always filter on it alongside school_calendar_id.
     """
 
     __tablename__ = "attendance_record"
     __table_args__ = (
-        UniqueConstraint("student_term_enrollment_id", "school_calendar_id", "school_period_id"),
+        # NULLS NOT DISTINCT so daily rows (period NULL) are a valid ON CONFLICT target
+        UniqueConstraint(
+            "student_term_enrollment_id", "school_calendar_id", "school_period_id",
+            "attendance_date",
+            name="uq_attendance_record_slot",
+            postgresql_nulls_not_distinct=True,
+        ),
+        {"postgresql_partition_by": "RANGE (attendance_date)"},
     )
 
     school_id: Mapped[uuid.UUID] = mapped_column(
@@ -47,6 +59,8 @@ class AttendanceRecord(UUIDPrimaryKey, TimestampMixin, Base):
         nullable=False,
         index=True,
     )
+    # Partition key; always equal to school_calendar.date
+    attendance_date: Mapped[date] = mapped_column(Date, primary_key=True)
     # NULL = daily; populated = per-lesson (future)
     school_period_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True),
@@ -67,3 +81,33 @@ class AttendanceRecord(UUIDPrimaryKey, TimestampMixin, Base):
     school_calendar: Mapped["SchoolCalendar"] = relationship(
         back_populates="attendance_records"
     )
+
+
+class AttendanceTally(Base):
+    """
+    Running daily-attendance counts for one term enrollment, so term
+    percentages are a primary-key lookup instead of a scan of attendance_record.
+
+    Maintained in the same transaction as every register write by
+    app.services.attendance.save_daily_records (status changes on re-submission
+    move a count from the old status to the new one).
+    Repair from raw records with scripts/rebuild_attendance_tally.py.
+    """
+
+    __tablename__ = "attendance_tally"
+
+    student_term_enrollment_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("student_term_enrollment.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    school_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("school.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    present: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    absent: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    late: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    excused: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -0,0 +1,458 @@
+"""
+Attendance service helpers shared by the register endpoints.
+
+Daily record writes
+───────────────────
+save_daily_records is the single write path for daily attendance. In one
+transaction it:
+  1. locks the affected term enrollments (FOR NO KEY UPDATE, id order) so
+     concurrent submissions for the same students serialise,
+  2. reads the statuses being replaced,
+  3. upserts every record with one INSERT … ON CONFLICT,
+  4. applies the resulting count deltas to attendance_tally in one upsert.
+The statement count is constant whatever the number of records.
+rebuild_attendance_tally recomputes the counters from the raw records.
+
+attendance_record is partitioned by attendance_date (monthly).
+ensure_attendance_partitions creates the partitions covering a date range;
+generate_term_calendar calls it so a term's months exist before its first
+register. Every per-day query here filters on attendance_date to prune to
+one partition.
+
+Submitted-today tracking
+────────────────────────
+A Redis set per calendar day holds the ids of classes whose register has
+been submitted:
+
+    att:submitted:{school_calendar_id}  →  {class_id, class_id, …, "*"}
+
+submit_register SADDs its class after commit. Readers answer "who hasn't
+marked yet" with one SMEMBERS. The "*" sentinel is only added when the set is
+warmed from the database, so a set without it (Redis restarted mid-morning)
+is treated as incomplete and rebuilt with a single SELECT DISTINCT.
+Redis failures always fall back to the database.
+
+Offline sync
+────────────
+Devices that marked registers offline push them with save_synced_records
+(newest marked_at wins) and pull everything changed since their last sync
+with attendance_changes_since. The sync cursor is an opaque
+(updated_at, id) keyset position. When a pull is complete the cursor is set
+a little behind the database clock (_SYNC_CURSOR_LAG), so rows committed by
+transactions that were still in flight are sent again next time rather than
+missed. Clients apply changes by slot, so repeats are harmless.
+"""
+import base64
+import logging
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attendance import AttendanceRecord, AttendanceTally
+from app.models.student import StudentClassEnrollment, StudentTermEnrollment
+from app.services.calendar_cache import DayInfo
+
+logger = logging.getLogger(__name__)
+
+# status → attendance_tally column
+_TALLY_COLUMNS = {
+    "PRESENT": "present",
+    "ABSENT": "absent",
+    "LATE": "late",
+    "EXCUSED": "excused",
+}
+
+
+# ── Daily record writes ───────────────────────────────────────────────────────
+
+class DailyMark(NamedTuple):
+    """One daily attendance record to write (see save_synced_records)."""
+    term_enrollment_id: UUID
+    school_calendar_id: UUID
+    attendance_date: date
+    status: str
+    note: str | None
+    marked_at: datetime
+
+
+async def save_daily_records(
+    session: AsyncSession,
+    *,
+    school_id: UUID,
+    school_calendar_id: UUID,
+    attendance_date: date,
+    marked_by: UUID,
+    marked_at: datetime,
+    entries: dict[UUID, tuple[str, str | None]],
+) -> tuple[int, int]:
+    """
+    Upsert daily attendance for one calendar day and keep attendance_tally in step.
+
+    attendance_date must be the calendar row's date (the partition key).
+    entries maps term_enrollment_id → (status, note). Does not commit.
+    Returns (created, updated).
+    """
+    marks = [
+        DailyMark(ste_id, school_calendar_id, attendance_date, status_, note, marked_at)
+        for ste_id, (status_, note) in entries.items()
+    ]
+    return await _upsert_daily_records(
+        session, school_id=school_id, marked_by=marked_by, marks=marks, newer_only=False
+    )
+
+
+async def save_synced_records(
+    session: AsyncSession,
+    *,
+    school_id: UUID,
+    marked_by: UUID,
+    marks: list[DailyMark],
+) -> tuple[int, int, int]:
+    """
+    Upsert daily attendance captured offline, across any number of days.
+
+    Conflicts are resolved by marked_at: a mark only replaces a stored record
+    that was marked earlier, so replaying an old queue never overwrites a
+    later correction. A slot listed twice keeps its latest mark.
+    Does not commit. Returns (created, updated, stale), where stale counts
+    marks ignored because the stored record is at least as recent.
+    """
+    latest: dict[tuple[UUID, UUID], DailyMark] = {}
+    for mark in marks:
+        key = (mark.term_enrollment_id, mark.school_calendar_id)
+        if key not in latest or mark.marked_at > latest[key].marked_at:
+            latest[key] = mark
+    created, updated = await _upsert_daily_records(
+        session, school_id=school_id, marked_by=marked_by,
+        marks=list(latest.values()), newer_only=True,
+    )
+    return created, updated, len(latest) - created - updated
+
+
+async def _upsert_daily_records(
+    session: AsyncSession,
+    *,
+    school_id: UUID,
+    marked_by: UUID,
+    marks: list[DailyMark],
+    newer_only: bool,
+) -> tuple[int, int]:
+    """Shared write path: one lock, one read, one upsert, one tally upsert."""
+    if not marks:
+        return 0, 0
+    marks = sorted(marks, key=lambda m: (m.term_enrollment_id, m.attendance_date))
+    ste_ids = sorted({m.term_enrollment_id for m in marks})
+
+    await session.execute(
+        select(StudentTermEnrollment.id)
+        .where(StudentTermEnrollment.id.in_(ste_ids))
+        .order_by(StudentTermEnrollment.id)
+        .with_for_update(key_share=True)
+    )
+    previous: dict[tuple[UUID, UUID], str] = {
+        (ste_id, cal_id): status_
+        for ste_id, cal_id, status_ in await session.execute(
+            select(
+                AttendanceRecord.student_term_enrollment_id,
+                AttendanceRecord.school_calendar_id,
+                AttendanceRecord.status,
+            ).where(
+                AttendanceRecord.attendance_date.in_({m.attendance_date for m in marks}),
+                AttendanceRecord.school_calendar_id.in_({m.school_calendar_id for m in marks}),
+                AttendanceRecord.school_period_id.is_(None),
+                AttendanceRecord.student_term_enrollment_id.in_(ste_ids),
+            )
+        )
+    }
+
+    stmt = pg_insert(AttendanceRecord).values([
+        {
+            "school_id": school_id,
+            "student_term_enrollment_id": m.term_enrollment_id,
+            "school_calendar_id": m.school_calendar_id,
+            "attendance_date": m.attendance_date,
+            "school_period_id": None,
+            "status": m.status,
+            "marked_by": marked_by,
+            "marked_at": m.marked_at,
+            "note": m.note,
+        }
+        for m in marks
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            AttendanceRecord.student_term_enrollment_id,
+            AttendanceRecord.school_calendar_id,
+            AttendanceRecord.school_period_id,
+            AttendanceRecord.attendance_date,
+        ],
+        set_={
+            "status": stmt.excluded.status,
+            "note": stmt.excluded.note,
+            "marked_by": stmt.excluded.marked_by,
+            "marked_at": stmt.excluded.marked_at,
+            "updated_at": func.now(),
+        },
+        # Rows skipped by the WHERE are not returned, so they leave the tally alone
+        where=AttendanceRecord.marked_at < stmt.excluded.marked_at if newer_only else None,
+    ).returning(
+        AttendanceRecord.student_term_enrollment_id,
+        AttendanceRecord.school_calendar_id,
+        AttendanceRecord.status,
+        literal_column("xmax = 0").label("inserted"),  # xmax = 0 → fresh insert
+    )
+    written = (await session.execute(stmt)).all()
+
+    # One delta row per enrollment — ON CONFLICT cannot touch a row twice
+    deltas: dict[UUID, dict] = {}
+    for ste_id, cal_id, new_status, _ in written:
+        old_status = previous.get((ste_id, cal_id))
+        if old_status == new_status:
+            continue
+        delta = deltas.setdefault(ste_id, {
+            "student_term_enrollment_id": ste_id,
+            "school_id": school_id,
+            **dict.fromkeys(_TALLY_COLUMNS.values(), 0),
+        })
+        delta[_TALLY_COLUMNS[new_status]] += 1
+        if old_status in _TALLY_COLUMNS:
+            delta[_TALLY_COLUMNS[old_status]] -= 1
+
+    if deltas:
+        tally = pg_insert(AttendanceTally).values(list(deltas.values()))
+        await session.execute(
+            tally.on_conflict_do_update(
+                index_elements=[AttendanceTally.student_term_enrollment_id],
+                set_={
+                    **{
+                        col: getattr(AttendanceTally, col) + getattr(tally.excluded, col)
+                        for col in _TALLY_COLUMNS.values()
+                    },
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+    created = sum(1 for *_, inserted in written if inserted)
+    return created, len(written) - created
+
+
+async def rebuild_attendance_tally(
+    session: AsyncSession, school_id: UUID | None = None
+) -> int:
+    """
+    Recompute attendance_tally from attendance_record (all schools, or one).
+    Does not commit. Returns the number of tally rows written.
+
+    Takes LOCK TABLE attendance_tally IN SHARE ROW EXCLUSIVE MODE first, held
+    until the caller commits. It conflicts with the ROW EXCLUSIVE lock every
+    register write takes for its tally upsert, so a write that has already
+    applied its delta commits before the rebuild reads attendance_record, and
+    one that has not yet applied it waits and adds it on top of the rebuilt
+    rows. Register writes for every school stall for the rebuild's duration.
+    """
+    wipe = delete(AttendanceTally)
+    source = select(
+        AttendanceRecord.student_term_enrollment_id,
+        AttendanceRecord.school_id,
+        *(
+            func.count().filter(AttendanceRecord.status == status_)
+            for status_ in _TALLY_COLUMNS
+        ),
+    ).where(AttendanceRecord.school_period_id.is_(None))
+    if school_id is not None:
+        wipe = wipe.where(AttendanceTally.school_id == school_id)
+        source = source.where(AttendanceRecord.school_id == school_id)
+    source = source.group_by(
+        AttendanceRecord.student_term_enrollment_id, AttendanceRecord.school_id
+    )
+
+    await session.execute(text("LOCK TABLE attendance_tally IN SHARE ROW EXCLUSIVE MODE"))
+    await session.execute(wipe)
+    result = await session.execute(
+        pg_insert(AttendanceTally).from_select(
+            ["student_term_enrollment_id", "school_id", *_TALLY_COLUMNS.values()],
+            source,
+        )
+    )
+    return result.rowcount
+
+
+async def ensure_attendance_partitions(
+    start: date, end: date, session: AsyncSession
+) -> int:
+    """
+    Create any missing monthly attendance_record partitions covering start..end.
+    Idempotent and safe to call concurrently. Returns the number created.
+    """
+    return await session.scalar(
+        text("SELECT attendance_record_ensure_partitions(:start, :end)"),
+        {"start": start, "end": end},
+    )
+
+
+# ── Submitted-today tracking ──────────────────────────────────────────────────
+
+_SUBMITTED_PREFIX = "att:submitted"
+_SUBMITTED_TTL = 36 * 3600  # the school day plus slack for late edits
+_COMPLETE = "*"
+
+
+def _submitted_key(school_calendar_id: str | UUID) -> str:
+    return f"{_SUBMITTED_PREFIX}:{school_calendar_id}"
+
+
+async def submitted_class_ids(
+    cal: DayInfo,
+    redis: Redis,
+    session: AsyncSession,
+) -> set[UUID]:
+    """Classes with at least one daily attendance record on this calendar day."""
+    key = _submitted_key(cal.id)
+    try:
+        members = await redis.smembers(key)
+        if _COMPLETE in members:
+            return {UUID(m) for m in members if m != _COMPLETE}
+    except Exception:
+        pass  # Redis unavailable — fall through to DB
+
+    rows = await session.scalars(
+        select(StudentClassEnrollment.class_id)
+        .distinct()
+        .join(
+            StudentTermEnrollment,
+            StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+        )
+        .join(
+            AttendanceRecord,
+            AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
+        )
+        .where(
+            AttendanceRecord.attendance_date == cal.date,
+            AttendanceRecord.school_calendar_id == cal.id,
+            AttendanceRecord.school_period_id.is_(None),
+        )
+    )
+    class_ids = set(rows)
+
+    try:
+        await redis.sadd(key, _COMPLETE, *(str(c) for c in class_ids))
+        await redis.expire(key, _SUBMITTED_TTL)
+    except Exception:
+        pass  # Cache write failure is non-fatal
+    return class_ids
+
+
+async def record_class_submitted(
+    school_calendar_id: UUID,
+    class_id: UUID,
+    redis: Redis,
+) -> None:
+    """Add a class to the day's submitted set. Call after the register commit."""
+    key = _submitted_key(school_calendar_id)
+    try:
+        await redis.sadd(key, str(class_id))
+        await redis.expire(key, _SUBMITTED_TTL)
+    except Exception as exc:
+        logger.warning("Could not record submission for class %s: %s", class_id, exc)
+
+
+# ── Offline sync ──────────────────────────────────────────────────────────────
+
+_SYNC_CURSOR_LAG = timedelta(seconds=30)  # longer than any register transaction
+_NIL_UUID = UUID(int=0)
+
+
+class SyncChange(NamedTuple):
+    term_enrollment_id: UUID
+    class_id: UUID
+    attendance_date: date
+    status: str
+    note: str | None
+    marked_at: datetime
+    marked_by: UUID
+    updated_at: datetime
+    id: UUID
+
+
+def encode_sync_cursor(updated_at: datetime, record_id: UUID) -> str:
+    raw = f"{updated_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_sync_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Raises ValueError on a malformed cursor."""
+    stamp, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    updated_at = datetime.fromisoformat(stamp)
+    if updated_at.tzinfo is None:
+        raise ValueError("Sync cursor timestamp has no timezone")
+    return updated_at, UUID(record_id)
+
+
+async def attendance_changes_since(
+    session: AsyncSession,
+    *,
+    class_ids: set[UUID],
+    since_date: date,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[SyncChange], str, bool]:
+    """
+    Daily records for the given classes changed after cursor, oldest first.
+
+    since_date bounds the scan to the partitions a device can care about
+    (the current term). Returns (changes, next_cursor, has_more).
+    Raises ValueError on a malformed cursor.
+    """
+    position = decode_sync_cursor(cursor) if cursor else None
+    read_at = await session.scalar(select(func.clock_timestamp()))
+
+    stmt = (
+        select(
+            AttendanceRecord.student_term_enrollment_id,
+            StudentClassEnrollment.class_id,
+            AttendanceRecord.attendance_date,
+            AttendanceRecord.status,
+            AttendanceRecord.note,
+            AttendanceRecord.marked_at,
+            AttendanceRecord.marked_by,
+            AttendanceRecord.updated_at,
+            AttendanceRecord.id,
+        )
+        .join(
+            StudentTermEnrollment,
+            AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
+        )
+        .join(
+            StudentClassEnrollment,
+            StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+        )
+        .where(
+            AttendanceRecord.attendance_date >= since_date,
+            AttendanceRecord.school_period_id.is_(None),
+            StudentClassEnrollment.class_id.in_(class_ids),
+        )
+        .order_by(AttendanceRecord.updated_at, AttendanceRecord.id)
+        .limit(limit + 1)
+    )
+    if position is not None:
+        stmt = stmt.where(
+            tuple_(AttendanceRecord.updated_at, AttendanceRecord.id) > tuple_(*position)
+        )
+    changes = [SyncChange(*row) for row in await session.execute(stmt)]
+
+    has_more = len(changes) > limit
+    if has_more:
+        changes = changes[:limit]
+        next_cursor = encode_sync_cursor(changes[-1].updated_at, changes[-1].id)
+    else:
+        floor = read_at - _SYNC_CURSOR_LAG
+        if position is not None and position[0] > floor:
+            floor = position[0]
+        next_cursor = encode_sync_cursor(floor, _NIL_UUID)
+    return changes, next_cursor, has_more
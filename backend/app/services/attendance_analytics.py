@@ -0,0 +1,125 @@
+"""
+Attendance analytics over mv_attendance_summary.
+
+The materialized view (migration 20250605_018) holds daily status counts per
+(school, term, class, day, gender). Trend queries aggregate it instead of
+scanning attendance_record, so they cost the same however many records a
+school has. Figures are as fresh as the last refresh:
+
+  • refresh_analytics_views (ARQ cron, every 6 h) refreshes unconditionally;
+  • register writes call mark_attendance_analytics_dirty, and
+    refresh_attendance_analytics_after_writes (ARQ cron, every 15 min)
+    refreshes only when that flag is set — i.e. shortly after each roll-call
+    window, and not at all on quiet days.
+
+The view has no RLS (Postgres does not support it on materialized views);
+every query here filters on school_id.
+"""
+import logging
+from collections.abc import Sequence
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import (
+    Date,
+    Integer,
+    String,
+    cast,
+    column,
+    func,
+    literal_column,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+VIEW_NAME = "mv_attendance_summary"
+_DIRTY_KEY = "analytics:attendance:dirty"
+
+mv_attendance_summary = table(
+    VIEW_NAME,
+    column("school_id", PG_UUID(as_uuid=True)),
+    column("academic_term_id", PG_UUID(as_uuid=True)),
+    column("class_id", PG_UUID(as_uuid=True)),
+    column("attendance_date", Date),
+    column("gender", String),
+    column("present", Integer),
+    column("absent", Integer),
+    column("late", Integer),
+    column("excused", Integer),
+    column("marked", Integer),
+)
+_mv = mv_attendance_summary.c
+
+_COUNTS = (
+    func.count(func.distinct(_mv.attendance_date)).label("days"),
+    func.sum(_mv.marked).label("marked"),
+    func.sum(_mv.present).label("present"),
+    func.sum(_mv.absent).label("absent"),
+    func.sum(_mv.late).label("late"),
+    func.sum(_mv.excused).label("excused"),
+)
+
+
+async def _trend(
+    session: AsyncSession, key, school_id: UUID, term_id: UUID, class_id: UUID | None
+) -> Sequence[Row]:
+    stmt = (
+        select(key, *_COUNTS)
+        .where(_mv.school_id == school_id, _mv.academic_term_id == term_id)
+        .group_by(key)
+        .order_by(key)
+    )
+    if class_id is not None:
+        stmt = stmt.where(_mv.class_id == class_id)
+    return (await session.execute(stmt)).all()
+
+
+async def trend_by_class(
+    session: AsyncSession, school_id: UUID, term_id: UUID
+) -> Sequence[Row]:
+    """Rows of (class_id, days, marked, present, absent, late, excused)."""
+    return await _trend(session, _mv.class_id, school_id, term_id, None)
+
+
+async def trend_by_gender(
+    session: AsyncSession, school_id: UUID, term_id: UUID, class_id: UUID | None = None
+) -> Sequence[Row]:
+    """Rows of (gender, days, marked, …), one per gender."""
+    return await _trend(session, _mv.gender, school_id, term_id, class_id)
+
+
+async def trend_by_week(
+    session: AsyncSession, school_id: UUID, term_id: UUID, class_id: UUID | None = None
+) -> Sequence[Row]:
+    """Rows of (week_start, days, marked, …), Monday-based weeks in order."""
+    week = cast(
+        func.date_trunc(literal_column("'week'"), _mv.attendance_date), Date,
+    ).label("week_start")
+    return await _trend(session, week, school_id, term_id, class_id)
+
+
+# ── Refresh ───────────────────────────────────────────────────────────────────
+
+async def refresh_attendance_summary(session: AsyncSession) -> None:
+    """REFRESH … CONCURRENTLY — readers are never blocked. Commits."""
+    await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}"))
+    await session.commit()
+
+
+async def mark_attendance_analytics_dirty(redis: Redis) -> None:
+    """Flag that attendance changed since the last refresh. Call after commit."""
+    try:
+        await redis.set(_DIRTY_KEY, "1")
+    except Exception as exc:
+        logger.warning("Could not flag attendance analytics for refresh: %s", exc)
+
+
+async def take_attendance_analytics_dirty(redis: Redis) -> bool:
+    """Read and clear the dirty flag in one step."""
+    return await redis.getdel(_DIRTY_KEY) is not None
@@ -0,0 +1,191 @@
+"""
+Term attendance export — students × school days, as CSV or XLSX.
+
+Rows are produced one student at a time from a single server-side cursor
+(AsyncSession.stream with yield_per), ordered so that all of a student's
+records arrive together. Memory therefore holds one student's row plus one
+fetch batch, whatever the size of the school.
+
+    CSV   chunks of ~64 KB are yielded as they fill; the header row is sent
+          before the first database fetch so the download starts at once.
+    XLSX  openpyxl write-only mode streams rows to a temporary file; the zip
+          container can only be finalised at the end, so bytes start flowing
+          once the workbook is saved (off the event loop) and are then sent
+          in chunks.
+
+Cell codes: P present, A absent, L late, E excused, blank not marked.
+"""
+import asyncio
+import csv
+import io
+import os
+import re
+import tempfile
+from collections.abc import AsyncIterator
+from datetime import date
+from uuid import UUID
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.academic import Class, SchoolCalendar
+from app.models.attendance import AttendanceRecord
+from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+
+_YIELD_PER = 2000
+_CSV_CHUNK = 64 * 1024
+_FILE_CHUNK = 256 * 1024
+_CODES = {"PRESENT": "P", "ABSENT": "A", "LATE": "L", "EXCUSED": "E"}
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+async def term_school_days(
+    session: AsyncSession, school_id: UUID, term_id: UUID
+) -> list[date]:
+    return list(await session.scalars(
+        select(SchoolCalendar.date)
+        .where(
+            SchoolCalendar.school_id == school_id,
+            SchoolCalendar.academic_term_id == term_id,
+            SchoolCalendar.day_type == "SCHOOL_DAY",
+        )
+        .order_by(SchoolCalendar.date)
+    ))
+
+
+def header_row(days: list[date]) -> list[str]:
+    return [
+        "Class", "Register No.", "Student", "Gender",
+        *(d.isoformat() for d in days),
+        "Present", "Absent", "Late", "Excused", "Attendance %",
+    ]
+
+
+async def iter_student_rows(
+    session: AsyncSession,
+    *,
+    school_id: UUID,
+    term_id: UUID,
+    class_names: dict[UUID, str],
+    days: list[date],
+) -> AsyncIterator[list]:
+    """
+    Yield one export row per term enrollment in the given classes, ordered
+    by class then student name.
+    """
+    if not class_names or not days:
+        return
+    column = {d: i for i, d in enumerate(days)}
+
+    stmt = (
+        select(
+            StudentTermEnrollment.id,
+            StudentClassEnrollment.class_id,
+            StudentClassEnrollment.register_number,
+            Student.first_name,
+            Student.middle_name,
+            Student.last_name,
+            Student.gender,
+            AttendanceRecord.attendance_date,
+            AttendanceRecord.status,
+        )
+        .join(StudentClassEnrollment, StudentClassEnrollment.student_id == Student.id)
+        .join(Class, Class.id == StudentClassEnrollment.class_id)
+        .join(
+            StudentTermEnrollment,
+            and_(
+                StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+                StudentTermEnrollment.academic_term_id == term_id,
+            ),
+        )
+        .outerjoin(
+            AttendanceRecord,
+            and_(
+                AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
+                AttendanceRecord.attendance_date.between(days[0], days[-1]),
+                AttendanceRecord.school_period_id.is_(None),
+            ),
+        )
+        .where(
+            Student.school_id == school_id,
+            Student.is_active.is_(True),
+            StudentClassEnrollment.class_id.in_(list(class_names)),
+            StudentClassEnrollment.status == "ACTIVE",
+        )
+        .order_by(
+            Class.level, Class.year, Class.stream, Class.id,
+            Student.last_name,
+            Student.first_name,
+            StudentTermEnrollment.id,
+        )
+        .execution_options(yield_per=_YIELD_PER)
+    )
+
+    def _finish(current: list | None) -> list | None:
+        if current is None:
+            return None
+        counts = current.pop()
+        pct = round((counts["P"] + counts["L"]) / len(days) * 100, 1)
+        return current + [counts["P"], counts["A"], counts["L"], counts["E"], pct]
+
+    current: list | None = None
+    current_id: UUID | None = None
+    result = await session.stream(stmt)
+    async for ste_id, class_id, register_number, first, middle, last, gender, day, status in result:
+        if ste_id != current_id:
+            finished = _finish(current)
+            if finished is not None:
+                yield finished
+            current_id = ste_id
+            name = " ".join(p for p in (first, middle, last) if p)
+            current = [class_names[class_id], register_number or "", name, gender,
+                       *([""] * len(days)), {"P": 0, "A": 0, "L": 0, "E": 0}]
+        if day is not None and day in column and status in _CODES:
+            code = _CODES[status]
+            current[4 + column[day]] = code
+            current[-1][code] += 1
+    finished = _finish(current)
+    if finished is not None:
+        yield finished
+
+
+async def csv_chunks(header: list[str], rows: AsyncIterator[list]) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    yield "\ufeff" + buf.getvalue()  # BOM so Excel opens UTF-8 names correctly
+    buf.seek(0)
+    buf.truncate()
+    async for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= _CSV_CHUNK:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+async def xlsx_chunks(
+    title: str, header: list[str], rows: AsyncIterator[list]
+) -> AsyncIterator[bytes]:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=re.sub(r"[\\/?*\[\]:]", "-", title)[:31])
+    ws.freeze_panes = "E2"
+    ws.append(header)
+    async for row in rows:
+        ws.append(row)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(wb.save, path)
+        with open(path, "rb") as fh:
+            while chunk := fh.read(_FILE_CHUNK):
+                yield chunk
+    finally:
+        os.unlink(path)
@@ -0,0 +1,227 @@
+"""
+School calendar cache — current academic year, current term and calendar days.
+
+These rows change a few times a term but are read by nearly every attendance
+and dashboard request, so lookups go through two cache tiers:
+
+    in-process LRU (30 s)  →  Redis hash (24 h)  →  database
+
+Redis layout
+────────────
+    cal:gen:{school_id}          →  generation counter (absent = 0)
+    cal:{school_id}:{gen}        →  hash
+        year                     →  JSON YearInfo | "null"
+        term                     →  JSON TermInfo | "null"
+        day:2025-10-06           →  JSON DayInfo  | "null"
+
+invalidate_school_calendar INCRs the generation, so every cached value for
+the school is abandoned at once (no SCAN) and a reader that loaded the old
+data just before the change writes it under a generation nobody reads.
+It also drops the school's local entries and publishes the school id on
+cal:invalidate; every API process listens on that channel (through
+app.core.cache_listener) and drops its own. A fill that was in flight when
+a drop happened skips the local write, so it cannot put the old value back.
+If the subscription is down, local entries still expire after _LOCAL_TTL.
+
+Values are plain NamedTuples, not ORM objects — they carry the columns the
+hot paths need and are safe to share across sessions.
+Redis failures fall back to the database.
+"""
+import json
+import logging
+from collections.abc import Callable
+from datetime import date
+from typing import Any, NamedTuple
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache_listener import listener
+from app.core.lru import MISSING, LRUCache
+from app.models.academic import AcademicTerm, AcademicYear, SchoolCalendar
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cal:invalidate"
+_LOCAL_TTL = 30.0
+_REDIS_TTL = 24 * 3600
+_local = LRUCache(maxsize=4096, ttl=_LOCAL_TTL)
+_local_invalidations = 0   # bumped on every local drop; a fill that saw it change skips _local.set
+
+
+class YearInfo(NamedTuple):
+    id: UUID
+    name: str
+    start_date: date
+    end_date: date
+
+
+class TermInfo(NamedTuple):
+    id: UUID
+    academic_year_id: UUID
+    name: str
+    start_date: date
+    end_date: date
+    year_name: str
+
+
+class DayInfo(NamedTuple):
+    id: UUID
+    academic_term_id: UUID
+    date: date
+    day_type: str
+    label: str | None
+
+
+# ── Public lookups ────────────────────────────────────────────────────────────
+
+async def get_current_year(
+    school_id: UUID, redis: Redis, session: AsyncSession
+) -> YearInfo | None:
+    async def load() -> YearInfo | None:
+        year = await session.scalar(
+            select(AcademicYear).where(
+                AcademicYear.school_id == school_id,
+                AcademicYear.is_current.is_(True),
+            )
+        )
+        return YearInfo(year.id, year.name, year.start_date, year.end_date) if year else None
+
+    return await _cached(school_id, "year", redis, load, YearInfo)
+
+
+async def get_current_term(
+    school_id: UUID, redis: Redis, session: AsyncSession
+) -> TermInfo | None:
+    async def load() -> TermInfo | None:
+        pair = (await session.execute(
+            select(AcademicTerm, AcademicYear.name)
+            .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
+            .where(
+                AcademicYear.school_id == school_id,
+                AcademicTerm.is_current.is_(True),
+            )
+            .limit(1)
+        )).first()
+        if not pair:
+            return None
+        term, year_name = pair
+        return TermInfo(
+            term.id, term.academic_year_id, term.name, term.start_date, term.end_date, year_name,
+        )
+
+    return await _cached(school_id, "term", redis, load, TermInfo)
+
+
+async def get_calendar_day(
+    school_id: UUID, day: date, redis: Redis, session: AsyncSession
+) -> DayInfo | None:
+    """The school's calendar row for a date (any day_type), or None."""
+    async def load() -> DayInfo | None:
+        entry = await session.scalar(
+            select(SchoolCalendar)
+            .join(AcademicTerm, SchoolCalendar.academic_term_id == AcademicTerm.id)
+            .join(AcademicYear, AcademicTerm.academic_year_id == AcademicYear.id)
+            .where(
+                SchoolCalendar.school_id == school_id,
+                SchoolCalendar.date == day,
+                AcademicYear.school_id == school_id,
+            )
+            .limit(1)
+        )
+        if not entry:
+            return None
+        return DayInfo(entry.id, entry.academic_term_id, entry.date, entry.day_type, entry.label)
+
+    return await _cached(school_id, f"day:{day.isoformat()}", redis, load, DayInfo)
+
+
+async def invalidate_school_calendar(school_id: UUID, redis: Redis) -> None:
+    """Call after committing any change to a school's years, terms or calendar."""
+    _drop_local(str(school_id))
+    try:
+        await redis.incr(_gen_key(school_id))
+        await redis.publish(CHANNEL, str(school_id))
+    except Exception as exc:
+        logger.warning("Could not invalidate calendar cache for school %s: %s", school_id, exc)
+
+
+def clear_local_cache() -> None:
+    """Drop every in-process entry (tests, or after a bulk data fix)."""
+    global _local_invalidations
+    _local_invalidations += 1
+    _local.clear()
+
+
+# ── Internals ─────────────────────────────────────────────────────────────────
+
+def _drop_local(school_id: str) -> None:
+    global _local_invalidations
+    _local_invalidations += 1
+    _local.discard_where(lambda key: key[0] == school_id)
+
+
+def _gen_key(school_id: UUID) -> str:
+    return f"cal:gen:{school_id}"
+
+
+def _encode(value: tuple | None) -> str:
+    if value is None:
+        return "null"
+    return json.dumps(value._asdict(), default=str)
+
+
+def _decode(raw: str, kind: type) -> Any:
+    data = json.loads(raw)
+    if data is None:
+        return None
+    for name, annotation in kind.__annotations__.items():
+        if data[name] is None:
+            continue
+        if annotation is UUID:
+            data[name] = UUID(data[name])
+        elif annotation is date:
+            data[name] = date.fromisoformat(data[name])
+    return kind(**data)
+
+
+async def _cached(
+    school_id: UUID,
+    field: str,
+    redis: Redis,
+    load: Callable[[], Any],
+    kind: type,
+) -> Any:
+    local_key = (str(school_id), field)
+    value = _local.get(local_key)
+    if value is not MISSING:
+        return value
+
+    invalidations = _local_invalidations
+    hash_key = None
+    try:
+        gen = await redis.get(_gen_key(school_id)) or 0
+        hash_key = f"cal:{school_id}:{gen}"
+        raw = await redis.hget(hash_key, field)
+        if raw is not None:
+            value = _decode(raw, kind)
+    except Exception:
+        pass  # Redis unavailable — fall through to DB
+
+    if value is MISSING:
+        value = await load()
+        if hash_key is not None:
+            try:
+                await redis.hset(hash_key, field, _encode(value))
+                await redis.expire(hash_key, _REDIS_TTL)
+            except Exception:
+                pass  # Cache write failure is non-fatal
+
+    if invalidations == _local_invalidations:
+        _local.set(local_key, value)
+    return value
+
+
+listener.register(CHANNEL, _drop_local, clear_local_cache)
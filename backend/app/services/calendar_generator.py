@@ -10,6 +10,9 @@ Algorithm:
 
 Easter and Farmers Day are computed dynamically per year.
 Fixed-date holidays are loaded from GhanaPublicHoliday table.
+
+The attendance_record partitions for the term's months are created here
+too, so registers never land in the default partition.
 """
 import logging
 from datetime import date, timedelta
@@ -20,6 +23,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.academic import AcademicTerm, SchoolCalendar
 from app.models.reference import GhanaPublicHoliday
 from app.models.school import SchoolSchedule
+from app.services.attendance import ensure_attendance_partitions
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +86,11 @@ async def generate_term_calendar(
         current += timedelta(days=1)
 
     session.add_all(rows)
+    created_partitions = await ensure_attendance_partitions(
+        term.start_date, term.end_date, session
+    )
+    if created_partitions:
+        logger.info("Created %d attendance_record partition(s)", created_partitions)
     logger.info(
         "Generated %d calendar rows (%d school days) for term %s",
         len(rows),
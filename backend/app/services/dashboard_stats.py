@@ -0,0 +1,435 @@
+"""
+Dashboard figures — admin statistics and teacher class lists.
+
+Admin statistics
+────────────────
+
+Every figure on the admin tile comes from a single SELECT over single-row
+CTEs (staff, classes, students, today's attendance), so a dashboard load is
+one round trip. The current year and today's calendar row come from
+calendar_cache and are bound as parameters.
+
+Results are cached in Redis for a few seconds:
+
+    dash:admin:{school_id}        →  JSON counts (TTL _TTL)
+    dash:admin:{school_id}:lock   →  recompute lock (SET NX, TTL _LOCK_TTL_MS)
+
+On a miss, concurrent requests in one process share a single computation
+(an asyncio future per school); across processes the SET NX lock lets one
+process compute while the others poll the cache key briefly before falling
+back to computing themselves. A burst of admins opening the dashboard at
+the start of the day therefore costs one statement, not one per request.
+Redis failures fall back to computing directly.
+
+Teacher classes
+───────────────
+compute_my_classes builds a teacher's class list (subjects with
+registration counts, today's attendance status) with a fixed number of
+grouped queries, whatever the number of classes and subjects.
+"""
+import asyncio
+import json
+import logging
+from datetime import date
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import and_, exists, func, literal, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.academic import Class, ClassSubject, ClassTeacher, SubjectTeacher
+from app.models.assessment import StudentSubjectRegistration
+from app.models.attendance import AttendanceRecord
+from app.models.staff import StaffMember
+from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+from app.models.user import User
+from app.services.calendar_cache import (
+    DayInfo,
+    get_calendar_day,
+    get_current_term,
+    get_current_year,
+)
+
+logger = logging.getLogger(__name__)
+
+_TTL = 5                  # seconds an admin tile may be stale
+_LOCK_TTL_MS = 3000       # upper bound on one computation
+_POLL_INTERVAL = 0.05     # seconds between cache polls while another process computes
+_POLL_ATTEMPTS = 20
+
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _key(school_id: UUID) -> str:
+    return f"dash:admin:{school_id}"
+
+
+def admin_stats_statement(
+    school_id: UUID, year_id: UUID | None, today_cal: DayInfo | None
+):
+    """
+    The admin tile as one SELECT: a cross join of single-row CTEs.
+
+    today_cal must be a SCHOOL_DAY row or None (no attendance expected).
+    """
+    staff = (
+        select(
+            func.count().label("staff_total"),
+            func.count().filter(
+                ~exists().where(
+                    User.staff_member_id == StaffMember.id,
+                    User.is_active.is_(True),
+                )
+            ).label("staff_no_account"),
+        )
+        .where(StaffMember.school_id == school_id, StaffMember.is_active.is_(True))
+        .cte("staff")
+    )
+    # With no current year nothing can be assigned, so every class counts
+    classes = (
+        select(
+            func.count().label("classes_total"),
+            func.count().filter(
+                ~exists().where(
+                    ClassTeacher.class_id == Class.id,
+                    ClassTeacher.academic_year_id == year_id,
+                )
+            ).label("classes_no_teacher"),
+        )
+        .where(Class.school_id == school_id, Class.is_active.is_(True))
+        .cte("classes")
+    )
+    students = (
+        select(func.count().label("students_total"))
+        .where(Student.school_id == school_id, Student.is_active.is_(True))
+        .cte("students")
+    )
+    if today_cal is not None:
+        attendance = (
+            select(func.count(func.distinct(StudentClassEnrollment.class_id)).label("submitted"))
+            .join(Class, Class.id == StudentClassEnrollment.class_id)
+            .join(
+                StudentTermEnrollment,
+                StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+            )
+            .join(
+                AttendanceRecord,
+                AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
+            )
+            .where(
+                Class.school_id == school_id,
+                Class.is_active.is_(True),
+                AttendanceRecord.attendance_date == today_cal.date,
+                AttendanceRecord.school_calendar_id == today_cal.id,
+            )
+            .cte("attendance")
+        )
+        submitted = attendance.c.submitted
+    else:
+        attendance = None
+        submitted = literal(0)
+
+    stmt = select(
+        staff.c.staff_total,
+        staff.c.staff_no_account,
+        classes.c.classes_total,
+        classes.c.classes_no_teacher,
+        students.c.students_total,
+        submitted.label("attendance_submitted_today"),
+    ).select_from(staff).join(classes, true()).join(students, true())
+    if attendance is not None:
+        stmt = stmt.join(attendance, true())
+    return stmt
+
+
+async def compute_admin_stats(
+    school_id: UUID, redis: Redis, session: AsyncSession, today: date | None = None
+) -> dict[str, int]:
+    """Run the admin statement (uncached). Keys match dashboard.AdminStats."""
+    current_year = await get_current_year(school_id, redis, session)
+    today_cal = await get_calendar_day(school_id, today or date.today(), redis, session)
+    if today_cal and today_cal.day_type != "SCHOOL_DAY":
+        today_cal = None
+
+    row = (await session.execute(
+        admin_stats_statement(school_id, current_year.id if current_year else None, today_cal)
+    )).one()
+    stats = dict(row._mapping)
+    stats["attendance_classes_today"] = stats["classes_total"] if today_cal else 0
+    return stats
+
+
+async def get_admin_stats(
+    school_id: UUID, redis: Redis, session: AsyncSession
+) -> dict[str, int]:
+    """Admin tile counts, at most _TTL seconds old, computed once per burst."""
+    cached = await _read(school_id, redis)
+    if cached is not None:
+        return cached
+
+    school_key = str(school_id)
+    inflight = _inflight.get(school_key)
+    if inflight is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except Exception:
+            pass  # Leader failed — compute with our own session
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[school_key] = future
+    try:
+        stats = await _compute_once(school_id, redis, session)
+    except BaseException as exc:
+        future.set_exception(RuntimeError(f"admin stats computation failed: {exc!r}"))
+        future.exception()  # mark retrieved — followers fall back on their own
+        raise
+    else:
+        future.set_result(stats)
+        return stats
+    finally:
+        _inflight.pop(school_key, None)
+
+
+# ── Teacher classes ───────────────────────────────────────────────────────────
+
+async def _subject_assignments(
+    staff_member_id: UUID, current_year, session, class_ids: list[UUID] | None = None
+) -> list[tuple[ClassSubject, Class]]:
+    """The teacher's active (ClassSubject, Class) assignments this year."""
+    stmt = (
+        select(ClassSubject, Class)
+        .join(Class, ClassSubject.class_id == Class.id)
+        .options(selectinload(Class.learning_area))
+        .join(SubjectTeacher, SubjectTeacher.class_subject_id == ClassSubject.id)
+        .where(
+            SubjectTeacher.staff_member_id == staff_member_id,
+            SubjectTeacher.academic_year_id == current_year.id,
+            SubjectTeacher.is_active.is_(True),
+            ClassSubject.is_active.is_(True),
+        )
+    )
+    if class_ids is None:
+        stmt = stmt.where(Class.is_active.is_(True)).order_by(
+            Class.level, Class.year, Class.stream, ClassSubject.subject_name
+        )
+    else:
+        stmt = stmt.where(ClassSubject.class_id.in_(class_ids)).order_by(ClassSubject.subject_name)
+    return [tuple(row) for row in await session.execute(stmt)]
+
+
+async def _class_counts(
+    class_ids: list[UUID], current_year, current_term, today_cal, session
+) -> dict[UUID, tuple[int, int, int]]:
+    """
+    Per class, in one grouped query: (term_total, enrolled, marked_today).
+
+    term_total counts this term's enrollments; enrolled counts active
+    enrollments this year across terms; marked_today counts daily records on
+    today_cal (0 when today_cal is None).
+    """
+    if not class_ids:
+        return {}
+    term_id = current_term.id if current_term else None
+    if today_cal is not None:
+        marked = func.count(AttendanceRecord.id)
+    else:
+        marked = literal(0)
+    stmt = (
+        select(
+            StudentClassEnrollment.class_id,
+            func.count(func.distinct(StudentTermEnrollment.id)).filter(
+                StudentTermEnrollment.academic_term_id == term_id
+            ),
+            func.count(func.distinct(StudentTermEnrollment.id)),
+            marked,
+        )
+        .join(
+            StudentTermEnrollment,
+            StudentTermEnrollment.student_class_enrollment_id == StudentClassEnrollment.id,
+        )
+        .where(
+            StudentClassEnrollment.class_id.in_(class_ids),
+            StudentClassEnrollment.academic_year_id == current_year.id,
+            StudentClassEnrollment.status == "ACTIVE",
+        )
+        .group_by(StudentClassEnrollment.class_id)
+    )
+    if today_cal is not None:
+        stmt = stmt.outerjoin(
+            AttendanceRecord,
+            and_(
+                AttendanceRecord.student_term_enrollment_id == StudentTermEnrollment.id,
+                AttendanceRecord.attendance_date == today_cal.date,
+                AttendanceRecord.school_calendar_id == today_cal.id,
+                AttendanceRecord.school_period_id.is_(None),
+            ),
+        )
+    return {
+        class_id: (term_total, enrolled, n)
+        for class_id, term_total, enrolled, n in await session.execute(stmt)
+    }
+
+
+async def _subject_list(
+    assignments: list[tuple[ClassSubject, Class]],
+    counts: dict[UUID, tuple[int, int, int]],
+    current_term, session
+) -> dict[str, list[dict]]:
+    """Build subject list with registration counts for each class."""
+    if not assignments or not current_term:
+        return {}
+
+    # Registration counts for every assigned subject in one grouped query
+    registered = dict((await session.execute(
+        select(
+            StudentSubjectRegistration.class_subject_id, func.count(StudentSubjectRegistration.id),
+        )
+        .where(
+            StudentSubjectRegistration.class_subject_id.in_([cs.id for cs, _ in assignments]),
+            StudentSubjectRegistration.is_active.is_(True),
+        )
+        .group_by(StudentSubjectRegistration.class_subject_id)
+    )).all())
+
+    result: dict[str, list[dict]] = {}
+    for cs, cls in assignments:
+        result.setdefault(str(cls.id), []).append(
+            {
+                "class_subject_id": str(cs.id),
+                "subject_name": cs.subject_name,
+                "subject_code": cs.subject_code,
+                "registered_count": registered.get(cs.id, 0),
+                "total_students": counts.get(cls.id, (0, 0, 0))[0],
+            }
+        )
+    return result
+
+
+def _attendance_status(today_cal, enrolled: int, marked: int) -> str:
+    """Return attendance status string for a class today (today_cal: a SCHOOL_DAY or None)."""
+    if not today_cal:
+        return "no_school_day"
+    if enrolled == 0:
+        return "no_students"
+    return "marked" if marked > 0 else "not_marked"
+
+
+async def compute_my_classes(
+    staff_member_id: UUID, school_id: UUID, redis, session
+) -> tuple[list[dict], bool]:
+    """
+    Returns (classes, is_class_teacher); each class is a dict shaped like
+    dashboard.MyClass.
+    Class teachers get their class(es) + subject assignments with registration status.
+    Subject teachers get the distinct classes they teach with subjects listed.
+
+    Query count is fixed whatever the number of classes and subjects: the
+    assignment lookups, one grouped count per class (_class_counts) and one
+    grouped registration count (_subject_list).
+    """
+    current_year = await get_current_year(school_id, redis, session)
+    if not current_year:
+        return [], False
+
+    current_term = await get_current_term(school_id, redis, session)
+    if current_term and current_term.academic_year_id != current_year.id:
+        current_term = None
+
+    # 1. Check class teacher assignment first
+    ct_rows = await session.execute(
+        select(Class)
+        .options(selectinload(Class.learning_area))
+        .join(ClassTeacher, ClassTeacher.class_id == Class.id)
+        .where(
+            ClassTeacher.staff_member_id == staff_member_id,
+            ClassTeacher.academic_year_id == current_year.id,
+            Class.is_active.is_(True),
+        )
+        .order_by(Class.level, Class.year, Class.stream)
+    )
+    class_teacher_classes = list(ct_rows.scalars())
+    if class_teacher_classes:
+        today_cal = await get_calendar_day(school_id, date.today(), redis, session)
+        if today_cal and today_cal.day_type != "SCHOOL_DAY":
+            today_cal = None
+        class_ids = [c.id for c in class_teacher_classes]
+        counts = await _class_counts(class_ids, current_year, current_term, today_cal, session)
+        assignments = (
+            await _subject_assignments(staff_member_id, current_year, session, class_ids)
+            if current_term else []
+        )
+        subj_map = await _subject_list(assignments, counts, current_term, session)
+        result = []
+        for c in class_teacher_classes:
+            _, enrolled, marked = counts.get(c.id, (0, 0, 0))
+            result.append({
+                "id": str(c.id), "name": c.name,
+                "education_level": c.education_level,
+                "level": c.level, "year": c.year, "stream": c.stream,
+                "subjects": subj_map.get(str(c.id), []),
+                "attendance_today": _attendance_status(today_cal, enrolled, marked),
+            })
+        return result, True
+
+    # 2. Fall back to subject teacher assignments
+    all_pairs = await _subject_assignments(staff_member_id, current_year, session)
+    if not all_pairs:
+        return [], False
+
+    seen: dict[str, Class] = {}
+    for _, cls in all_pairs:
+        seen[str(cls.id)] = cls
+
+    counts = (
+        await _class_counts(
+            [cls.id for cls in seen.values()], current_year, current_term, None, session,
+        )
+        if current_term else {}
+    )
+    subj_map = await _subject_list(all_pairs, counts, current_term, session)
+
+    return [
+        {
+            "id": key, "name": cls.name,
+            "education_level": cls.education_level,
+            "level": cls.level, "year": cls.year, "stream": cls.stream,
+            "subjects": subj_map.get(key, []),
+            "attendance_today": "no_school_day",  # subject teachers don't mark attendance
+        }
+        for key, cls in seen.items()
+    ], False
+
+
+# ── Internals ─────────────────────────────────────────────────────────────────
+
+async def _read(school_id: UUID, redis: Redis) -> dict[str, int] | None:
+    try:
+        raw = await redis.get(_key(school_id))
+    except Exception:
+        return None  # Redis unavailable — fall through to DB
+    return json.loads(raw) if raw else None
+
+
+async def _compute_once(school_id: UUID, redis: Redis, session: AsyncSession) -> dict[str, int]:
+    lock_key = f"{_key(school_id)}:lock"
+    try:
+        leader = bool(await redis.set(lock_key, "1", nx=True, px=_LOCK_TTL_MS))
+    except Exception:
+        leader = True  # Redis unavailable — just compute
+
+    if not leader:
+        for _ in range(_POLL_ATTEMPTS):
+            await asyncio.sleep(_POLL_INTERVAL)
+            cached = await _read(school_id, redis)
+            if cached is not None:
+                return cached
+
+    stats = await compute_admin_stats(school_id, redis, session)
+    try:
+        await redis.setex(_key(school_id), _TTL, json.dumps(stats))
+        if leader:
+            await redis.delete(lock_key)
+    except Exception:
+        pass  # Cache write failure is non-fatal
+    return stats
@@ -0,0 +1,215 @@
+"""
+Precomputed dashboard tiles — admin stats and teacher class lists in Redis.
+
+The ARQ worker keeps one hash per school, so /dashboard/summary is normally
+a single HGET:
+
+    dash:tiles:{school_id}            hash (TTL _HASH_TTL)
+        admin                      →  {"at": epoch, "date": iso, "data": {...AdminStats}}
+        teacher:{staff_member_id}  →  {"at": epoch, "date": iso, "data": {"classes": [...],
+                                                                       "is_class_teacher": bool}}
+    dash:dirty                        set of "{school_id}:admin",
+                                      "{school_id}:class:{class_id}",
+                                      "{school_id}:teacher:{staff_member_id}"
+
+Write paths call mark_dashboard_dirty after commit (enrollment, class- and
+subject-teacher assignment, attendance). The worker drains dash:dirty every
+few seconds (refresh_dirty_tiles) and rebuilds every school's tiles on a
+slower cron (precompute_school_tiles). A "class" target expands to the
+class's teachers; every target also refreshes the school's admin tile.
+
+Both tiles carry today's attendance, so a tile is never served over a write
+the worker has not yet folded in. Reads check dash:dirty for the tile's own
+target (and, for a teacher, each of its classes) alongside the HGET:
+
+    queued in dash:dirty              computed inline — the admin tile through
+                                      get_admin_stats, so it is as fresh as
+                                      the uncached path (dashboard_stats._TTL)
+    fresh (younger than _FRESH)       served as is
+    stale (younger than _MAX_STALE)   served, and the tile is flagged dirty
+    missing, too old, or from another day
+                                      computed inline and stored
+
+So a dashboard lags a write by at most dashboard_stats._TTL; _FRESH and
+_MAX_STALE only bound drift that no write path reports. All Redis failures
+degrade to computing inline.
+"""
+import json
+import logging
+import time
+from datetime import date
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.academic import ClassSubject, ClassTeacher, SubjectTeacher
+from app.services.calendar_cache import get_current_year
+from app.services.dashboard_stats import compute_admin_stats, compute_my_classes, get_admin_stats
+
+logger = logging.getLogger(__name__)
+
+_FRESH = 600              # seconds; matches the precompute cron interval
+_MAX_STALE = 1800         # seconds; past this the worker is presumed down
+_HASH_TTL = 24 * 3600
+_DIRTY_KEY = "dash:dirty"
+_DRAIN_BATCH = 1000
+
+
+def _hash_key(school_id: UUID | str) -> str:
+    return f"dash:tiles:{school_id}"
+
+
+# ── Read path ─────────────────────────────────────────────────────────────────
+
+async def get_admin_tile(school_id: UUID, redis: Redis, session: AsyncSession) -> dict:
+    """AdminStats fields for the school, from the precomputed tile when usable."""
+    data = await _read_tile(school_id, "admin", [f"{school_id}:admin"], redis)
+    if data is None:
+        data = await get_admin_stats(school_id, redis, session)
+        await _write_tile(school_id, "admin", data, redis)
+    return data
+
+
+async def get_teacher_tile(
+    staff_member_id: UUID, school_id: UUID, redis: Redis, session: AsyncSession
+) -> tuple[list[dict], bool]:
+    """(classes, is_class_teacher) for a teacher, from the precomputed tile when usable."""
+    field = f"teacher:{staff_member_id}"
+    data = await _read_tile(school_id, field, [f"{school_id}:{field}"], redis)
+    if data is None:
+        classes, is_class_teacher = await compute_my_classes(
+            staff_member_id, school_id, redis, session,
+        )
+        data = {"classes": classes, "is_class_teacher": is_class_teacher}
+        await _write_tile(school_id, field, data, redis)
+    return data["classes"], data["is_class_teacher"]
+
+
+# ── Write-path triggers ───────────────────────────────────────────────────────
+
+async def mark_dashboard_dirty(
+    redis: Redis,
+    school_id: UUID,
+    *,
+    class_ids: tuple[UUID, ...] | list[UUID] = (),
+    staff_member_ids: tuple[UUID, ...] | list[UUID] = (),
+) -> None:
+    """Queue tiles for recompute by the worker. Call after commit."""
+    members = [f"{school_id}:admin"]
+    members += [f"{school_id}:class:{c}" for c in class_ids]
+    members += [f"{school_id}:teacher:{s}" for s in staff_member_ids]
+    try:
+        await redis.sadd(_DIRTY_KEY, *members)
+    except Exception as exc:
+        logger.warning("Could not queue dashboard recompute for school %s: %s", school_id, exc)
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+async def take_dirty_targets(redis: Redis) -> dict[str, set[str]]:
+    """Pop up to _DRAIN_BATCH dirty targets, grouped by school id."""
+    members = await redis.spop(_DIRTY_KEY, _DRAIN_BATCH) or []
+    grouped: dict[str, set[str]] = {}
+    for member in members:
+        school_id, _, target = member.partition(":")
+        grouped.setdefault(school_id, set()).add(target)
+    return grouped
+
+
+async def recompute_tiles(
+    school_id: UUID, targets: set[str], redis: Redis, session: AsyncSession
+) -> int:
+    """Recompute the school's admin tile plus the teacher tiles the targets name."""
+    staff_ids = {UUID(t.split(":", 1)[1]) for t in targets if t.startswith("teacher:")}
+    class_ids = {UUID(t.split(":", 1)[1]) for t in targets if t.startswith("class:")}
+    if class_ids:
+        staff_ids |= await _teachers_of(school_id, class_ids, redis, session)
+
+    admin = await compute_admin_stats(school_id, redis, session)
+    await _write_tile(school_id, "admin", admin, redis)
+    for staff_member_id in staff_ids:
+        await _store_teacher(staff_member_id, school_id, redis, session)
+    return 1 + len(staff_ids)
+
+
+async def precompute_school_tiles(school_id: UUID, redis: Redis, session: AsyncSession) -> int:
+    """Rebuild the admin tile and every assigned teacher's tile for one school."""
+    admin = await compute_admin_stats(school_id, redis, session)
+    await _write_tile(school_id, "admin", admin, redis)
+    staff_ids = await _teachers_of(school_id, None, redis, session)
+    for staff_member_id in staff_ids:
+        await _store_teacher(staff_member_id, school_id, redis, session)
+    return 1 + len(staff_ids)
+
+
+# ── Internals ─────────────────────────────────────────────────────────────────
+
+async def _store_teacher(
+    staff_member_id: UUID, school_id: UUID, redis: Redis, session: AsyncSession
+) -> None:
+    classes, is_class_teacher = await compute_my_classes(staff_member_id, school_id, redis, session)
+    await _write_tile(
+        school_id, f"teacher:{staff_member_id}",
+        {"classes": classes, "is_class_teacher": is_class_teacher}, redis,
+    )
+
+
+async def _teachers_of(
+    school_id: UUID, class_ids: set[UUID] | None, redis: Redis, session: AsyncSession
+) -> set[UUID]:
+    """Class and subject teachers this year, of the given classes or of the whole school."""
+    year = await get_current_year(school_id, redis, session)
+    if year is None:
+        return set()
+    class_teachers = select(ClassTeacher.staff_member_id).where(
+        ClassTeacher.academic_year_id == year.id,
+    )
+    subject_teachers = (
+        select(SubjectTeacher.staff_member_id)
+        .join(ClassSubject, ClassSubject.id == SubjectTeacher.class_subject_id)
+        .where(
+            SubjectTeacher.academic_year_id == year.id,
+            SubjectTeacher.is_active.is_(True),
+        )
+    )
+    if class_ids is not None:
+        class_teachers = class_teachers.where(ClassTeacher.class_id.in_(class_ids))
+        subject_teachers = subject_teachers.where(ClassSubject.class_id.in_(class_ids))
+    return set(await session.scalars(union(class_teachers, subject_teachers)))
+
+
+async def _read_tile(
+    school_id: UUID, field: str, dirty_members: list[str], redis: Redis
+) -> dict | None:
+    """The tile's data if it may be served, else None. dirty_members[0] is the tile's own target."""
+    try:
+        raw = await redis.hget(_hash_key(school_id), field)
+        if raw is None:
+            return None
+        tile = json.loads(raw)
+        for cls in tile["data"].get("classes", ()):
+            dirty_members.append(f"{school_id}:class:{cls['id']}")
+        if any(await redis.smismember(_DIRTY_KEY, dirty_members)):
+            return None  # A write the worker has not drained yet
+    except Exception:
+        return None  # Redis unavailable — fall through to DB
+    age = time.time() - tile["at"]
+    if tile["date"] != date.today().isoformat() or age > _MAX_STALE:
+        return None
+    if age > _FRESH:
+        try:
+            await redis.sadd(_DIRTY_KEY, dirty_members[0])
+        except Exception:
+            pass  # Served stale; the precompute cron will catch up
+    return tile["data"]
+
+
+async def _write_tile(school_id: UUID, field: str, data: dict, redis: Redis) -> None:
+    tile = json.dumps({"at": time.time(), "date": date.today().isoformat(), "data": data})
+    try:
+        await redis.hset(_hash_key(school_id), field, tile)
+        await redis.expire(_hash_key(school_id), _HASH_TTL)
+    except Exception:
+        pass  # Cache write failure is non-fatal
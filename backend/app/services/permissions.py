@@ -8,10 +8,29 @@ Permission resolver — three-layer resolution:
 Union semantics: if ANY assigned role grants a permission, it is granted.
 A personal override (granted=False) can still explicitly deny it.
 
-Results are cached in Redis for PERMISSION_CACHE_TTL seconds.
-Cache is invalidated immediately on any StaffPermission or UserRole write.
+Results are held as a bitmask over PERMISSION_BITS (app.core.permissions)
+and cached in Redis for PERMISSION_CACHE_TTL seconds under a per-school
+generation number:
+
+    perm:gen:{school_id}                    →  generation counter (absent = 0)
+    perm:{school_id}:{generation}:{user_id} →  "{bits_version}:{mask}"
+
+Any permission write in a school — a StaffPermission override, a UserRole
+assignment, a position edit — INCRs the generation
+(invalidate_school_permissions), which invalidates every entry of the
+school at once without a SCAN.
+
+Access tokens carry the mask too ("perms"), stamped with the bit-layout
+version ("pbv") and the school's generation ("pv") at issue time. While a
+token's pv still matches, require() answers from the claims with a bit test
+and no I/O beyond a generation lookup that is itself cached in-process for
+_GENERATION_LOCAL_TTL seconds. Once the generation moves, checks fall back
+to the Redis/DB resolve until the token is refreshed.
+
+Within a request the effective mask is memoized on the RequestAuth context
+(app.core.auth_context): require(), the handler and TeacherScope together
+make at most one lookup.
 """
-import json
 import logging
 from uuid import UUID
 
@@ -19,18 +38,32 @@ from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_context import current_request_auth
 from app.core.config import settings
-from app.core.permissions import ALL_PERMISSIONS, Permission
+from app.core.lru import MISSING, LRUCache
+from app.core.permissions import (
+    ALL_PERMISSIONS,
+    PERMISSION_BITS,
+    PERMISSION_BITS_VERSION,
+    Permission,
+    mask_has,
+    mask_to_permissions,
+    permissions_to_mask,
+)
+from app.core.redis import invalidate_school_permission_cache, permission_generation_key
 from app.models.staff import PositionPermission, StaffPermission
 from app.models.user import User, UserRole
 
 logger = logging.getLogger(__name__)
 
 _CACHE_PREFIX = "perm"
+_ALL_MASK = (1 << len(PERMISSION_BITS)) - 1
+_GENERATION_LOCAL_TTL = 5.0
+_generations = LRUCache(maxsize=4096, ttl=_GENERATION_LOCAL_TTL)
 
 
-def _cache_key(user_id: str | UUID) -> str:
-    return f"{_CACHE_PREFIX}:{user_id}"
+def _cache_key(school_id: str | UUID | None, generation: int, user_id: str | UUID) -> str:
+    return f"{_CACHE_PREFIX}:{school_id or '-'}:{generation}:{user_id}"
 
 
 async def resolve_all_permissions(
@@ -43,20 +76,56 @@ async def resolve_all_permissions(
     Cached in Redis; loads from DB on cache miss.
     SUPERADMIN always returns all True without a DB hit.
     """
+    return mask_to_permissions(await effective_permission_mask(user, redis, session))
+
+
+async def effective_permission_mask(
+    user: User,
+    redis: Redis,
+    session: AsyncSession,
+    claims: dict | None = None,
+) -> int:
+    """
+    The user's mask, resolved at most once per request: the request memo,
+    then the access-token claims while current, then Redis/DB.
+    """
+    ctx = current_request_auth()
+    if ctx is not None:
+        memo = ctx.permission_masks.get(str(user.id))
+        if memo is not None:
+            return memo
+        if claims is None:
+            claims = ctx.claims
+
+    mask = await _claims_mask(user, claims, redis)
+    if mask is None:
+        mask = await resolve_permission_mask(user, redis, session)
+    if ctx is not None:
+        ctx.permission_masks[str(user.id)] = mask
+    return mask
+
+
+async def resolve_permission_mask(
+    user: User,
+    redis: Redis,
+    session: AsyncSession,
+) -> int:
+    """The user's permissions as a PERMISSION_BITS mask (Redis, then DB)."""
     if user.system_role == "SUPERADMIN":
-        return {p: True for p in ALL_PERMISSIONS}
+        return _ALL_MASK
 
-    key = _cache_key(user.id)
+    generation = await permission_generation(user.school_id, redis) if user.school_id else 0
+    key = _cache_key(user.school_id, generation, user.id)
     cached = await redis.get(key)
     if cached:
-        try:
-            return json.loads(cached)
-        except json.JSONDecodeError:
-            pass  # stale/corrupt entry — fall through to DB
+        bits_version, _, mask = cached.partition(":")
+        if bits_version == str(PERMISSION_BITS_VERSION) and mask.isdigit():
+            return int(mask)
+        # stale/corrupt entry (older bit layout) — fall through to DB
 
-    perms = await _load_from_db(user, session)
-    await redis.setex(key, settings.PERMISSION_CACHE_TTL, json.dumps(perms))
-    return perms
+    mask = permissions_to_mask(await _load_from_db(user, session))
+    await redis.setex(key, settings.PERMISSION_CACHE_TTL, f"{PERMISSION_BITS_VERSION}:{mask}")
+    return mask
 
 
 async def check_permission(
@@ -64,26 +133,84 @@ async def check_permission(
     permission: Permission | str,
     redis: Redis,
     session: AsyncSession,
+    claims: dict | None = None,
 ) -> bool:
-    """Single-permission check. Uses the cached full map."""
+    """
+    Single-permission check. Answers from the request memo or the access-token
+    claims when they are current (see module docstring), else from the cache.
+    """
     if user.system_role == "SUPERADMIN":
         return True
     if user.system_role in ("STUDENT", "PARENT"):
         return False
 
-    perms = await resolve_all_permissions(user, redis, session)
-    return perms.get(str(permission), False)
+    return mask_has(await effective_permission_mask(user, redis, session, claims), permission)
+
+
+async def token_permission_claims(
+    user: User,
+    redis: Redis,
+    session: AsyncSession,
+) -> dict:
+    """Extra access-token claims carrying the user's permission mask."""
+    if user.system_role in ("SUPERADMIN", "STUDENT", "PARENT") or not user.school_id:
+        return {}
+    # Generation first: a write landing mid-resolve leaves the token already stale
+    generation = await permission_generation(user.school_id, redis)
+    mask = await resolve_permission_mask(user, redis, session)
+    return {"perms": mask, "pbv": PERMISSION_BITS_VERSION, "pv": generation}
+
+
+async def permission_generation(school_id: str | UUID, redis: Redis) -> int:
+    """Current permission generation of a school (0 until the first write)."""
+    generation = _generations.get(str(school_id))
+    if generation is MISSING:
+        raw = await redis.get(permission_generation_key(str(school_id)))
+        generation = int(raw) if raw else 0
+        _generations.set(str(school_id), generation)
+    return generation
+
+
+async def invalidate_school_permissions(school_id: str | UUID, redis: Redis) -> None:
+    """
+    Call after commit whenever StaffPermission, UserRole or a position's
+    permissions change. Invalidates every cached mask and token mask of the
+    school; other processes notice within _GENERATION_LOCAL_TTL seconds.
+    """
+    await invalidate_school_permission_cache(redis, str(school_id))
+    _generations.pop(str(school_id))
+    ctx = current_request_auth()
+    if ctx is not None:
+        ctx.permission_masks.clear()
 
 
-async def invalidate_cache(user_id: str | UUID, redis: Redis) -> None:
-    """Call whenever StaffPermission or UserRole changes."""
-    await redis.delete(_cache_key(user_id))
+def clear_local_generations() -> None:
+    """Drop in-process permission generations (tests)."""
+    _generations.clear()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Internal
 # ─────────────────────────────────────────────────────────────────────────────
 
+async def _claims_mask(user: User, claims: dict | None, redis: Redis) -> int | None:
+    """The token's mask if it is for this user and still current, else None."""
+    if (
+        not claims
+        or claims.get("pbv") != PERMISSION_BITS_VERSION
+        or claims.get("sub") != str(user.id)
+        or not isinstance(claims.get("perms"), int)
+        or not user.school_id
+    ):
+        return None
+    try:
+        if claims.get("pv") != await permission_generation(user.school_id, redis):
+            return None
+    except Exception:
+        return None  # Redis unavailable — resolve the slow way
+    return claims["perms"]
+
+
 async def _load_from_db(user: User, session: AsyncSession) -> dict[str, bool]:
     """
     Build the full permission map from DB.
@@ -0,0 +1,144 @@
+"""
+Live roll-call progress — Redis pub/sub fan-out for the SSE stream.
+
+Register writes publish one small message per class on the school's channel:
+
+    attendance:rollcall:{school_id}  →  {"date": "2025-10-06", "class_id": "…"}
+
+Each API process holds a single pattern subscription (attendance:rollcall:*)
+for as long as at least one stream is open, and hands messages to the local
+streams of that school through bounded in-memory queues. Open streams
+therefore cost one Redis connection per process, not one per administrator,
+and no database connection at all once the initial snapshot is sent.
+
+A stream whose queue overflows is marked `overflowed`; the endpoint closes
+it and the browser's EventSource reconnects to a fresh snapshot.
+Publishing is best-effort — a failure is logged and the write still succeeds.
+"""
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import date
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+_CHANNEL_PREFIX = "attendance:rollcall"
+_QUEUE_SIZE = 256
+_SUBSCRIBE_TIMEOUT = 2.0   # seconds to wait for PSUBSCRIBE before the snapshot
+_RETRY_DELAY = 1.0         # seconds between reconnects of a failed listener
+
+
+def _channel(school_id: UUID | str) -> str:
+    return f"{_CHANNEL_PREFIX}:{school_id}"
+
+
+async def publish_class_submitted(
+    redis: Redis, *, school_id: UUID, attendance_date: date, class_id: UUID
+) -> None:
+    """Announce that a class register was saved. Call after commit."""
+    message = json.dumps({"date": attendance_date.isoformat(), "class_id": str(class_id)})
+    try:
+        await redis.publish(_channel(school_id), message)
+    except Exception as exc:
+        logger.warning("Could not publish roll-call event for class %s: %s", class_id, exc)
+
+
+class RollCallSubscriber:
+    """One open stream: a bounded queue of (date, class_id) events."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[tuple[date, UUID]] = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: tuple[date, UUID]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class RollCallHub:
+    """Per-process pattern subscription shared by every open roll-call stream."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[RollCallSubscriber]] = {}
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    @asynccontextmanager
+    async def subscribe(self, school_id: UUID, redis: Redis) -> AsyncIterator[RollCallSubscriber]:
+        """
+        Register a stream for the school's events. Waits (briefly) until the
+        pattern subscription is live, so a snapshot taken inside the block
+        cannot miss a concurrent submission.
+        """
+        sub = RollCallSubscriber()
+        self._subscribers.setdefault(str(school_id), set()).add(sub)
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._listen(redis))
+        try:
+            await asyncio.wait_for(self._ready.wait(), _SUBSCRIBE_TIMEOUT)
+        except TimeoutError:
+            logger.warning("Roll-call subscription not ready; stream may miss events")
+        try:
+            yield sub
+        finally:
+            subs = self._subscribers.get(str(school_id), set())
+            subs.discard(sub)
+            if not subs:
+                self._subscribers.pop(str(school_id), None)
+            if not self._subscribers:
+                await self.close()
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def dispatch(self, channel: str, data: str) -> None:
+        school_id = channel.rpartition(":")[2]
+        subs = self._subscribers.get(school_id)
+        if not subs:
+            return
+        try:
+            payload = json.loads(data)
+            event = (date.fromisoformat(payload["date"]), UUID(payload["class_id"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed roll-call message on %s", channel)
+            return
+        for sub in subs:
+            sub.offer(event)
+
+    async def _listen(self, redis: Redis) -> None:
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{_CHANNEL_PREFIX}:*")
+                self._ready.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Roll-call subscription lost: %s", exc)
+            finally:
+                self._ready.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass  # Connection already gone
+            await asyncio.sleep(_RETRY_DELAY)
+
+
+hub = RollCallHub()
@@ -32,27 +32,28 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.academic import (
-    AcademicYear,
     ClassSubject,
     ClassTeacher,
     SubjectTeacher,
 )
 from app.models.user import User
+from app.services import calendar_cache
+from app.services.calendar_cache import YearInfo
 
 
 # ── Current academic year ─────────────────────────────────────────────────────
 
-async def get_current_year(school_id: UUID, session: AsyncSession) -> AcademicYear | None:
-    return await session.scalar(
-        select(AcademicYear).where(
-            AcademicYear.school_id == school_id,
-            AcademicYear.is_current.is_(True),
-        )
-    )
+async def get_current_year(
+    school_id: UUID, redis: Redis, session: AsyncSession
+) -> YearInfo | None:
+    """Current academic year via the school calendar cache."""
+    return await calendar_cache.get_current_year(school_id, redis, session)
 
 
-async def require_current_year(school_id: UUID, session: AsyncSession) -> AcademicYear:
-    year = await get_current_year(school_id, session)
+async def require_current_year(
+    school_id: UUID, redis: Redis, session: AsyncSession
+) -> YearInfo:
+    year = await get_current_year(school_id, redis, session)
     if not year:
         raise HTTPException(
             status.HTTP_409_CONFLICT,
@@ -166,7 +167,7 @@ class TeacherScope:
         if not user.staff_member_id:
             return cls(is_restricted=True, class_ids=set())
 
-        year = await get_current_year(user.school_id, session)
+        year = await get_current_year(user.school_id, redis, session)
         if not year:
             return cls(is_restricted=True, class_ids=set())
 
@@ -0,0 +1,185 @@
+"""
+Authenticated-user snapshots — two cache tiers in front of the user table.
+
+get_current_user needs a handful of columns of the caller's row on every
+request. They are served from:
+
+    in-process LRU (60 s)  →  Redis string auth:user:{id} (5 min)  →  database
+
+so most requests authenticate with no network round trip at all.
+
+Invalidation
+────────────
+Writes that change what a snapshot holds or whether the user may sign in
+(account updates, staff deactivation/reactivation, password changes and
+resets, role assignments) call invalidate_user after commit. It deletes
+the Redis entry, drops the local entry, and publishes the user id on
+auth:user:invalidate. Every API process listens on that channel (through
+app.core.cache_listener) and drops its own local entry, so a deactivation
+takes effect everywhere within milliseconds.
+If the subscription is down, local entries still expire after _LOCAL_TTL.
+
+A cache fill must not resurrect a snapshot that an invalidation removed
+while the fill was reading the database. invalidate_user bumps a per-user
+version (auth:user:ver:{id}) before deleting; the fill reads the version
+together with the snapshot and writes back through a compare-and-set
+script that only stores if the version is unchanged. The local tier is
+guarded the same way by a per-process invalidation counter.
+
+Snapshots are plain dicts; each request gets its own detached User built
+from them, so handlers can never mutate a shared object.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache_listener import listener
+from app.core.lru import MISSING, LRUCache
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth:user:invalidate"
+_LOCAL_TTL = 60.0
+_REDIS_TTL = 300
+_VERSION_TTL = 3600        # outlives any fill; a lapsed version only costs one extra miss
+_local = LRUCache(maxsize=10_000, ttl=_LOCAL_TTL)
+_local_invalidations = 0   # bumped on every local drop; a fill that saw it change skips _local.set
+
+# KEYS: snapshot, version   ARGV: version read before the fill ("" = none), snapshot, ttl
+_STORE_IF_UNCHANGED = """
+local current = redis.call('GET', KEYS[2]) or ''
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+_STORE_IF_UNCHANGED_SHA = hashlib.sha1(_STORE_IF_UNCHANGED.encode()).hexdigest()
+
+
+def _key(user_id: UUID | str) -> str:
+    return f"auth:user:{user_id}"
+
+
+def _version_key(user_id: UUID | str) -> str:
+    return f"auth:user:ver:{user_id}"
+
+
+async def get_active_user(user_id: str, redis: Redis, session: AsyncSession) -> User | None:
+    """Detached snapshot of an active user, or None if missing/inactive."""
+    snapshot = _local.get(str(user_id))
+    if snapshot is MISSING:
+        snapshot = None
+        version = None
+        invalidations = _local_invalidations
+        try:
+            raw, version = await redis.mget(_key(user_id), _version_key(user_id))
+            version = version or ""
+            if raw:
+                snapshot = json.loads(raw)
+        except Exception:
+            pass  # Redis unavailable — fall through to DB
+
+        if snapshot is None:
+            user = await session.scalar(
+                select(User).where(User.id == user_id, User.is_active.is_(True))
+            )
+            if user is None:
+                return None
+            snapshot = _snapshot(user)
+            if version is not None and not await _store_if_unchanged(
+                redis, user_id, version, snapshot
+            ):
+                return _user_from_snapshot(snapshot)  # Raced an invalidation — serve, don't cache
+        if invalidations == _local_invalidations:
+            _local.set(str(user_id), snapshot)
+
+    return _user_from_snapshot(snapshot)
+
+
+async def invalidate_user(redis: Redis, *user_ids: UUID | str) -> None:
+    """Forget cached snapshots of these users in every process. Call after commit."""
+    ids = [str(u) for u in user_ids if u]
+    if not ids:
+        return
+    for user_id in ids:
+        _drop_local(user_id)
+    try:
+        for user_id in ids:
+            await redis.incr(_version_key(user_id))
+            await redis.expire(_version_key(user_id), _VERSION_TTL)
+        await redis.delete(*[_key(u) for u in ids])
+        for user_id in ids:
+            await redis.publish(CHANNEL, user_id)
+    except Exception as exc:
+        logger.warning("Could not invalidate cached user(s) %s: %s", ", ".join(ids), exc)
+
+
+def clear_local_cache() -> None:
+    """Drop every in-process entry (tests)."""
+    global _local_invalidations
+    _local_invalidations += 1
+    _local.clear()
+
+
+# ── Internals ─────────────────────────────────────────────────────────────────
+
+def _drop_local(user_id: str) -> None:
+    global _local_invalidations
+    _local_invalidations += 1
+    _local.pop(user_id)
+
+
+async def _store_if_unchanged(redis: Redis, user_id: str, version: str, snapshot: dict) -> bool:
+    """Cache the snapshot unless the user was invalidated since `version` was read."""
+    args = (_key(user_id), _version_key(user_id), version, json.dumps(snapshot), _REDIS_TTL)
+    try:
+        try:
+            stored = await redis.evalsha(_STORE_IF_UNCHANGED_SHA, 2, *args)
+        except NoScriptError:
+            stored = await redis.eval(_STORE_IF_UNCHANGED, 2, *args)
+    except Exception:
+        return True  # Cache write failure is non-fatal; the local tier is still guarded
+    return bool(stored)
+
+
+def _snapshot(user: User) -> dict:
+    return {
+        "id": str(user.id),
+        "email": user.email,
+        "system_role": user.system_role,
+        "is_active": user.is_active,
+        "must_change_password": user.must_change_password,
+        "school_id": str(user.school_id) if user.school_id else None,
+        "staff_member_id": str(user.staff_member_id) if user.staff_member_id else None,
+    }
+
+
+def _user_from_snapshot(d: dict) -> User:
+    """
+    Reconstruct a detached User from a snapshot (no DB needed). Loading any
+    other attribute raises DetachedInstanceError instead of querying.
+    """
+    u = User(
+        id=uuid.UUID(d["id"]),
+        email=d["email"],
+        system_role=d["system_role"],
+        is_active=d["is_active"],
+        must_change_password=d.get("must_change_password", False),
+        school_id=uuid.UUID(d["school_id"]) if d.get("school_id") else None,
+        staff_member_id=uuid.UUID(d["staff_member_id"]) if d.get("staff_member_id") else None,
+    )
+    make_transient_to_detached(u)
+    return u
+
+
+listener.register(CHANNEL, _drop_local, clear_local_cache)
@@ -27,6 +27,11 @@ class WorkerSettings:
     cron_jobs = [
         # Refresh materialized analytics views every 6 hours
         cron(jobs.refresh_analytics_views, hour={0, 6, 12, 18}, minute=0),
+        # Refresh attendance analytics shortly after register writes (no-op when idle)
+        cron(jobs.refresh_attendance_analytics_after_writes, minute={5, 20, 35, 50}),
+        # Dashboard tiles: full rebuild every 10 minutes, queued recomputes every 20 seconds
+        cron(jobs.precompute_dashboard_tiles, minute=set(range(0, 60, 10)), second=0),
+        cron(jobs.refresh_dirty_dashboard_tiles, second={0, 20, 40}),
     ]
     on_startup = startup
     on_shutdown = shutdown
@@ -100,11 +100,9 @@ async def refresh_analytics_views(ctx: dict) -> None:
 
     async with session_factory() as session:
         from sqlalchemy import text
-        # Materialized views will be created in Phase 10
-        # op list kept here for future expansion
         views_to_refresh: list[str] = [
+            "mv_attendance_summary",
             # "mv_class_performance",
-            # "mv_attendance_summary",
             # "mv_fee_collection",
         ]
         for view in views_to_refresh:
@@ -113,4 +111,105 @@ async def refresh_analytics_views(ctx: dict) -> None:
                 logger.info("Refreshed %s", view)
             except Exception as exc:
                 logger.error("Failed to refresh %s: %s", view, exc)
+                await session.rollback()
         await session.commit()
+
+
+async def refresh_attendance_analytics_after_writes(ctx: dict) -> None:
+    """
+    Refresh mv_attendance_summary if registers were written since the last run.
+    Scheduled via CronJob in WorkerSettings — runs every 15 minutes; a no-op
+    unless the API set the dirty flag (see app.services.attendance_analytics).
+    """
+    from app.core.redis import get_redis
+    from app.services.attendance_analytics import (
+        mark_attendance_analytics_dirty,
+        refresh_attendance_summary,
+        take_attendance_analytics_dirty,
+    )
+
+    session_factory = ctx.get("session_factory")
+    if not session_factory:
+        logger.error("No session_factory in ctx — worker startup may have failed")
+        return
+
+    redis = get_redis()
+    try:
+        dirty = await take_attendance_analytics_dirty(redis)
+    except Exception as exc:
+        logger.warning("Could not read attendance analytics flag: %s", exc)
+        return
+    if not dirty:
+        return
+
+    try:
+        async with session_factory() as session:
+            await refresh_attendance_summary(session)
+        logger.info("Refreshed mv_attendance_summary after register writes")
+    except Exception as exc:
+        logger.error("Failed to refresh mv_attendance_summary: %s", exc)
+        # Re-flag so the next run retries
+        await mark_attendance_analytics_dirty(redis)
+
+
+# ── Dashboard ─────────────────────────────────────────────────────
+
+async def refresh_dirty_dashboard_tiles(ctx: dict) -> None:
+    """
+    Recompute the dashboard tiles that write paths queued in dash:dirty.
+    Scheduled via CronJob in WorkerSettings — runs every 20 seconds.
+    """
+    from app.core.redis import get_redis
+    from app.services.dashboard_tiles import recompute_tiles, take_dirty_targets
+
+    session_factory = ctx.get("session_factory")
+    if not session_factory:
+        logger.error("No session_factory in ctx — worker startup may have failed")
+        return
+
+    redis = get_redis()
+    try:
+        dirty = await take_dirty_targets(redis)
+    except Exception as exc:
+        logger.warning("Could not read dashboard recompute queue: %s", exc)
+        return
+
+    for school_id, targets in dirty.items():
+        try:
+            async with session_factory() as session:
+                count = await recompute_tiles(UUID(school_id), targets, redis, session)
+            logger.info("Recomputed %d dashboard tiles for school %s", count, school_id)
+        except Exception as exc:
+            logger.error("Dashboard recompute failed for school %s: %s", school_id, exc)
+
+
+async def precompute_dashboard_tiles(ctx: dict) -> None:
+    """
+    Rebuild the admin and teacher dashboard tiles of every active school.
+    Scheduled via CronJob in WorkerSettings — runs every 10 minutes.
+    """
+    from sqlalchemy import select
+
+    from app.core.redis import get_redis
+    from app.models.school import School
+    from app.services.dashboard_tiles import precompute_school_tiles
+
+    session_factory = ctx.get("session_factory")
+    if not session_factory:
+        logger.error("No session_factory in ctx — worker startup may have failed")
+        return
+
+    redis = get_redis()
+    async with session_factory() as session:
+        school_ids = list(await session.scalars(
+            select(School.id).where(School.is_active.is_(True))
+        ))
+
+    total = 0
+    for school_id in school_ids:
+        try:
+            async with session_factory() as session:
+                total += await precompute_school_tiles(school_id, redis, session)
+        except Exception as exc:
+            logger.error("Dashboard precompute failed for school %s: %s", school_id, exc)
+    logger.info("Precomputed %d dashboard tiles across %d schools", total, len(school_ids))
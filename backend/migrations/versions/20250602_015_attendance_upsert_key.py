@@ -0,0 +1,70 @@
+"""Make the attendance_record slot key usable as an ON CONFLICT target
+
+The baseline unique constraint on
+(student_term_enrollment_id, school_calendar_id, school_period_id) treats
+NULLs as distinct, so daily rows (school_period_id IS NULL) never conflict
+and a set-based INSERT ... ON CONFLICT would silently insert duplicates.
+Recreate it as a named NULLS NOT DISTINCT constraint (PostgreSQL 15+).
+
+Any duplicate daily rows that slipped in are collapsed first, keeping the
+most recently marked one.
+
+Revision ID: 20250602_015
+Revises: 20250601_014
+Create Date: 2025-06-02
+"""
+from alembic import op
+
+revision = "20250602_015"
+down_revision = "20250601_014"
+branch_labels = None
+depends_on = None
+
+
+def _drop_baseline_constraint() -> None:
+    # The baseline constraint was unnamed — look up whatever PostgreSQL called it
+    op.execute(
+        """
+        DO $$
+        DECLARE cname text;
+        BEGIN
+            SELECT conname INTO cname
+            FROM pg_constraint
+            WHERE conrelid = 'attendance_record'::regclass
+              AND contype = 'u'
+              AND conname <> 'uq_attendance_record_slot';
+            IF cname IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE attendance_record DROP CONSTRAINT %I', cname);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM attendance_record a
+        USING attendance_record b
+        WHERE a.student_term_enrollment_id = b.student_term_enrollment_id
+          AND a.school_calendar_id = b.school_calendar_id
+          AND a.school_period_id IS NULL
+          AND b.school_period_id IS NULL
+          AND (a.marked_at, a.id) < (b.marked_at, b.id)
+        """
+    )
+    _drop_baseline_constraint()
+    op.execute(
+        "ALTER TABLE attendance_record ADD CONSTRAINT uq_attendance_record_slot "
+        "UNIQUE NULLS NOT DISTINCT "
+        "(student_term_enrollment_id, school_calendar_id, school_period_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE attendance_record DROP CONSTRAINT uq_attendance_record_slot")
+    op.create_unique_constraint(
+        None,
+        "attendance_record",
+        ["student_term_enrollment_id", "school_calendar_id", "school_period_id"],
+    )
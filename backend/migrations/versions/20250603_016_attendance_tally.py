@@ -0,0 +1,68 @@
+"""Add attendance_tally — per-term-enrollment daily attendance counters
+
+One row per student_term_enrollment with present/absent/late/excused counts,
+kept in step with attendance_record by the register write path. Backfilled
+here from the existing daily records.
+
+Revision ID: 20250603_016
+Revises: 20250602_015
+Create Date: 2025-06-03
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "20250603_016"
+down_revision = "20250602_015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "attendance_tally",
+        sa.Column(
+            "student_term_enrollment_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("student_term_enrollment.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "school_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("school.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("present", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("absent", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("late", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("excused", sa.Integer, nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_index("ix_attendance_tally_school_id", "attendance_tally", ["school_id"])
+
+    op.execute(
+        """
+        INSERT INTO attendance_tally
+            (student_term_enrollment_id, school_id, present, absent, late, excused)
+        SELECT student_term_enrollment_id,
+               school_id,
+               count(*) FILTER (WHERE status = 'PRESENT'),
+               count(*) FILTER (WHERE status = 'ABSENT'),
+               count(*) FILTER (WHERE status = 'LATE'),
+               count(*) FILTER (WHERE status = 'EXCUSED')
+        FROM attendance_record
+        WHERE school_period_id IS NULL
+        GROUP BY student_term_enrollment_id, school_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_attendance_tally_school_id", table_name="attendance_tally")
+    op.drop_table("attendance_tally")
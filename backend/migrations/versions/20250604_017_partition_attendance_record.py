@@ -0,0 +1,166 @@
+"""Range-partition attendance_record by attendance date
+
+attendance_record grows by students x school days every term, across every
+school. It becomes a RANGE-partitioned table on a new attendance_date column
+(denormalised from school_calendar.date):
+
+  • Terms belong to individual schools and their dates overlap between
+    schools, so partitions are cut per calendar month, not per term row.
+    A term spans 3-4 monthly partitions; a single day's register prunes to
+    exactly one.
+  • attendance_record_ensure_partitions(from, to) creates any missing monthly
+    partitions. The app calls it from generate_term_calendar, so a term's
+    partitions exist before its first register is taken.
+  • attendance_record_default catches rows outside every partition and is
+    expected to stay empty.
+  • The primary key and slot key now include attendance_date (a partitioned
+    table's unique keys must contain the partition key). school_calendar_id
+    already implies the date, so slot uniqueness is unchanged.
+
+Archiving an old month:
+    ALTER TABLE attendance_record DETACH PARTITION attendance_record_y2024m09 CONCURRENTLY;
+
+Revision ID: 20250604_017
+Revises: 20250603_016
+Create Date: 2025-06-04
+"""
+from alembic import op
+
+revision = "20250604_017"
+down_revision = "20250603_016"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = (
+    "id, school_id, student_term_enrollment_id, school_calendar_id, school_period_id, "
+    "status, marked_by, marked_at, note, created_at, updated_at"
+)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE attendance_record RENAME TO attendance_record_legacy")
+    op.execute(
+        "ALTER TABLE attendance_record_legacy "
+        "RENAME CONSTRAINT uq_attendance_record_slot TO uq_attendance_record_legacy_slot"
+    )
+    op.execute("ALTER INDEX attendance_record_pkey RENAME TO attendance_record_legacy_pkey")
+    op.execute("ALTER INDEX ix_attendance_enrollment RENAME TO ix_attendance_legacy_enrollment")
+    op.execute("ALTER INDEX ix_attendance_calendar RENAME TO ix_attendance_legacy_calendar")
+
+    op.execute(
+        """
+        CREATE TABLE attendance_record (
+            id uuid NOT NULL DEFAULT gen_random_uuid(),
+            school_id uuid NOT NULL REFERENCES school (id) ON DELETE CASCADE,
+            student_term_enrollment_id uuid NOT NULL
+                REFERENCES student_term_enrollment (id) ON DELETE CASCADE,
+            school_calendar_id uuid NOT NULL REFERENCES school_calendar (id) ON DELETE RESTRICT,
+            school_period_id uuid REFERENCES school_period (id) ON DELETE RESTRICT,
+            attendance_date date NOT NULL,
+            status varchar(10) NOT NULL,
+            marked_by uuid NOT NULL REFERENCES "user" (id) ON DELETE RESTRICT,
+            marked_at timestamptz NOT NULL,
+            note text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, attendance_date),
+            CONSTRAINT uq_attendance_record_slot UNIQUE NULLS NOT DISTINCT
+                (student_term_enrollment_id, school_calendar_id, school_period_id, attendance_date)
+        ) PARTITION BY RANGE (attendance_date)
+        """
+    )
+    op.create_index("ix_attendance_enrollment", "attendance_record", ["student_term_enrollment_id"])
+    op.create_index("ix_attendance_calendar", "attendance_record", ["school_calendar_id"])
+    op.create_index("ix_attendance_record_school_id", "attendance_record", ["school_id"])
+    op.execute("CREATE TABLE attendance_record_default PARTITION OF attendance_record DEFAULT")
+
+    # Idempotent monthly partition creation. The advisory lock serialises
+    # concurrent callers (two terms activated at once) so IF NOT EXISTS is safe.
+    op.execute(
+        """
+        CREATE FUNCTION attendance_record_ensure_partitions(from_date date, to_date date)
+        RETURNS integer
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            month_start date := date_trunc('month', from_date)::date;
+            part_name text;
+            created integer := 0;
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('attendance_record_partitions'));
+            WHILE month_start <= to_date LOOP
+                part_name := format('attendance_record_y%sm%s',
+                                    to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+                IF to_regclass(part_name) IS NULL THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF attendance_record '
+                        || 'FOR VALUES FROM (%L) TO (%L)',
+                        part_name, month_start, (month_start + interval '1 month')::date
+                    );
+                    created := created + 1;
+                END IF;
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+            RETURN created;
+        END $$
+        """
+    )
+
+    # Partitions for every month any school already has a calendar for
+    op.execute(
+        """
+        SELECT attendance_record_ensure_partitions(min(date), max(date))
+        FROM school_calendar
+        HAVING count(*) > 0
+        """
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO attendance_record ({_COLUMNS}, attendance_date)
+        SELECT {', '.join('l.' + c.strip() for c in _COLUMNS.split(','))}, c.date
+        FROM attendance_record_legacy l
+        JOIN school_calendar c ON c.id = l.school_calendar_id
+        """
+    )
+    op.execute("DROP TABLE attendance_record_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE attendance_record RENAME TO attendance_record_partitioned")
+    op.execute(
+        "ALTER TABLE attendance_record_partitioned "
+        "RENAME CONSTRAINT uq_attendance_record_slot TO uq_attendance_record_partitioned_slot"
+    )
+    op.execute("ALTER INDEX attendance_record_pkey RENAME TO attendance_record_partitioned_pkey")
+    op.execute(
+        "ALTER INDEX ix_attendance_enrollment RENAME TO ix_attendance_partitioned_enrollment"
+    )
+    op.execute("ALTER INDEX ix_attendance_calendar RENAME TO ix_attendance_partitioned_calendar")
+    op.execute(
+        """
+        CREATE TABLE attendance_record (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            school_id uuid NOT NULL REFERENCES school (id) ON DELETE CASCADE,
+            student_term_enrollment_id uuid NOT NULL
+                REFERENCES student_term_enrollment (id) ON DELETE CASCADE,
+            school_calendar_id uuid NOT NULL REFERENCES school_calendar (id) ON DELETE RESTRICT,
+            school_period_id uuid REFERENCES school_period (id) ON DELETE RESTRICT,
+            status varchar(10) NOT NULL,
+            marked_by uuid NOT NULL REFERENCES "user" (id) ON DELETE RESTRICT,
+            marked_at timestamptz NOT NULL,
+            note text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT uq_attendance_record_slot UNIQUE NULLS NOT DISTINCT
+                (student_term_enrollment_id, school_calendar_id, school_period_id)
+        )
+        """
+    )
+    op.create_index("ix_attendance_enrollment", "attendance_record", ["student_term_enrollment_id"])
+    op.create_index("ix_attendance_calendar", "attendance_record", ["school_calendar_id"])
+    op.execute(
+        f"INSERT INTO attendance_record ({_COLUMNS}) "
+        f"SELECT {_COLUMNS} FROM attendance_record_partitioned"
+    )
+    op.execute("DROP TABLE attendance_record_partitioned CASCADE")
+    op.execute("DROP FUNCTION attendance_record_ensure_partitions(date, date)")
@@ -0,0 +1,56 @@
+"""Add mv_attendance_summary — daily attendance counts for analytics
+
+One row per (school, term, class, day, gender) with status counts, built from
+daily attendance_record rows. Trend endpoints read this instead of scanning
+attendance_record.
+
+The unique index over the full grain is what REFRESH MATERIALIZED VIEW
+CONCURRENTLY requires; refreshes run from the ARQ worker
+(app.workers.jobs.refresh_analytics_views and
+refresh_attendance_analytics_after_writes).
+
+Materialized views do not support RLS — every reader filters on school_id.
+
+Revision ID: 20250605_018
+Revises: 20250604_017
+Create Date: 2025-06-05
+"""
+from alembic import op
+
+revision = "20250605_018"
+down_revision = "20250604_017"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_attendance_summary AS
+        SELECT ar.school_id,
+               sc.academic_term_id,
+               sce.class_id,
+               ar.attendance_date,
+               s.gender,
+               count(*) FILTER (WHERE ar.status = 'PRESENT') AS present,
+               count(*) FILTER (WHERE ar.status = 'ABSENT')  AS absent,
+               count(*) FILTER (WHERE ar.status = 'LATE')    AS late,
+               count(*) FILTER (WHERE ar.status = 'EXCUSED') AS excused,
+               count(*)                                      AS marked
+        FROM attendance_record ar
+        JOIN school_calendar sc           ON sc.id = ar.school_calendar_id
+        JOIN student_term_enrollment ste  ON ste.id = ar.student_term_enrollment_id
+        JOIN student_class_enrollment sce ON sce.id = ste.student_class_enrollment_id
+        JOIN student s                    ON s.id = sce.student_id
+        WHERE ar.school_period_id IS NULL
+        GROUP BY ar.school_id, sc.academic_term_id, sce.class_id, ar.attendance_date, s.gender
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX uq_mv_attendance_summary ON mv_attendance_summary "
+        "(school_id, academic_term_id, class_id, attendance_date, gender)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_attendance_summary")
@@ -0,0 +1,329 @@
+"""
+Benchmark the hot read endpoints against a scaled school.
+
+Seeds one school of --classes x --students with --days school days of
+attendance (default 50 x 60 x 60 = 180,000 records, one subject per class
+per --subjects), then drives the app in-process — real database and Redis,
+no network — and reports per endpoint:
+
+    p50 / p95 / mean latency (ms)   over --requests sequential requests
+    queries                         SQL statements per request (X-DB-Query-Count)
+
+    attendance_register   GET /attendance/register?class_id=…
+    attendance_summary    GET /attendance/summary?class_id=…
+    dashboard_summary     GET /dashboard/summary
+    student_list          GET /students?class_id=…&limit=60
+    subject_register      GET /subject-registration/{class_subject_id}
+
+Classes rotate between requests. Figures are warm-cache: each endpoint gets
+--warmup requests first. Results are written as JSON (--output) together
+with the git commit and dataset size; --compare prints the change against an
+earlier run's file. The rate limit is lifted for the run.
+
+Seeding inserts into the configured database and never deletes — point
+DATABASE_URL at a scratch database (the test database is truncated by the
+test suite anyway). Each run seeds a new school unless --school-id reuses
+one seeded earlier; the id is printed.
+
+Usage:
+    docker compose --profile test run --rm test python scripts/bench_endpoints.py
+    docker compose --profile test run --rm test python scripts/bench_endpoints.py \
+        --classes 10 --students 40 --days 20 --output bench-small.json
+    docker compose --profile test run --rm test python scripts/bench_endpoints.py \
+        --school-id 3f1c… --compare bench-main.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_BATCH = 5000
+_STATUSES = ["PRESENT"] * 17 + ["ABSENT", "LATE", "EXCUSED"]
+
+
+def _school_days(count: int) -> list[date]:
+    """The last `count` weekdays up to and including today."""
+    days, d = [], date.today()
+    while len(days) < count:
+        if d.weekday() < 5:
+            days.append(d)
+        d -= timedelta(days=1)
+    return sorted(days)
+
+
+async def _insert(session, model, rows: list[dict]) -> None:
+    from sqlalchemy import insert
+
+    for i in range(0, len(rows), _BATCH):
+        await session.execute(insert(model), rows[i:i + _BATCH])
+
+
+async def seed(classes: int, students: int, days: int, subjects: int) -> uuid.UUID:
+    from app.core.db import AsyncSessionLocal
+    from app.core.permissions import ALL_PERMISSIONS
+    from app.core.security import hash_password
+    from app.models.academic import AcademicTerm, AcademicYear, Class, ClassSubject, SchoolCalendar
+    from app.models.attendance import AttendanceRecord
+    from app.models.school import School, SchoolSchedule
+    from app.models.staff import PositionPermission, StaffPosition
+    from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+    from app.models.user import User, UserRole
+    from app.services.attendance import ensure_attendance_partitions, rebuild_attendance_tally
+    from app.services.attendance_analytics import refresh_attendance_summary
+
+    rng = random.Random(42)
+    school_days = _school_days(days)
+    tag = uuid.uuid4().hex[:8]
+    now = datetime.now(UTC)
+
+    async with AsyncSessionLocal() as session:
+        school = School(
+            name=f"Benchmark {classes}x{students}x{days}", code=f"B{tag}", slug=f"bench-{tag}",
+            education_levels=["BASIC"], facility_type="DAY",
+        )
+        session.add(school)
+        await session.flush()
+        session.add(SchoolSchedule(school_id=school.id, school_days=[1, 2, 3, 4, 5]))
+        year = AcademicYear(
+            school_id=school.id, name="Benchmark",
+            start_date=school_days[0] - timedelta(days=1),
+            end_date=date.today() + timedelta(days=200),
+            is_current=True,
+        )
+        session.add(year)
+        await session.flush()
+        term = AcademicTerm(
+            academic_year_id=year.id, name="Term 1",
+            start_date=school_days[0], end_date=date.today() + timedelta(days=30), is_current=True,
+        )
+        session.add(term)
+        position = StaffPosition(school_id=school.id, name="Benchmark Admin", code="BENCH_ADMIN")
+        session.add(position)
+        await session.flush()
+        session.add_all(
+            PositionPermission(position_id=position.id, permission_key=p, granted=True)
+            for p in ALL_PERMISSIONS
+        )
+        user = User(
+            email=f"bench-{tag}@bench.local", password_hash=hash_password(uuid.uuid4().hex),
+            system_role="SCHOOL_STAFF", school_id=school.id, is_active=True, is_verified=True,
+        )
+        session.add(user)
+        await session.flush()
+        session.add(UserRole(user_id=user.id, role_id=position.id, assigned_at=now))
+        await ensure_attendance_partitions(term.start_date, term.end_date, session)
+
+        calendar = {d: uuid.uuid4() for d in school_days}
+        await _insert(session, SchoolCalendar, [
+            {
+                "id": cid, "school_id": school.id, "academic_term_id": term.id,
+                "date": d, "day_type": "SCHOOL_DAY",
+            }
+            for d, cid in calendar.items()
+        ])
+
+        class_rows, subject_rows, student_rows, sce_rows, ste_rows = [], [], [], [], []
+        for c in range(classes):
+            class_id = uuid.uuid4()
+            class_rows.append({
+                "id": class_id, "school_id": school.id, "education_level": "BASIC",
+                "level": "Basic", "year": 1 + c % 9, "stream": f"S{c}",
+            })
+            subject_rows += [
+                {
+                    "id": uuid.uuid4(), "class_id": class_id,
+                    "subject_name": f"Subject {k}", "subject_code": f"S{k}",
+                }
+                for k in range(subjects)
+            ]
+            for s in range(students):
+                student_id, sce_id = uuid.uuid4(), uuid.uuid4()
+                student_rows.append({
+                    "id": student_id, "school_id": school.id, "first_name": f"Pupil{s}",
+                    "last_name": f"C{c}", "gender": rng.choice(["MALE", "FEMALE"]),
+                })
+                sce_rows.append({
+                    "id": sce_id, "student_id": student_id, "class_id": class_id,
+                    "academic_year_id": year.id, "register_number": f"{c}-{s}",
+                })
+                ste_rows.append({
+                    "id": uuid.uuid4(), "student_class_enrollment_id": sce_id,
+                    "academic_term_id": term.id, "enrolled_date": term.start_date,
+                })
+        await _insert(session, Class, class_rows)
+        await _insert(session, ClassSubject, subject_rows)
+        await _insert(session, Student, student_rows)
+        await _insert(session, StudentClassEnrollment, sce_rows)
+        await _insert(session, StudentTermEnrollment, ste_rows)
+
+        records = (
+            {
+                "school_id": school.id, "student_term_enrollment_id": ste["id"],
+                "school_calendar_id": cid, "attendance_date": d, "status": rng.choice(_STATUSES),
+                "marked_by": user.id, "marked_at": now,
+            }
+            for d, cid in calendar.items() for ste in ste_rows
+        )
+        while batch := list(itertools.islice(records, _BATCH)):
+            await _insert(session, AttendanceRecord, batch)
+        await session.commit()
+
+        await rebuild_attendance_tally(session, school.id)
+        await session.commit()
+        await refresh_attendance_summary(session)
+        return school.id
+
+
+async def _targets(school_id: uuid.UUID):
+    """(token, [(name, [paths…])]) for the benchmark school."""
+    from sqlalchemy import select
+
+    from app.core.db import AsyncSessionLocal
+    from app.core.security import create_access_token
+    from app.models.academic import Class, ClassSubject
+    from app.models.user import User
+
+    async with AsyncSessionLocal() as session:
+        user = await session.scalar(
+            select(User).where(User.school_id == school_id, User.email.like("bench-%"))
+        )
+        if user is None:
+            raise SystemExit(f"School {school_id} was not seeded by this script.")
+        class_ids = list(await session.scalars(
+            select(Class.id).where(Class.school_id == school_id)
+        ))
+        subject_ids = list(await session.scalars(
+            select(ClassSubject.id).join(Class, Class.id == ClassSubject.class_id)
+            .where(Class.school_id == school_id)
+        ))
+
+    token = create_access_token(str(user.id), str(school_id), user.system_role)
+    today = date.today().isoformat()
+    return token, [
+        ("attendance_register", [
+            f"/api/v1/attendance/register?class_id={c}&target_date={today}" for c in class_ids
+        ]),
+        ("attendance_summary", [f"/api/v1/attendance/summary?class_id={c}" for c in class_ids]),
+        ("dashboard_summary", ["/api/v1/dashboard/summary"]),
+        ("student_list", [f"/api/v1/students?class_id={c}&limit=60" for c in class_ids]),
+        ("subject_register", [f"/api/v1/subject-registration/{s}" for s in subject_ids]),
+    ]
+
+
+async def run(school_id: uuid.UUID, requests: int, warmup: int) -> dict:
+    from httpx import ASGITransport, AsyncClient
+
+    from app.core.config import settings
+    from app.core.redis import close_redis, init_redis
+    from app.main import app
+
+    settings.RATE_LIMIT_PER_MINUTE = 10**9
+    await init_redis()
+    token, targets = await _targets(school_id)
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for name, paths in targets:
+                rotation = itertools.cycle(paths)
+                for _ in range(warmup):
+                    await client.get(next(rotation), headers=headers)
+                samples, queries = [], []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    r = await client.get(next(rotation), headers=headers)
+                    samples.append((time.perf_counter() - started) * 1000)
+                    if r.status_code != 200:
+                        raise SystemExit(f"{name}: HTTP {r.status_code} {r.text[:200]}")
+                    queries.append(int(r.headers.get("x-db-query-count", -1)))
+                samples.sort()
+                results[name] = {
+                    "p50_ms": round(samples[len(samples) // 2], 2),
+                    "p95_ms": round(samples[int(len(samples) * 0.95)], 2),
+                    "mean_ms": round(statistics.fmean(samples), 2),
+                    "queries": max(queries),
+                }
+    finally:
+        await close_redis()
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _report(results: dict, baseline: dict | None) -> None:
+    print(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'queries':>8}"
+          + (f" {'Δp95 %':>8}" if baseline else ""))
+    for name, r in results.items():
+        line = (
+            f"{name:<22} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}"
+            f" {r['mean_ms']:>8.2f} {r['queries']:>8}"
+        )
+        before = (baseline or {}).get(name)
+        if before:
+            line += f" {(r['p95_ms'] / before['p95_ms'] - 1) * 100:>+8.1f}"
+        print(line)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.core.config import settings
+
+    if settings.is_production:
+        raise SystemExit("Refusing to seed benchmark data with APP_ENV=production.")
+
+    school_id = args.school_id
+    if school_id is None:
+        started = time.perf_counter()
+        school_id = await seed(args.classes, args.students, args.days, args.subjects)
+        print(f"Seeded school {school_id} in {time.perf_counter() - started:.1f}s")
+
+    results = await run(school_id, args.requests, args.warmup)
+    payload = {
+        "commit": _commit(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "school_id": str(school_id),
+        "dataset": {"classes": args.classes, "students": args.students, "days": args.days,
+                    "subjects": args.subjects},
+        "requests": args.requests,
+        "endpoints": results,
+    }
+    Path(args.output).write_text(json.dumps(payload, indent=2) + "\n")
+
+    baseline = json.loads(Path(args.compare).read_text())["endpoints"] if args.compare else None
+    _report(results, baseline)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark hot read endpoints against a scaled school.",
+    )
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--students", type=int, default=60, help="Students per class")
+    parser.add_argument("--days", type=int, default=60, help="School days of attendance")
+    parser.add_argument("--subjects", type=int, default=8, help="Subjects per class")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--school-id", type=uuid.UUID, default=None,
+                        help="Reuse a school seeded by an earlier run")
+    parser.add_argument("--output", default="bench-endpoints.json")
+    parser.add_argument(
+        "--compare", default=None, help="Earlier JSON output to compare p95 against",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+"""
+Measure per-request middleware overhead on /api/v1/health/ping.
+
+Drives three in-process ASGI stacks with the same ping route and reports the
+mean and p50/p95 cost per request, in microseconds:
+
+    bare       no middleware
+    baseline   AuthContext + the BaseHTTPMiddleware RateLimit and RequestID
+               that the pure ASGI rewrite replaced, read from git
+               (--baseline-ref, app/core/middleware.py at that commit)
+    asgi       AuthContext + the current pure ASGI RateLimit and RequestID
+
+/health is exempt from rate limiting, so the figures isolate the wrapping
+cost itself. Needs no database or Redis. The baseline row needs a git
+checkout; the api container does not mount .git, so it is skipped there.
+
+Usage:
+    python scripts/bench_middleware.py
+    python scripts/bench_middleware.py --requests 50000 --baseline-ref 9555424^
+    docker compose run --rm api python scripts/bench_middleware.py   # no baseline
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# The commit before the pure ASGI rewrite of app/core/middleware.py
+DEFAULT_BASELINE_REF = "9555424^"
+
+
+def _load_baseline(ref: str) -> types.ModuleType | None:
+    """app/core/middleware.py as of `ref`, imported as a throwaway module."""
+    try:
+        source = subprocess.run(
+            ["git", "show", f"{ref}:./app/core/middleware.py"],
+            cwd=BACKEND, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(f"baseline skipped: cannot read {ref} from git ({exc})", file=sys.stderr)
+        return None
+    module = types.ModuleType("baseline_middleware")
+    exec(compile(source, f"{ref}:app/core/middleware.py", "exec"), module.__dict__)
+    return module
+
+
+def _build(stack: str, baseline: types.ModuleType | None = None):
+    from fastapi import FastAPI
+
+    from app.core import middleware as current
+    from app.core.auth_context import AuthContextMiddleware
+
+    app = FastAPI()
+
+    @app.get("/api/v1/health/ping")
+    async def ping() -> dict:
+        return {"pong": True}
+
+    if stack != "bare":
+        impl = baseline if stack == "baseline" else current
+        app.add_middleware(impl.RateLimitMiddleware)
+        app.add_middleware(AuthContextMiddleware)
+        app.add_middleware(impl.RequestIDMiddleware)
+    return app
+
+
+async def _one(app) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/v1/health/ping",
+        "raw_path": b"/api/v1/health/ping", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 5000),
+        "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return (time.perf_counter() - started) * 1e6
+
+
+async def main(requests: int, baseline_ref: str) -> None:
+    baseline = _load_baseline(baseline_ref)
+    stacks = ("bare", "baseline", "asgi") if baseline else ("bare", "asgi")
+    rows = []
+    for stack in stacks:
+        app = _build(stack, baseline)
+        for _ in range(min(1000, requests)):  # warm-up
+            await _one(app)
+        samples = sorted([await _one(app) for _ in range(requests)])
+        rows.append((
+            stack,
+            statistics.fmean(samples),
+            samples[len(samples) // 2],
+            samples[int(len(samples) * 0.95)],
+        ))
+
+    bare = rows[0][1]
+    print(f"{'stack':<10} {'mean µs':>9} {'p50 µs':>9} {'p95 µs':>9} {'overhead µs':>12}")
+    for stack, mean, p50, p95 in rows:
+        print(f"{stack:<10} {mean:>9.1f} {p50:>9.1f} {p95:>9.1f} {mean - bare:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark middleware overhead on /health/ping.")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--baseline-ref", default=DEFAULT_BASELINE_REF,
+        help="git revision whose app/core/middleware.py is the baseline",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.baseline_ref))
@@ -0,0 +1,45 @@
+"""
+Rebuild the attendance_tally counters from raw attendance_record rows.
+
+The counters are maintained incrementally by every register write; run this
+after manual SQL edits to attendance_record or if the counters are suspected
+to have drifted.
+
+The rebuild locks attendance_tally (SHARE ROW EXCLUSIVE) until it commits,
+so register submissions from every school wait for it to finish — run it
+outside roll-call hours on large databases.
+
+Usage:
+    docker compose run --rm api python scripts/rebuild_attendance_tally.py
+
+    # Only one school:
+    docker compose run --rm api python scripts/rebuild_attendance_tally.py \
+        --school-id 3f1c…
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+async def main(school_id: uuid.UUID | None) -> None:
+    from app.core.db import AsyncSessionLocal
+    from app.services.attendance import rebuild_attendance_tally
+
+    async with AsyncSessionLocal() as session:
+        written = await rebuild_attendance_tally(session, school_id)
+        await session.commit()
+
+    scope = f"school {school_id}" if school_id else "all schools"
+    print(f"Rebuilt {written} attendance tally row(s) for {scope}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild attendance_tally from attendance_record.")
+    parser.add_argument("--school-id", type=uuid.UUID, default=None,
+                        help="Limit the rebuild to one school")
+    args = parser.parse_args()
+    asyncio.run(main(school_id=args.school_id))
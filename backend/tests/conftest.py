@@ -11,8 +11,9 @@ Isolation strategy:
     every test so tests start with a clean slate.
 """
 import asyncio
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Iterator
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager
 from unittest.mock import AsyncMock
 
 import pytest
@@ -20,14 +21,21 @@ import pytest_asyncio
 from alembic import command
 from alembic.config import Config
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import select, text
+from sqlalchemy import event, select, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
-from app.core.db import get_session
+from app.core.db import RLSSession, get_session
+from app.core.rate_limit import clear_local_denials
+from app.core.security import create_access_token
 from app.core.redis import get_redis
 from app.main import app
+from app.services.calendar_cache import clear_local_cache
+from app.services.permissions import clear_local_generations
+from app.services.user_cache import clear_local_cache as clear_user_cache
+
+pytest_plugins = ["tests.query_budget"]
 
 
 # ── Alembic helpers (sync — run in a thread pool) ─────────────────
@@ -51,6 +59,7 @@ def _downgrade() -> None:
 # Seeded tables (ghana_holiday, grading_scale, staff_position, etc.) are left
 # intact — they were inserted by migrations and are needed by tests.
 _TRUNCATE_TABLES = [
+    "attendance_tally",
     "attendance_record",
     "student_term_enrollment",
     "student_class_enrollment",
@@ -109,10 +118,15 @@ async def clean_db(db_engine):
     student_behaviour_record, etc.) reference listed tables, so PostgreSQL refuses
     RESTRICT. CASCADE also truncates those non-listed tables — that's fine because
     the admin_position fixture re-creates what it needs for each test.
+    In-process caches are dropped too, so no test sees another's rows.
     """
     _truncate_sql = text(f"TRUNCATE {', '.join(_TRUNCATE_TABLES)} RESTART IDENTITY CASCADE")
     async with db_engine.begin() as conn:
         await conn.execute(_truncate_sql)
+    clear_local_cache()
+    clear_local_denials()
+    clear_user_cache()
+    clear_local_generations()
     yield
     async with db_engine.begin() as conn:
         await conn.execute(_truncate_sql)
@@ -123,7 +137,7 @@ async def clean_db(db_engine):
 @pytest_asyncio.fixture
 async def session(db_engine) -> AsyncGenerator[AsyncSession, None]:
     """A real committed session — fixture data is visible to HTTP endpoints."""
-    factory = async_sessionmaker(db_engine, expire_on_commit=False)
+    factory = async_sessionmaker(db_engine, sync_session_class=RLSSession, expire_on_commit=False)
     async with factory() as sess:
         yield sess
 
@@ -134,11 +148,19 @@ async def session(db_engine) -> AsyncGenerator[AsyncSession, None]:
 def mock_redis() -> AsyncMock:
     redis = AsyncMock()
     redis.get.return_value = None
+    redis.mget.return_value = [None, None]
     redis.setex.return_value = True
     redis.delete.return_value = 1
     redis.ping.return_value = True
     redis.incr.return_value = 1
     redis.expire.return_value = True
+    redis.smembers.return_value = set()
+    redis.sadd.return_value = 1
+    redis.smismember.return_value = []
+    redis.hget.return_value = None
+    redis.set.return_value = True
+    redis.getdel.return_value = None
+    redis.publish.return_value = 0
     return redis
 
 
@@ -153,7 +175,9 @@ async def client(db_engine, mock_redis: AsyncMock) -> AsyncGenerator[AsyncClient
     first test's event loop and break on subsequent tests. The test engine uses
     NullPool, so every request gets a brand-new connection on the current loop.
     """
-    test_session_factory = async_sessionmaker(db_engine, expire_on_commit=False)
+    test_session_factory = async_sessionmaker(
+        db_engine, sync_session_class=RLSSession, expire_on_commit=False,
+    )
 
     async def override_session():
         async with test_session_factory() as session:
@@ -308,3 +332,134 @@ async def admin_user_all_perms(
         ))
     await session.commit()
     return admin_user
+
+
+# ── Academic seeding ──────────────────────────────────────────────
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from app.models.academic import AcademicTerm, AcademicYear, Class, SchoolCalendar
+from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+from app.services.attendance import ensure_attendance_partitions
+
+
+@dataclass
+class SchoolTerm:
+    year: AcademicYear
+    term: AcademicTerm
+    calendar: SchoolCalendar  # the term's one SCHOOL_DAY, on school_day
+
+
+@pytest.fixture
+def school_day() -> date:
+    """Date of the seeded SCHOOL_DAY. Override in a module to pin a fixed date."""
+    return date.today()
+
+
+@pytest_asyncio.fixture
+async def school_term(
+    request, session: AsyncSession, test_school: School, school_day: date
+) -> SchoolTerm:
+    """
+    A current academic year and term around school_day for test_school, with
+    school_day as the term's only SCHOOL_DAY and attendance partitions for
+    the whole term. Parametrise indirectly with {"current": False} for a
+    term that has not been activated.
+    """
+    params = getattr(request, "param", {})
+    start = school_day - timedelta(days=60)
+    year = AcademicYear(
+        school_id=test_school.id, name=f"{start.year}/{start.year + 1}",
+        start_date=start, end_date=school_day + timedelta(days=200), is_current=True,
+    )
+    session.add(year)
+    await session.flush()
+    term = AcademicTerm(
+        academic_year_id=year.id, name="Term 1",
+        start_date=school_day - timedelta(days=30), end_date=school_day + timedelta(days=30),
+        is_current=params.get("current", True),
+    )
+    session.add(term)
+    await session.flush()
+    calendar = SchoolCalendar(
+        school_id=test_school.id, academic_term_id=term.id, date=school_day, day_type="SCHOOL_DAY",
+    )
+    session.add(calendar)
+    await ensure_attendance_partitions(term.start_date, term.end_date, session)
+    await session.commit()
+    return SchoolTerm(year, term, calendar)
+
+
+@pytest.fixture
+def seeded_class(session: AsyncSession, test_school: School, school_term: SchoolTerm):
+    """
+    `cls, enrollments = await seeded_class(size, stream="A")` — a Basic 4
+    class with `size` students enrolled for school_term.
+    """
+
+    async def seed(size: int, stream: str = "A") -> tuple[Class, list[StudentTermEnrollment]]:
+        cls = Class(
+            school_id=test_school.id, education_level="BASIC", level="Basic", year=4, stream=stream,
+        )
+        session.add(cls)
+        await session.flush()
+        term_enrollments = []
+        for i in range(size):
+            student = Student(
+                school_id=test_school.id, first_name=f"Pupil{i}", last_name=stream, gender="FEMALE",
+            )
+            session.add(student)
+            await session.flush()
+            sce = StudentClassEnrollment(
+                student_id=student.id, class_id=cls.id, academic_year_id=school_term.year.id,
+            )
+            session.add(sce)
+            await session.flush()
+            ste = StudentTermEnrollment(
+                student_class_enrollment_id=sce.id, academic_term_id=school_term.term.id,
+                enrolled_date=school_term.term.start_date,
+            )
+            session.add(ste)
+            term_enrollments.append(ste)
+        await session.commit()
+        return cls, term_enrollments
+
+    return seed
+
+
+# ── Shared helpers ────────────────────────────────────────────────
+
+@pytest.fixture
+def bearer() -> Callable[[User], dict[str, str]]:
+    """Authorization headers carrying an access token for a user."""
+
+    def headers(user: User) -> dict[str, str]:
+        token = create_access_token(
+            str(user.id),
+            str(user.school_id) if user.school_id else None,
+            user.system_role,
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+
+@pytest.fixture
+def count_queries(db_engine) -> Callable[[], AbstractContextManager[list[str]]]:
+    """`with count_queries() as statements:` — each statement the test engine runs inside it."""
+
+    @contextmanager
+    def counting() -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine.sync_engine, "before_cursor_execute", _before)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine.sync_engine, "before_cursor_execute", _before)
+
+    return counting
@@ -0,0 +1,56 @@
+"""
+Query-budget marker — fails a test whose HTTP requests run too many statements.
+
+    from tests.query_budget import query_budget
+
+    @query_budget(8)
+    async def test_student_list(client, ...):
+        await client.get("/api/v1/students", headers=...)
+
+Every request the test sends through the app is counted by
+QueryMetricsMiddleware (see app.core.query_metrics); if any one of them runs
+more than n SQL statements the test fails, listing the request's most
+repeated statement shapes. Fixture setup that talks to the database directly
+is not counted. Loaded from conftest.py via pytest_plugins.
+"""
+import pytest
+
+from app.core import middleware
+from app.core.query_metrics import QueryStats
+
+query_budget = pytest.mark.query_budget
+
+
+def over_budget(requests: list[tuple[str, QueryStats]], budget: int) -> list[str]:
+    """One line per request that ran more than `budget` statements."""
+    lines = []
+    for route, stats in requests:
+        if stats.count > budget:
+            top = "; ".join(f"{n}x {shape[:120]}" for shape, n in stats.shapes.most_common(3))
+            lines.append(f"{route}: {stats.count} statements (budget {budget}) — {top}")
+    return lines
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item: pytest.Item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    budget = marker.args[0]
+    requests: list[tuple[str, QueryStats]] = []
+    record = middleware.record_request
+
+    def record_and_keep(route: str, stats: QueryStats) -> None:
+        requests.append((route, stats))
+        record(route, stats)
+
+    middleware.record_request = record_and_keep
+    try:
+        result = yield
+    finally:
+        middleware.record_request = record
+    exceeded = over_budget(requests, budget)
+    if exceeded:
+        pytest.fail("Query budget exceeded:\n  " + "\n  ".join(exceeded), pytrace=False)
+    return result
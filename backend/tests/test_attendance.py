@@ -0,0 +1,754 @@
+"""
+Integration tests for /api/v1/attendance.
+
+Coverage:
+  - Register submit: insert, re-submit (update), foreign enrollment rejected
+  - Query-count regression: submit cost is constant whatever the class size
+  - Term summary: single class, multi-class (class_ids=), another school's
+    term rejected, constant query count
+  - Submitted-today set: Redis hit, cold-cache rebuild, update on submit
+  - Attendance tally: moved on re-submission, rebuilt from raw records, a
+    concurrent write waits for the rebuild's lock
+  - Offline sync: multi-day push, marked_at conflicts, per-register rejection,
+    paged pull with cursor, bad cursor rejected
+  - Export: CSV for one class, XLSX for the whole school, inactive and
+    transferred students left out
+  - Partitioning: calendar generation creates monthly partitions, rows route to them
+  - Trends (mv_attendance_summary): by class, gender and week after a refresh;
+    register writes flag the view for the worker's refresh
+  - Roll-call stream: submit publishes per-class events; the per-process hub
+    fans them out by school and flags overflowing subscribers
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.academic import AcademicTerm, AcademicYear, Class, SchoolCalendar
+from app.models.attendance import AttendanceRecord, AttendanceTally
+from app.models.school import School
+from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+from app.models.user import User
+from app.services.attendance import rebuild_attendance_tally, submitted_class_ids
+from app.services.attendance_analytics import refresh_attendance_summary
+from app.services.calendar_generator import generate_term_calendar
+from app.services.roll_call import RollCallHub
+
+SCHOOL_DAY = date(2025, 10, 6)  # a Monday inside the seeded term
+
+
+# ── Fixtures ───────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def school_day() -> date:
+    return SCHOOL_DAY
+
+
+def _register(
+    cls: Class, enrollments: list[StudentTermEnrollment], status: str = "PRESENT"
+) -> dict:
+    return {
+        "class_id": str(cls.id),
+        "date": SCHOOL_DAY.isoformat(),
+        "records": [{"term_enrollment_id": str(e.id), "status": status} for e in enrollments],
+    }
+
+
+# ── Submit register ────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_submit_register_inserts_then_updates(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=3)
+
+    r = await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments), headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    assert r.json() == {
+        "date": SCHOOL_DAY.isoformat(), "class_id": str(cls.id),
+        "marked": 3, "created": 3, "updated": 0,
+    }
+
+    r = await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments, "ABSENT"), headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    assert (r.json()["created"], r.json()["updated"]) == (0, 3)
+
+    statuses = list(await session.scalars(select(AttendanceRecord.status)))
+    assert statuses == ["ABSENT"] * 3
+
+
+@pytest.mark.asyncio
+async def test_submit_register_rejects_enrollment_from_other_class(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=2)
+    _, outsiders = await seeded_class(size=1, stream="B")
+
+    r = await client.post(
+        "/api/v1/attendance/register",
+        json=_register(cls, enrollments + outsiders),
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 422
+    assert str(outsiders[0].id) in r.json()["detail"]
+    assert await session.scalar(select(func.count(AttendanceRecord.id))) == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_register_query_count_is_constant(
+    client: AsyncClient, session: AsyncSession, count_queries,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    """A 40-student register must cost exactly as many statements as a 2-student one."""
+    headers = bearer(admin_user_all_perms)
+    small, small_enrollments = await seeded_class(size=2)
+    large, large_enrollments = await seeded_class(size=40, stream="B")
+    # Warm the calendar cache so both measured requests take the same path
+    await client.get(
+        f"/api/v1/attendance/register?class_id={small.id}&target_date={SCHOOL_DAY}",
+        headers=headers,
+    )
+
+    with count_queries() as small_statements:
+        r = await client.post(
+            "/api/v1/attendance/register",
+            json=_register(small, small_enrollments), headers=headers,
+        )
+        assert r.status_code == 200, r.text
+
+    with count_queries() as large_statements:
+        r = await client.post(
+            "/api/v1/attendance/register",
+            json=_register(large, large_enrollments), headers=headers,
+        )
+        assert r.status_code == 200, r.text
+
+    assert len(large_statements) == len(small_statements), large_statements
+
+
+# ── Term summary ───────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_summary_counts_statuses(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=2)
+    body = _register(cls, enrollments)
+    body["records"][1]["status"] = "LATE"
+    await client.post("/api/v1/attendance/register", json=body, headers=headers)
+
+    r = await client.get(f"/api/v1/attendance/summary?class_id={cls.id}", headers=headers)
+    assert r.status_code == 200, r.text
+    summary = r.json()
+    assert summary["total_school_days"] == 1
+    assert sorted((s["present"], s["late"]) for s in summary["students"]) == [(0, 1), (1, 0)]
+    assert all(s["percentage"] == 100.0 for s in summary["students"])
+
+
+@pytest.mark.asyncio
+async def test_summary_multi_class_mode(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    a, a_enrollments = await seeded_class(size=2)
+    b, _ = await seeded_class(size=0, stream="B")
+    await client.post(
+        "/api/v1/attendance/register", json=_register(a, a_enrollments), headers=headers,
+    )
+
+    r = await client.get(
+        f"/api/v1/attendance/summary?class_ids={a.id}&class_ids={b.id}", headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    summaries = {s["class_id"]: s for s in r.json()}
+    assert len(summaries[str(a.id)]["students"]) == 2
+    assert summaries[str(b.id)]["students"] == []
+    assert summaries[str(b.id)]["total_school_days"] == 1
+
+
+@pytest.mark.asyncio
+async def test_summary_requires_exactly_one_class_selector(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, school_term,
+) -> None:
+    r = await client.get("/api/v1/attendance/summary", headers=bearer(admin_user_all_perms))
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_summary_rejects_another_schools_term(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, _ = await seeded_class(size=1)
+    other = School(
+        name="Other School", code="OTH001", slug="other-school",
+        education_levels=["BASIC"], facility_type="DAY",
+    )
+    session.add(other)
+    await session.flush()
+    other_year = AcademicYear(
+        school_id=other.id, name="2025/2026",
+        start_date=date(2025, 9, 1), end_date=date(2026, 7, 31), is_current=True,
+    )
+    session.add(other_year)
+    await session.flush()
+    other_term = AcademicTerm(
+        academic_year_id=other_year.id, name="Term 1",
+        start_date=date(2025, 9, 1), end_date=date(2025, 12, 19), is_current=True,
+    )
+    session.add(other_term)
+    await session.commit()
+
+    for query in (f"class_id={cls.id}", f"class_ids={cls.id}"):
+        r = await client.get(
+            f"/api/v1/attendance/summary?{query}&term_id={other_term.id}",
+            headers=bearer(admin_user_all_perms),
+        )
+        assert r.status_code == 404, r.text
+
+
+@pytest.mark.asyncio
+async def test_summary_query_count_is_constant(
+    client: AsyncClient, session: AsyncSession, count_queries,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    small, _ = await seeded_class(size=2)
+    large, _ = await seeded_class(size=40, stream="B")
+    # Warm caches
+    await client.get(f"/api/v1/attendance/summary?class_id={small.id}", headers=headers)
+
+    with count_queries() as small_statements:
+        await client.get(f"/api/v1/attendance/summary?class_id={small.id}", headers=headers)
+    with count_queries() as large_statements:
+        await client.get(f"/api/v1/attendance/summary?class_id={large.id}", headers=headers)
+
+    assert len(large_statements) == len(small_statements)
+
+
+# ── Submitted-today tracking ───────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_submitted_set_served_from_redis(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School, school_term,
+) -> None:
+    cal = school_term.calendar
+    cached = "7d5a3f51-1f0b-4a3e-9a43-7f0f6f2c1c11"
+    mock_redis.smembers.return_value = {"*", cached}
+
+    with count_queries() as statements:
+        result = await submitted_class_ids(cal, mock_redis, session)
+
+    assert {str(c) for c in result} == {cached}
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_submitted_set_rebuilt_when_incomplete(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, bearer, school_term, seeded_class,
+) -> None:
+    """A set without the sentinel (e.g. Redis restarted) is rebuilt from the DB."""
+    cal = school_term.calendar
+    cls, enrollments = await seeded_class(size=2)
+    r = await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments),
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200
+    mock_redis.sadd.assert_any_await(f"att:submitted:{cal.id}", str(cls.id))
+
+    mock_redis.smembers.return_value = {"00000000-0000-0000-0000-000000000001"}
+    mock_redis.sadd.reset_mock()
+    result = await submitted_class_ids(cal, mock_redis, session)
+
+    assert result == {cls.id}
+    mock_redis.sadd.assert_awaited_once_with(f"att:submitted:{cal.id}", "*", str(cls.id))
+
+
+# ── Attendance tally ───────────────────────────────────────────────────────────
+
+async def _tallies(session: AsyncSession) -> dict:
+    rows = await session.execute(
+        select(AttendanceTally).execution_options(populate_existing=True)
+    )
+    return {
+        t.student_term_enrollment_id: (t.present, t.absent, t.late, t.excused)
+        for t in rows.scalars()
+    }
+
+
+@pytest.mark.asyncio
+async def test_tally_follows_status_changes(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=2)
+
+    await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments), headers=headers,
+    )
+    assert set((await _tallies(session)).values()) == {(1, 0, 0, 0)}
+
+    body = _register(cls, enrollments)
+    body["records"][0]["status"] = "ABSENT"
+    await client.post("/api/v1/attendance/register", json=body, headers=headers)
+
+    tallies = await _tallies(session)
+    assert tallies[enrollments[0].id] == (0, 1, 0, 0)
+    assert tallies[enrollments[1].id] == (1, 0, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_tally_repairs_drift(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=1)
+    await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments, "LATE"),
+        headers=bearer(admin_user_all_perms),
+    )
+
+    tally = await session.get(AttendanceTally, enrollments[0].id)
+    tally.late = 7
+    await session.commit()
+
+    assert await rebuild_attendance_tally(session, test_school.id) == 1
+    await session.commit()
+    assert (await _tallies(session))[enrollments[0].id] == (0, 0, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_register_write_waits_for_tally_rebuild(
+    client: AsyncClient, session: AsyncSession, db_engine,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    """A write during a rebuild applies its delta after the rebuilt rows, not under them."""
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=1)
+    await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments, "LATE"), headers=headers,
+    )
+
+    async with AsyncSession(db_engine) as rebuild:
+        await rebuild_attendance_tally(rebuild, test_school.id)
+        write = asyncio.create_task(client.post(
+            "/api/v1/attendance/register",
+            json=_register(cls, enrollments, "ABSENT"), headers=headers,
+        ))
+        await asyncio.sleep(0.3)
+        assert not write.done(), "register write must wait for the rebuild's lock"
+        await rebuild.commit()
+    assert (await write).status_code == 200
+    assert (await _tallies(session))[enrollments[0].id] == (0, 1, 0, 0)
+
+
+# ── Offline sync ───────────────────────────────────────────────────────────────
+
+def _sync_register(cls: Class, enrollments: list[StudentTermEnrollment], day: date,
+                   status: str, marked_at: datetime) -> dict:
+    return {
+        "class_id": str(cls.id),
+        "date": day.isoformat(),
+        "records": [
+            {"term_enrollment_id": str(e.id), "status": status, "marked_at": marked_at.isoformat()}
+            for e in enrollments
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_sync_pushes_several_days_and_returns_changes(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, school_term, seeded_class,
+) -> None:
+    tuesday = SCHOOL_DAY + timedelta(days=1)
+    session.add(SchoolCalendar(
+        school_id=test_school.id, academic_term_id=school_term.term.id,
+        date=tuesday, day_type="SCHOOL_DAY",
+    ))
+    await session.commit()
+    cls, enrollments = await seeded_class(size=2)
+    marked_at = datetime(2025, 10, 6, 8, 0, tzinfo=UTC)
+
+    r = await client.post("/api/v1/attendance/sync", json={
+        "registers": [
+            _sync_register(cls, enrollments, SCHOOL_DAY, "PRESENT", marked_at),
+            _sync_register(cls, enrollments, tuesday, "LATE", marked_at),
+        ],
+    }, headers=bearer(admin_user_all_perms))
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert (data["created"], data["updated"], data["stale"]) == (4, 0, 0)
+    assert data["rejected"] == []
+    assert data["has_more"] is False
+    assert sorted((c["date"], c["status"]) for c in data["changes"]) == [
+        (SCHOOL_DAY.isoformat(), "PRESENT"), (SCHOOL_DAY.isoformat(), "PRESENT"),
+        (tuesday.isoformat(), "LATE"), (tuesday.isoformat(), "LATE"),
+    ]
+    assert set((await _tallies(session)).values()) == {(1, 0, 1, 0)}
+
+
+@pytest.mark.asyncio
+async def test_sync_later_mark_wins(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=1)
+    nine = datetime(2025, 10, 6, 9, 0, tzinfo=UTC)
+
+    await client.post("/api/v1/attendance/sync", json={
+        "registers": [_sync_register(cls, enrollments, SCHOOL_DAY, "ABSENT", nine)],
+    }, headers=headers)
+
+    r = await client.post("/api/v1/attendance/sync", json={
+        "registers": [
+            _sync_register(cls, enrollments, SCHOOL_DAY, "PRESENT", nine - timedelta(hours=1)),
+        ],
+    }, headers=headers)
+    assert (r.json()["created"], r.json()["updated"], r.json()["stale"]) == (0, 0, 1)
+
+    r = await client.post("/api/v1/attendance/sync", json={
+        "registers": [
+            _sync_register(cls, enrollments, SCHOOL_DAY, "LATE", nine + timedelta(hours=1)),
+        ],
+    }, headers=headers)
+    assert (r.json()["created"], r.json()["updated"], r.json()["stale"]) == (0, 1, 0)
+
+    statuses = list(await session.scalars(
+        select(AttendanceRecord.status).execution_options(populate_existing=True)
+    ))
+    assert statuses == ["LATE"]
+    assert (await _tallies(session))[enrollments[0].id] == (0, 0, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_sync_rejects_bad_register_but_applies_the_rest(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=1)
+    marked_at = datetime(2025, 10, 6, 8, 0, tzinfo=UTC)
+    no_calendar = SCHOOL_DAY + timedelta(days=2)
+
+    r = await client.post("/api/v1/attendance/sync", json={
+        "registers": [
+            _sync_register(cls, enrollments, no_calendar, "PRESENT", marked_at),
+            _sync_register(cls, enrollments, SCHOOL_DAY, "PRESENT", marked_at),
+        ],
+    }, headers=bearer(admin_user_all_perms))
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["created"] == 1
+    assert [(x["index"], x["date"]) for x in data["rejected"]] == [(0, no_calendar.isoformat())]
+
+
+@pytest.mark.asyncio
+async def test_sync_pull_pages_with_cursor(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School,
+    monkeypatch: pytest.MonkeyPatch, bearer, seeded_class,
+) -> None:
+    from app.api.v1 import attendance as attendance_api
+
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=3)
+    await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments), headers=headers,
+    )
+    monkeypatch.setattr(attendance_api, "_SYNC_PAGE_SIZE", 2)
+
+    first = (await client.post(
+        "/api/v1/attendance/sync", json={"class_ids": [str(cls.id)]}, headers=headers,
+    )).json()
+    assert first["has_more"] is True
+    assert len(first["changes"]) == 2
+
+    second = (await client.post(
+        "/api/v1/attendance/sync",
+        json={"class_ids": [str(cls.id)], "cursor": first["cursor"]}, headers=headers,
+    )).json()
+    assert second["has_more"] is False
+    seen = {c["term_enrollment_id"] for c in first["changes"] + second["changes"]}
+    assert seen == {str(e.id) for e in enrollments}
+
+
+@pytest.mark.asyncio
+async def test_sync_invalid_cursor_422(
+    client: AsyncClient, admin_user_all_perms: User, bearer,
+) -> None:
+    r = await client.post(
+        "/api/v1/attendance/sync", json={"cursor": "not-a-cursor"},
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 422
+
+
+# ── Export ─────────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_export_csv_for_one_class(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=2)
+    body = _register(cls, enrollments)
+    body["records"][1]["status"] = "ABSENT"
+    await client.post("/api/v1/attendance/register", json=body, headers=headers)
+
+    r = await client.get(f"/api/v1/attendance/export?class_id={cls.id}", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/csv")
+    assert "attachment" in r.headers["content-disposition"]
+
+    header, *rows = list(csv.reader(io.StringIO(r.content.decode("utf-8-sig"))))
+    assert header[4] == SCHOOL_DAY.isoformat()
+    assert header[-5:] == ["Present", "Absent", "Late", "Excused", "Attendance %"]
+    assert sorted((row[4], row[-5], row[-4]) for row in rows) == [("A", "0", "1"), ("P", "1", "0")]
+    assert {row[0] for row in rows} == {cls.name}
+
+
+@pytest.mark.asyncio
+async def test_export_xlsx_for_whole_school(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    from openpyxl import load_workbook
+
+    headers = bearer(admin_user_all_perms)
+    class_a, enrolled_a = await seeded_class(size=2)
+    class_b, _ = await seeded_class(size=3, stream="B")
+    await client.post(
+        "/api/v1/attendance/register", json=_register(class_a, enrolled_a, "LATE"), headers=headers,
+    )
+
+    r = await client.get("/api/v1/attendance/export?format=xlsx", headers=headers)
+    assert r.status_code == 200, r.text
+
+    sheet = load_workbook(io.BytesIO(r.content)).active
+    _header, *rows = list(sheet.iter_rows(values_only=True))
+    assert len(rows) == 5
+    assert [row[0] for row in rows] == [class_a.name] * 2 + [class_b.name] * 3
+    assert [row[4] for row in rows] == ["L", "L", None, None, None]
+
+
+@pytest.mark.asyncio
+async def test_export_excludes_inactive_and_transferred_students(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    """The export roster matches the register and summary: active students, active enrollments."""
+    headers = bearer(admin_user_all_perms)
+    cls, enrollments = await seeded_class(size=3)
+    inactive_sce = await session.get(
+        StudentClassEnrollment, enrollments[0].student_class_enrollment_id,
+    )
+    (await session.get(Student, inactive_sce.student_id)).is_active = False
+    transferred_sce = await session.get(
+        StudentClassEnrollment, enrollments[1].student_class_enrollment_id,
+    )
+    transferred_sce.status = "TRANSFERRED"
+    await session.commit()
+
+    r = await client.get(f"/api/v1/attendance/export?class_id={cls.id}", headers=headers)
+    assert r.status_code == 200, r.text
+    _, *rows = list(csv.reader(io.StringIO(r.content.decode("utf-8-sig"))))
+    assert len(rows) == 1
+
+
+# ── Partitioning ───────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_generate_term_calendar_creates_month_partitions(
+    session: AsyncSession, test_school: School,
+) -> None:
+    year = AcademicYear(
+        school_id=test_school.id, name="2030/2031",
+        start_date=date(2030, 9, 1), end_date=date(2031, 7, 31),
+    )
+    session.add(year)
+    await session.flush()
+    term = AcademicTerm(
+        academic_year_id=year.id, name="Term 2",
+        start_date=date(2031, 1, 6), end_date=date(2031, 4, 3),
+    )
+    session.add(term)
+    await session.flush()
+
+    await generate_term_calendar(term, str(test_school.id), session)
+    await session.commit()
+
+    for month in ("y2031m01", "y2031m02", "y2031m03", "y2031m04"):
+        name = f"attendance_record_{month}"
+        assert await session.scalar(text("SELECT to_regclass(:n)"), {"n": name}) is not None
+
+
+@pytest.mark.asyncio
+async def test_register_rows_land_in_month_partition(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=2)
+    await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments),
+        headers=bearer(admin_user_all_perms),
+    )
+
+    partitions = set(await session.scalars(
+        text("SELECT DISTINCT tableoid::regclass::text FROM attendance_record")
+    ))
+    assert partitions == {"attendance_record_y2025m10"}
+    dates = set(await session.scalars(select(AttendanceRecord.attendance_date)))
+    assert dates == {SCHOOL_DAY}
+
+
+# ── Trends ─────────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_trends_read_refreshed_view(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    headers = bearer(admin_user_all_perms)
+    class_a, enrolled_a = await seeded_class(size=2)
+    class_b, enrolled_b = await seeded_class(size=2, stream="B")
+    body = _register(class_a, enrolled_a)
+    body["records"][1]["status"] = "LATE"
+    await client.post("/api/v1/attendance/register", json=body, headers=headers)
+    body = _register(class_b, enrolled_b, "ABSENT")
+    body["records"][1]["status"] = "PRESENT"
+    await client.post("/api/v1/attendance/register", json=body, headers=headers)
+
+    # Not visible until the view is refreshed
+    r = await client.get("/api/v1/attendance/trends/classes", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == []
+
+    await refresh_attendance_summary(session)
+
+    r = await client.get("/api/v1/attendance/trends/classes", headers=headers)
+    assert r.status_code == 200, r.text
+    assert [(t["class_id"], t["marked"], t["rate"]) for t in r.json()] == [
+        (str(class_b.id), 2, 50.0), (str(class_a.id), 2, 100.0),
+    ]
+    assert r.json()[1]["late"] == 1 and r.json()[1]["school_days"] == 1
+
+    r = await client.get("/api/v1/attendance/trends/gender", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == [{
+        "gender": "FEMALE", "school_days": 1, "marked": 4,
+        "present": 2, "absent": 1, "late": 1, "excused": 0, "rate": 75.0,
+    }]
+
+    r = await client.get(f"/api/v1/attendance/trends/weekly?class_id={class_b.id}", headers=headers)
+    assert r.status_code == 200, r.text
+    weeks = r.json()
+    assert [(w["week_start"], w["absent"]) for w in weeks] == [(SCHOOL_DAY.isoformat(), 1)]
+
+
+@pytest.mark.asyncio
+async def test_register_write_flags_analytics_refresh(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=1)
+    r = await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments),
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+    mock_redis.set.assert_any_await("analytics:attendance:dirty", "1")
+
+
+# ── Roll-call stream ───────────────────────────────────────────────────────────
+
+class _FakePubSub:
+    def __init__(self, messages: asyncio.Queue) -> None:
+        self.messages = messages
+        self.patterns: list[str] = []
+
+    async def psubscribe(self, pattern: str) -> None:
+        self.patterns.append(pattern)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.pubsubs: list[_FakePubSub] = []
+
+    def pubsub(self) -> _FakePubSub:
+        self.pubsubs.append(_FakePubSub(self.messages))
+        return self.pubsubs[-1]
+
+
+@pytest.mark.asyncio
+async def test_submit_register_publishes_roll_call_event(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, bearer, seeded_class,
+) -> None:
+    cls, enrollments = await seeded_class(size=1)
+    r = await client.post(
+        "/api/v1/attendance/register", json=_register(cls, enrollments),
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+
+    channel, message = mock_redis.publish.await_args.args
+    assert channel == f"attendance:rollcall:{test_school.id}"
+    assert json.loads(message) == {"date": SCHOOL_DAY.isoformat(), "class_id": str(cls.id)}
+
+
+@pytest.mark.asyncio
+async def test_roll_call_hub_fans_out_by_school() -> None:
+    hub, redis = RollCallHub(), _FakeRedis()
+    school_id, other_school, class_id = uuid4(), uuid4(), uuid4()
+
+    async with hub.subscribe(school_id, redis) as sub:
+        assert redis.pubsubs[0].patterns == ["attendance:rollcall:*"]
+        for school in (other_school, school_id):
+            await redis.messages.put({
+                "type": "pmessage",
+                "channel": f"attendance:rollcall:{school}",
+                "data": json.dumps({"date": SCHOOL_DAY.isoformat(), "class_id": str(class_id)}),
+            })
+        event = await asyncio.wait_for(sub.queue.get(), 1)
+        assert event == (SCHOOL_DAY, class_id)
+        assert sub.queue.empty()
+
+        message = json.dumps({"date": SCHOOL_DAY.isoformat(), "class_id": str(class_id)})
+        for _ in range(sub.queue.maxsize + 1):
+            hub.dispatch(f"attendance:rollcall:{school_id}", message)
+        assert sub.overflowed
+
+    # Last stream closed — the shared subscription is released
+    assert hub._task is None
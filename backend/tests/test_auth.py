@@ -1,12 +1,21 @@
 """
-Auth endpoint integration tests — login, refresh, logout, /me.
+Auth endpoint integration tests — login (incl. Argon2 rehash), refresh, logout, /me.
 Uses the real DB session (rolls back after each test) and mock Redis.
 """
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import create_access_token, create_refresh_token, hash_password
+from argon2 import PasswordHasher
+
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_password,
+    password_hash_stats,
+    password_needs_rehash,
+    verify_password,
+)
 from app.models.user import User
 
 
@@ -96,6 +105,38 @@ async def test_login_unverified_user(
     assert r.status_code == 403
 
 
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_argon2_params(
+    client: AsyncClient, session: AsyncSession, admin_user: User
+) -> None:
+    weak = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1)
+    admin_user.password_hash = weak.hash("TestPass123!")
+    await session.commit()
+    assert password_needs_rehash(admin_user.password_hash)
+
+    r = await client.post("/api/v1/auth/login", json={
+        "email": "admin@testschool.edu.gh",
+        "password": "TestPass123!",
+    })
+    assert r.status_code == 200
+
+    await session.refresh(admin_user)
+    assert not password_needs_rehash(admin_user.password_hash)
+    assert verify_password("TestPass123!", admin_user.password_hash)
+
+
+@pytest.mark.asyncio
+async def test_login_hashes_off_the_event_loop(client: AsyncClient, admin_user: User) -> None:
+    before = password_hash_stats.calls
+    r = await client.post("/api/v1/auth/login", json={
+        "email": "admin@testschool.edu.gh",
+        "password": "TestPass123!",
+    })
+    assert r.status_code == 200
+    assert password_hash_stats.calls == before + 1
+    assert password_hash_stats.in_flight == 0
+
+
 # ── Refresh ────────────────────────────────────────────────────────────────────
 
 @pytest.mark.asyncio
@@ -207,3 +248,164 @@ async def test_me_superadmin_has_all_permissions_true(
     assert all(v is True for v in body["permissions"].values()), (
         "Every permission must be True for SUPERADMIN"
     )
+
+
+# ── Auth context (one JWT verify per request) ──────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_token_verified_once_and_then_served_from_cache(
+    client: AsyncClient, admin_user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from app.core import auth_context
+
+    calls = []
+    real_decode = auth_context.decode_token
+    monkeypatch.setattr(
+        auth_context, "decode_token", lambda token: calls.append(token) or real_decode(token)
+    )
+    headers = _bearer(admin_user)
+
+    r = await client.get("/api/v1/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert len(calls) == 1, "limiter and get_current_user must share one verification"
+
+    r = await client.get("/api/v1/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert len(calls) == 1, "a repeated token is served from the jti cache"
+
+
+def test_token_cache_requires_identical_token() -> None:
+    """A cached jti must not vouch for a different token carrying the same jti."""
+    import uuid
+
+    from app.core.auth_context import verify_bearer
+
+    token = create_access_token(str(uuid.uuid4()), str(uuid.uuid4()), "SCHOOL_STAFF")
+    assert verify_bearer(token) is not None
+
+    header, payload, signature = token.split(".")
+    forged = f"{header}.{payload}.{signature[:-4]}AAAA"
+    assert verify_bearer(forged) is None
+
+
+# ── User snapshot cache ────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_deactivation_evicts_cached_user(
+    client: AsyncClient, session: AsyncSession, mock_redis, admin_user_all_perms: User,
+    test_school,
+) -> None:
+    target = User(
+        email="teacher@testschool.edu.gh",
+        password_hash=hash_password("Pass123!"),
+        system_role="SCHOOL_STAFF",
+        school_id=test_school.id,
+        is_active=True,
+        is_verified=True,
+    )
+    session.add(target)
+    await session.commit()
+    headers = _bearer(target)
+
+    assert (await client.get("/api/v1/auth/me", headers=headers)).status_code == 200
+
+    r = await client.patch(
+        f"/api/v1/settings/users/{target.id}", json={"is_active": False},
+        headers=_bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200
+    mock_redis.publish.assert_any_await("auth:user:invalidate", str(target.id))
+
+    assert (await client.get("/api/v1/auth/me", headers=headers)).status_code == 401
+
+
+class _FakeRedis:
+    """Just enough of Redis for the user cache, with the compare-and-set script emulated."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    async def mget(self, *keys):
+        return [self.data.get(k) for k in keys]
+
+    async def evalsha(self, sha, numkeys, snapshot_key, version_key, version, value, ttl):
+        if self.data.get(version_key, "") != version:
+            return 0
+        self.data[snapshot_key] = value
+        return 1
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+
+    async def expire(self, key, ttl):
+        pass
+
+    async def delete(self, *keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+    async def publish(self, channel, message):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_fill_is_not_overwritten() -> None:
+    """A snapshot read before an invalidation must not be cached after it."""
+    import uuid
+    from unittest.mock import AsyncMock
+
+    from app.services.user_cache import get_active_user, invalidate_user
+
+    redis = _FakeRedis()
+    user_id = uuid.uuid4()
+    stale = User(id=user_id, email="t@x.gh", system_role="SCHOOL_STAFF", is_active=True)
+    session = AsyncMock()
+
+    async def load_then_deactivate(stmt):
+        # The row was read; a deactivation commits and invalidates before the cache write
+        await invalidate_user(redis, user_id)
+        return stale
+
+    session.scalar.side_effect = load_then_deactivate
+    assert (await get_active_user(str(user_id), redis, session)).id == user_id
+    assert f"auth:user:{user_id}" not in redis.data
+
+    session.scalar.side_effect = None
+    session.scalar.return_value = None  # now deactivated in the database
+    assert await get_active_user(str(user_id), redis, session) is None
+
+
+@pytest.mark.asyncio
+async def test_fill_without_invalidation_is_cached() -> None:
+    import uuid
+    from unittest.mock import AsyncMock
+
+    from app.services.user_cache import get_active_user
+
+    redis = _FakeRedis()
+    user_id = uuid.uuid4()
+    session = AsyncMock()
+    session.scalar.return_value = User(id=user_id, email="t@x.gh", system_role="SCHOOL_STAFF", is_active=True)
+
+    await get_active_user(str(user_id), redis, session)
+    await get_active_user(str(user_id), redis, session)
+    assert f"auth:user:{user_id}" in redis.data
+    assert session.scalar.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_change_password_with_cached_user(client: AsyncClient, admin_user: User) -> None:
+    headers = _bearer(admin_user)
+    assert (await client.get("/api/v1/auth/me", headers=headers)).status_code == 200
+
+    r = await client.post("/api/v1/auth/change-password", headers=headers, json={
+        "current_password": "TestPass123!",
+        "new_password": "NewPass456!",
+    })
+    assert r.status_code == 204
+
+    r = await client.post("/api/v1/auth/login", json={
+        "email": "admin@testschool.edu.gh",
+        "password": "NewPass456!",
+    })
+    assert r.status_code == 200
@@ -0,0 +1,164 @@
+"""
+School calendar cache tests.
+
+Coverage:
+  - Repeat lookups are served in-process with no DB round trip
+  - Redis hits are decoded without touching the DB
+  - Missing rows are cached too ("no current term" is a cache hit)
+  - activate_term / regenerate_calendar invalidate (generation INCR + local drop + publish)
+  - An invalidation published by another process drops this process's entries
+"""
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache_listener import listener
+from app.models.school import School
+from app.models.user import User
+from app.services import calendar_cache
+from app.services.calendar_cache import (
+    TermInfo,
+    clear_local_cache,
+    get_calendar_day,
+    get_current_term,
+)
+
+SCHOOL_DAY = date(2025, 10, 6)
+
+
+@pytest.fixture
+def school_day() -> date:
+    return SCHOOL_DAY
+
+
+class _QueuePubSub:
+    """Stands in for redis.pubsub(): delivers whatever the test puts on the queue."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.subscribed = asyncio.Event()
+
+    async def subscribe(self, *channels: str) -> None:
+        self.subscribed.set()
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+            self.queue.task_done()
+
+    async def aclose(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_repeat_lookup_skips_database(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+    school_term,
+) -> None:
+    first = await get_current_term(test_school.id, mock_redis, session)
+    day = await get_calendar_day(test_school.id, SCHOOL_DAY, mock_redis, session)
+    assert first.id == school_term.term.id and first.year_name == "2025/2026"
+    assert day.day_type == "SCHOOL_DAY"
+
+    with count_queries() as statements:
+        again = await get_current_term(test_school.id, mock_redis, session)
+        await get_calendar_day(test_school.id, SCHOOL_DAY, mock_redis, session)
+    assert again == first
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_is_decoded_without_database(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+    school_term,
+) -> None:
+    cached = await get_current_term(test_school.id, mock_redis, session)
+    field, encoded = mock_redis.hset.await_args.args[1:]
+    assert field == "term"
+
+    clear_local_cache()
+    mock_redis.hget.return_value = encoded
+    with count_queries() as statements:
+        decoded = await get_current_term(test_school.id, mock_redis, session)
+    assert statements == []
+    assert isinstance(decoded, TermInfo)
+    assert decoded == cached and decoded.id == school_term.term.id
+
+
+@pytest.mark.asyncio
+async def test_missing_term_is_cached(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+) -> None:
+    assert await get_current_term(test_school.id, mock_redis, session) is None
+    with count_queries() as statements:
+        assert await get_current_term(test_school.id, mock_redis, session) is None
+    assert statements == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("school_term", [{"current": False}], indirect=True)
+async def test_activate_term_invalidates(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, school_term, bearer,
+) -> None:
+    term = school_term.term
+    assert await get_current_term(test_school.id, mock_redis, session) is None
+
+    r = await client.post(
+        f"/api/v1/settings/terms/{term.id}/activate", headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+    mock_redis.incr.assert_any_await(f"cal:gen:{test_school.id}")
+    mock_redis.publish.assert_any_await(calendar_cache.CHANNEL, str(test_school.id))
+
+    current = await get_current_term(test_school.id, mock_redis, session)
+    assert current is not None and current.id == term.id
+
+
+@pytest.mark.asyncio
+async def test_regenerate_calendar_invalidates(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, school_term, bearer,
+) -> None:
+    term = school_term.term
+    saturday = date(2025, 10, 11)
+    assert await get_calendar_day(test_school.id, saturday, mock_redis, session) is None
+
+    r = await client.post(
+        f"/api/v1/settings/terms/{term.id}/generate-calendar", headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 204, r.text
+    assert len(calendar_cache._local) == 0
+
+    day = await get_calendar_day(test_school.id, saturday, mock_redis, session)
+    assert day is not None and day.day_type == "WEEKEND"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_another_process_drops_local_entries(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+    school_term,
+) -> None:
+    pubsub = _QueuePubSub()
+    mock_redis.pubsub = Mock(return_value=pubsub)
+    listener.start(mock_redis)
+    try:
+        await pubsub.subscribed.wait()
+        await get_current_term(test_school.id, mock_redis, session)
+
+        # Another process activated a term and published the school id
+        await pubsub.queue.put({
+            "type": "message", "channel": calendar_cache.CHANNEL, "data": str(test_school.id),
+        })
+        await pubsub.queue.join()
+
+        with count_queries() as statements:
+            current = await get_current_term(test_school.id, mock_redis, session)
+        assert statements, "the dropped entry must be reloaded from the database"
+        assert current.id == school_term.term.id
+    finally:
+        await listener.close()
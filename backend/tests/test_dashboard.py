@@ -0,0 +1,399 @@
+"""
+Integration tests for /api/v1/dashboard.
+
+Coverage:
+  - Admin stats: every count from one statement, matching the seeded school
+  - Admin stats cache: a Redis hit costs no queries; concurrent misses in one
+    process share a single computation
+  - Teacher classes: constant query count whatever the number of classes and
+    subjects; attendance status and registration counts per class
+  - Precomputed tiles: fresh tile served without queries, stale tile served
+    and queued, tile with a write the worker has not drained (its own target
+    or, for a teacher, one of its classes) recomputed inline, tile from
+    another day recomputed; class-teacher assignment queues a recompute;
+    a class target rebuilds its teachers' tiles
+"""
+import asyncio
+import json
+import time
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.academic import (
+    AcademicTerm,
+    AcademicYear,
+    Class,
+    ClassSubject,
+    ClassTeacher,
+    SchoolCalendar,
+    SubjectTeacher,
+)
+from app.models.assessment import StudentSubjectRegistration
+from app.models.attendance import AttendanceRecord
+from app.models.school import School
+from app.models.staff import StaffMember, StaffPosition
+from app.models.student import Student, StudentClassEnrollment, StudentTermEnrollment
+from app.models.user import User, UserRole
+from app.services.calendar_cache import get_calendar_day, get_current_year
+from app.services.dashboard_stats import compute_admin_stats, get_admin_stats
+from app.services.dashboard_tiles import get_admin_tile, get_teacher_tile, recompute_tiles
+
+TODAY = date.today()
+
+
+async def _seed_school_day(session: AsyncSession, school: School, school_term) -> None:
+    """
+    In school_term: two staff (one with an account), two classes (one with a
+    class teacher), three students, and today's register taken for one class.
+    """
+    year, term, cal = school_term.year, school_term.term, school_term.calendar
+    teacher = StaffMember(
+        school_id=school.id, first_name="Ama", last_name="Owusu", category="TEACHING",
+    )
+    clerk = StaffMember(
+        school_id=school.id, first_name="Yaw", last_name="Boateng", category="NON_TEACHING",
+    )
+    session.add_all([teacher, clerk])
+    await session.flush()
+    account = User(
+        email="ama@testschool.edu.gh", password_hash="x", system_role="SCHOOL_STAFF",
+        school_id=school.id, staff_member_id=teacher.id, is_active=True,
+    )
+    session.add(account)
+
+    marked = Class(
+        school_id=school.id, education_level="BASIC", level="Basic", year=4, stream="A",
+    )
+    unmarked = Class(
+        school_id=school.id, education_level="BASIC", level="Basic", year=4, stream="B",
+    )
+    session.add_all([marked, unmarked])
+    await session.flush()
+    session.add(ClassTeacher(
+        class_id=marked.id, staff_member_id=teacher.id, academic_year_id=year.id,
+    ))
+
+    for i, cls in enumerate([marked, marked, unmarked]):
+        student = Student(
+            school_id=school.id, first_name=f"Pupil{i}", last_name="X", gender="MALE",
+        )
+        session.add(student)
+        await session.flush()
+        sce = StudentClassEnrollment(
+            student_id=student.id, class_id=cls.id, academic_year_id=year.id,
+        )
+        session.add(sce)
+        await session.flush()
+        ste = StudentTermEnrollment(
+            student_class_enrollment_id=sce.id, academic_term_id=term.id,
+            enrolled_date=term.start_date,
+        )
+        session.add(ste)
+        await session.flush()
+        if cls is marked:
+            session.add(AttendanceRecord(
+                school_id=school.id, student_term_enrollment_id=ste.id,
+                school_calendar_id=cal.id, attendance_date=TODAY, status="PRESENT",
+                marked_by=account.id, marked_at=datetime.now(UTC),
+            ))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_counts(
+    client: AsyncClient, session: AsyncSession,
+    admin_user_all_perms: User, test_school: School, bearer, school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+
+    r = await client.get("/api/v1/dashboard/summary", headers=bearer(admin_user_all_perms))
+    assert r.status_code == 200, r.text
+    assert r.json()["admin"] == {
+        "staff_total": 2,
+        "staff_no_account": 1,
+        "classes_total": 2,
+        "classes_no_teacher": 1,
+        "students_total": 3,
+        "attendance_submitted_today": 1,
+        "attendance_classes_today": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_is_one_statement(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+    school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+    # Warm the calendar cache — year and today's row are not part of the statement
+    await get_current_year(test_school.id, mock_redis, session)
+    await get_calendar_day(test_school.id, TODAY, mock_redis, session)
+
+    with count_queries() as statements:
+        stats = await compute_admin_stats(test_school.id, mock_redis, session)
+    assert len(statements) == 1, statements
+    assert stats["attendance_submitted_today"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_served_from_redis(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+) -> None:
+    cached = {
+        "staff_total": 9, "staff_no_account": 0, "classes_total": 4, "classes_no_teacher": 0,
+        "students_total": 120, "attendance_submitted_today": 3, "attendance_classes_today": 4,
+    }
+    mock_redis.get.return_value = json.dumps(cached)
+
+    with count_queries() as statements:
+        assert await get_admin_stats(test_school.id, mock_redis, session) == cached
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_concurrent_misses_compute_once(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+    school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+    await get_current_year(test_school.id, mock_redis, session)
+    await get_calendar_day(test_school.id, TODAY, mock_redis, session)
+
+    with count_queries() as statements:
+        results = await asyncio.gather(*(
+            get_admin_stats(test_school.id, mock_redis, session) for _ in range(10)
+        ))
+    assert len(statements) == 1, statements
+    assert all(r == results[0] for r in results)
+    mock_redis.setex.assert_awaited_once()
+
+
+# ── Teacher classes ────────────────────────────────────────────────────────────
+
+async def _seed_class_teacher(
+    session: AsyncSession, school: School, year: AcademicYear, term: AcademicTerm,
+    cal: SchoolCalendar, *, name: str, classes: int, subjects: int,
+) -> User:
+    """A class teacher of `classes` classes, teaching `subjects` subjects in each."""
+    staff = StaffMember(school_id=school.id, first_name=name, last_name="T", category="TEACHING")
+    session.add(staff)
+    await session.flush()
+    user = User(
+        email=f"{name.lower()}@testschool.edu.gh", password_hash="x", system_role="SCHOOL_STAFF",
+        school_id=school.id, staff_member_id=staff.id, is_active=True, is_verified=True,
+    )
+    session.add(user)
+    await session.flush()
+    position = await session.scalar(
+        select(StaffPosition).where(StaffPosition.code == "CLASS_TEACHER")
+    )
+    session.add(UserRole(user_id=user.id, role_id=position.id, assigned_at=datetime.now(UTC)))
+
+    for c in range(classes):
+        cls = Class(
+            school_id=school.id, education_level="BASIC", level="Basic", year=5,
+            stream=f"{name}{c}",
+        )
+        session.add(cls)
+        await session.flush()
+        session.add(ClassTeacher(
+            class_id=cls.id, staff_member_id=staff.id, academic_year_id=year.id,
+        ))
+        student = Student(
+            school_id=school.id, first_name=f"{name}{c}", last_name="S", gender="MALE",
+        )
+        session.add(student)
+        await session.flush()
+        sce = StudentClassEnrollment(
+            student_id=student.id, class_id=cls.id, academic_year_id=year.id,
+        )
+        session.add(sce)
+        await session.flush()
+        ste = StudentTermEnrollment(
+            student_class_enrollment_id=sce.id, academic_term_id=term.id,
+            enrolled_date=term.start_date,
+        )
+        session.add(ste)
+        await session.flush()
+        if c == 0:
+            session.add(AttendanceRecord(
+                school_id=school.id, student_term_enrollment_id=ste.id,
+                school_calendar_id=cal.id, attendance_date=TODAY, status="PRESENT",
+                marked_by=user.id, marked_at=datetime.now(UTC),
+            ))
+        for k in range(subjects):
+            cs = ClassSubject(class_id=cls.id, subject_name=f"Subject {k}", subject_code=f"S{k}")
+            session.add(cs)
+            await session.flush()
+            session.add(SubjectTeacher(
+                class_subject_id=cs.id, staff_member_id=staff.id, academic_year_id=year.id,
+            ))
+            if k == 0:
+                session.add(StudentSubjectRegistration(
+                    student_term_enrollment_id=ste.id, class_subject_id=cs.id,
+                ))
+    await session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_teacher_classes_query_count_is_constant(
+    client: AsyncClient, session: AsyncSession, count_queries, test_school: School,
+    school_term, bearer,
+) -> None:
+    year, term, cal = school_term.year, school_term.term, school_term.calendar
+    small = await _seed_class_teacher(
+        session, test_school, year, term, cal, name="Esi", classes=1, subjects=1,
+    )
+    large = await _seed_class_teacher(
+        session, test_school, year, term, cal, name="Kojo", classes=3, subjects=4,
+    )
+    # Warm the calendar cache so both measured requests take the same path
+    await client.get("/api/v1/dashboard/summary", headers=bearer(small))
+
+    with count_queries() as small_statements:
+        r = await client.get("/api/v1/dashboard/summary", headers=bearer(small))
+        assert r.status_code == 200, r.text
+    with count_queries() as large_statements:
+        r = await client.get("/api/v1/dashboard/summary", headers=bearer(large))
+        assert r.status_code == 200, r.text
+    assert len(large_statements) == len(small_statements), large_statements
+
+    body = r.json()
+    assert body["role"] == "class_teacher"
+    classes = body["my_classes"]
+    assert [c["attendance_today"] for c in classes] == ["marked", "not_marked", "not_marked"]
+    assert all(len(c["subjects"]) == 4 for c in classes)
+    subject_0 = next(s for s in classes[0]["subjects"] if s["subject_code"] == "S0")
+    assert (subject_0["registered_count"], subject_0["total_students"]) == (1, 1)
+
+
+# ── Precomputed tiles ──────────────────────────────────────────────────────────
+
+_STATS = {
+    "staff_total": 9, "staff_no_account": 0, "classes_total": 4, "classes_no_teacher": 0,
+    "students_total": 120, "attendance_submitted_today": 3, "attendance_classes_today": 4,
+}
+
+
+def _tile(age: float, day: date = TODAY) -> str:
+    return json.dumps({"at": time.time() - age, "date": day.isoformat(), "data": _STATS})
+
+
+@pytest.mark.asyncio
+async def test_fresh_tile_served_without_queries(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+) -> None:
+    mock_redis.hget.return_value = _tile(age=5)
+    with count_queries() as statements:
+        assert await get_admin_tile(test_school.id, mock_redis, session) == _STATS
+    assert statements == []
+    mock_redis.sadd.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stale_tile_served_and_queued(
+    session: AsyncSession, mock_redis: AsyncMock, count_queries, test_school: School,
+) -> None:
+    mock_redis.hget.return_value = _tile(age=900)
+    with count_queries() as statements:
+        assert await get_admin_tile(test_school.id, mock_redis, session) == _STATS
+    assert statements == []
+    mock_redis.sadd.assert_awaited_once_with("dash:dirty", f"{test_school.id}:admin")
+
+
+@pytest.mark.asyncio
+async def test_tile_with_undrained_write_is_recomputed(
+    session: AsyncSession, mock_redis: AsyncMock, test_school: School, school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+    mock_redis.hget.return_value = _tile(age=5)
+    mock_redis.smismember.return_value = [1]
+    stats = await get_admin_tile(test_school.id, mock_redis, session)
+    assert stats["students_total"] == 3
+    assert stats["attendance_submitted_today"] == 1
+    mock_redis.smismember.assert_awaited_once_with("dash:dirty", [f"{test_school.id}:admin"])
+    mock_redis.setex.assert_awaited()  # through get_admin_stats' short-lived cache
+
+
+@pytest.mark.asyncio
+async def test_teacher_tile_checks_its_classes_for_queued_writes(
+    session: AsyncSession, mock_redis: AsyncMock, test_school: School, school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+    class_teacher = await session.scalar(select(ClassTeacher))
+    tile = {
+        "classes": [{"id": str(class_teacher.class_id), "attendance_today": "not_marked"}],
+        "is_class_teacher": True,
+    }
+    mock_redis.hget.return_value = json.dumps(
+        {"at": time.time() - 5, "date": TODAY.isoformat(), "data": tile}
+    )
+    mock_redis.smismember.return_value = [0, 1]
+    classes, _ = await get_teacher_tile(
+        class_teacher.staff_member_id, test_school.id, mock_redis, session,
+    )
+    assert [c["attendance_today"] for c in classes] == ["marked"]
+    mock_redis.smismember.assert_awaited_once_with("dash:dirty", [
+        f"{test_school.id}:teacher:{class_teacher.staff_member_id}",
+        f"{test_school.id}:class:{class_teacher.class_id}",
+    ])
+
+
+@pytest.mark.asyncio
+async def test_tile_from_another_day_is_recomputed(
+    session: AsyncSession, mock_redis: AsyncMock, test_school: School,
+) -> None:
+    mock_redis.hget.return_value = _tile(age=5, day=TODAY - timedelta(days=1))
+    stats = await get_admin_tile(test_school.id, mock_redis, session)
+    assert stats["students_total"] == 0
+    field = mock_redis.hset.await_args_list[-1].args[1]
+    assert field == "admin"
+
+
+@pytest.mark.asyncio
+async def test_class_teacher_assignment_queues_recompute(
+    client: AsyncClient, session: AsyncSession, mock_redis: AsyncMock,
+    admin_user_all_perms: User, test_school: School, bearer, school_term,
+) -> None:
+    staff = StaffMember(
+        school_id=test_school.id, first_name="Ama", last_name="Owusu", category="TEACHING",
+    )
+    cls = Class(
+        school_id=test_school.id, education_level="BASIC", level="Basic", year=4, stream="A",
+    )
+    session.add_all([staff, cls])
+    await session.commit()
+
+    r = await client.put(
+        f"/api/v1/settings/classes/{cls.id}/teacher",
+        json={"staff_member_id": str(staff.id)},
+        headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+    mock_redis.sadd.assert_any_await(
+        "dash:dirty", f"{test_school.id}:admin", f"{test_school.id}:teacher:{staff.id}",
+    )
+
+
+@pytest.mark.asyncio
+async def test_class_target_rebuilds_its_teachers_tiles(
+    session: AsyncSession, mock_redis: AsyncMock, test_school: School, school_term,
+) -> None:
+    await _seed_school_day(session, test_school, school_term)
+    class_teacher = await session.scalar(select(ClassTeacher))
+
+    count = await recompute_tiles(
+        test_school.id, {f"class:{class_teacher.class_id}"}, mock_redis, session,
+    )
+    assert count == 2
+    written = {call.args[1]: json.loads(call.args[2]) for call in mock_redis.hset.await_args_list}
+    assert written["admin"]["data"]["attendance_submitted_today"] == 1
+    teacher = written[f"teacher:{class_teacher.staff_member_id}"]["data"]
+    assert teacher["is_class_teacher"] is True
+    assert [c["attendance_today"] for c in teacher["classes"]] == ["marked"]
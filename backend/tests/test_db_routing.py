@@ -0,0 +1,201 @@
+"""
+Read-replica routing tests.
+
+Coverage:
+  1. GET sessions are pinned to replicas round-robin; other methods, and a
+     user with a recent-write marker, stay on the primary.
+  2. Inside a replica session, DML, text() statements, SELECT … FOR UPDATE and
+     anything after a write go to the primary.
+  3. A commit that wrote sets the read-your-writes marker; read-only commits don't.
+  4. Redis failures fall back to the primary.
+  5. set_rls_context inside an open transaction reaches both the primary and
+     the replica connection.
+  6. With TEST_DATABASE_REPLICA_URL set (a second local Postgres carrying the
+     same schema), the RLS context is applied on the replica connection too.
+"""
+import itertools
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import func, insert, select, text, union
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core import db
+from app.core.config import settings
+from app.core.db import RoutingAsyncSession, RoutingSession, route_session, set_rls_context
+from app.models.school import School
+
+_REPLICA_URL = os.environ.get("TEST_DATABASE_REPLICA_URL")
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    engines = [
+        create_async_engine(settings.DATABASE_URL, poolclass=NullPool),
+        create_async_engine(settings.DATABASE_URL, poolclass=NullPool),
+    ]
+    monkeypatch.setattr(db, "replica_engines", engines)
+    monkeypatch.setattr(db, "_next_replica", itertools.cycle(engines))
+    return engines
+
+
+@pytest.fixture
+def primary():
+    return create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+
+
+def _factory(primary):
+    return async_sessionmaker(
+        primary, class_=RoutingAsyncSession, sync_session_class=RoutingSession,
+        expire_on_commit=False,
+    )
+
+
+def _redis(marker: bool = False) -> AsyncMock:
+    redis = AsyncMock()
+    redis.exists.return_value = 1 if marker else 0
+    return redis
+
+
+# ── Session pinning ───────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_get_sessions_rotate_over_replicas(replicas, primary) -> None:
+    factory = _factory(primary)
+    bound = []
+    for _ in range(3):
+        async with factory() as session:
+            await route_session(session, "GET", {"sub": "u1"}, _redis())
+            bound.append(session.sync_session.get_bind(clause=select(School)))
+    assert bound == [replicas[0].sync_engine, replicas[1].sync_engine, replicas[0].sync_engine]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["POST", "PATCH", "PUT", "DELETE"])
+async def test_unsafe_methods_use_primary(replicas, primary, method: str) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, method, {"sub": "u1"}, _redis())
+        assert session.sync_session.get_bind(clause=select(School)) is primary.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_recent_write_marker_uses_primary(replicas, primary) -> None:
+    redis = _redis(marker=True)
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, redis)
+        assert session.sync_session.get_bind(clause=select(School)) is primary.sync_engine
+    redis.exists.assert_awaited_once_with("db:rw:u1")
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_uses_primary(replicas, primary) -> None:
+    redis = _redis()
+    redis.exists.side_effect = ConnectionError("down")
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, redis)
+        assert session.sync_session.get_bind(clause=select(School)) is primary.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_no_replicas_configured_uses_primary(primary) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, _redis())
+        assert "replica" not in session.info
+        assert session.sync_session.get_bind(clause=select(School)) is primary.sync_engine
+
+
+# ── Writes inside a replica session ───────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_dml_and_later_reads_go_to_primary(replicas, primary) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, _redis())
+        sync = session.sync_session
+        assert sync.get_bind(clause=insert(School)) is primary.sync_engine
+        assert sync.get_bind(clause=select(School)) is replicas[0].sync_engine
+        sync.info["wrote"] = True
+        assert sync.get_bind(clause=select(School)) is primary.sync_engine
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("statement", [
+    text("UPDATE school SET name = 'x'"),
+    text("INSERT INTO school (name) VALUES ('x')"),
+    text("SELECT 1"),
+])
+async def test_text_statements_go_to_primary(replicas, primary, statement) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, _redis())
+        assert session.sync_session.get_bind(clause=statement) is primary.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_locking_reads_go_to_primary(replicas, primary) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, _redis())
+        sync = session.sync_session
+        locking = select(School).with_for_update()
+        shared = select(School).with_for_update(read=True)
+        both = union(select(School.id), select(School.id))
+        assert sync.get_bind(clause=locking) is primary.sync_engine
+        assert sync.get_bind(clause=shared) is primary.sync_engine
+        assert sync.get_bind(clause=both) is replicas[0].sync_engine
+        assert sync.get_bind() is primary.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_commit_after_write_sets_marker(replicas, primary, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 7)
+    redis = _redis()
+    async with _factory(primary)() as session:
+        await route_session(session, "POST", {"sub": "u1"}, redis)
+        session.info["unmarked_write"] = True
+        await session.commit()
+        await session.commit()
+    redis.set.assert_awaited_once_with("db:rw:u1", "1", ex=7)
+
+
+@pytest.mark.asyncio
+async def test_read_only_commit_sets_no_marker(replicas, primary) -> None:
+    redis = _redis()
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", {"sub": "u1"}, redis)
+        await session.commit()
+    redis.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rls_context_reaches_every_open_connection(
+    replicas, primary, test_school: School,
+) -> None:
+    async with _factory(primary)() as session:
+        await route_session(session, "GET", None, _redis())
+        await session.execute(text("SELECT 1"))        # opens the primary
+        await session.execute(select(School.id))       # opens the replica
+        await set_rls_context(session, str(test_school.id))
+        on_primary = await session.scalar(text("SELECT current_setting('app.school_id', true)"))
+        on_replica = await session.scalar(select(func.current_setting("app.school_id", True)))
+    assert on_primary == on_replica == str(test_school.id)
+
+
+# ── Two local Postgres instances ──────────────────────────────────────────────
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not _REPLICA_URL, reason="TEST_DATABASE_REPLICA_URL not set")
+async def test_rls_context_applies_on_replica(primary, monkeypatch, test_school: School) -> None:
+    replica = create_async_engine(_REPLICA_URL, poolclass=NullPool)
+    monkeypatch.setattr(db, "replica_engines", [replica])
+    monkeypatch.setattr(db, "_next_replica", itertools.cycle([replica]))
+    try:
+        async with _factory(primary)() as session:
+            await route_session(session, "GET", None, _redis())
+            await set_rls_context(session, str(test_school.id))
+            setting = await session.scalar(select(func.current_setting("app.school_id", True)))
+            port = await session.scalar(select(func.inet_server_port()))
+            assert setting == str(test_school.id)
+            assert port == (replica.url.port or 5432)
+    finally:
+        await replica.dispose()
+        await primary.dispose()
@@ -28,3 +28,25 @@ async def test_health_db_component(client: AsyncClient) -> None:
     db = data["components"]["database"]
     assert isinstance(db["ok"], bool)
     assert "latency_ms" in db
+
+
+@pytest.mark.asyncio
+async def test_ping_carries_request_id(client: AsyncClient) -> None:
+    response = await client.get("/api/v1/health/ping")
+    assert len(response.headers["X-Request-ID"]) == 36
+
+
+@pytest.mark.asyncio
+async def test_incoming_request_id_is_kept(client: AsyncClient) -> None:
+    response = await client.get("/api/v1/health/ping", headers={"X-Request-ID": "edge-1234"})
+    assert response.headers["X-Request-ID"] == "edge-1234"
+
+    response = await client.get("/api/v1/health/ping", headers={"X-Request-ID": "not a valid id"})
+    assert response.headers["X-Request-ID"] != "not a valid id"
+
+
+@pytest.mark.asyncio
+async def test_health_does_not_expose_internal_load(client: AsyncClient) -> None:
+    """Login queue depth belongs on the guarded /metrics endpoint, not the public probe."""
+    response = await client.get("/api/v1/health")
+    assert "password_hashing" not in response.json()
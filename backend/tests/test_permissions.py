@@ -1,15 +1,23 @@
 """
 Permission resolver unit tests.
-These test the 3-layer resolution logic in isolation — no HTTP calls needed.
+These test the 3-layer resolution logic in isolation — no HTTP calls needed,
+except for the token-mask checks at the end, which go through require().
 """
-import json
 from unittest.mock import AsyncMock
 
 import pytest
 import pytest_asyncio
+from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.permissions import Permission
+from app.core.permissions import (
+    PERMISSION_BITS,
+    PERMISSION_BITS_VERSION,
+    Permission,
+    mask_to_permissions,
+    permissions_to_mask,
+)
+from app.core.security import create_access_token
 from app.models.staff import PositionPermission, StaffPermission, StaffPosition
 from app.models.user import User
 from app.services.permissions import check_permission, resolve_all_permissions
@@ -40,9 +48,9 @@ async def test_parent_denied(mock_redis: AsyncMock, session: AsyncSession) -> No
 
 @pytest.mark.asyncio
 async def test_cache_hit(mock_redis: AsyncMock, session: AsyncSession, admin_user: User) -> None:
-    # Seed the cache with a pre-built permission map
-    cached_perms = {p: True for p in [str(Permission.VIEW_STUDENTS)]}
-    mock_redis.get.return_value = json.dumps(cached_perms)
+    # Seed the cache with a pre-built permission mask
+    mask = permissions_to_mask({str(Permission.VIEW_STUDENTS): True})
+    mock_redis.get.return_value = f"{PERMISSION_BITS_VERSION}:{mask}"
 
     result = await resolve_all_permissions(admin_user, mock_redis, session)
     assert result.get(str(Permission.VIEW_STUDENTS)) is True
@@ -124,3 +132,118 @@ async def test_personal_override_beats_position(
     assert result[str(Permission.ENTER_SCORES)] is False, (
         "Personal override (False) must beat position template (True)"
     )
+
+
+# ── Bitmask encoding and token claims ──────────────────────────────────────────
+
+def test_permission_bits_cover_every_permission_once() -> None:
+    assert sorted(PERMISSION_BITS) == sorted(Permission)
+    everything = {p.value: True for p in Permission}
+    assert mask_to_permissions(permissions_to_mask(everything)) == everything
+    one = {p.value: p is Permission.MANAGE_USERS for p in Permission}
+    assert mask_to_permissions(permissions_to_mask(one)) == one
+
+
+def _bearer_with_mask(user: User, granted: list[Permission], version: int = 0) -> dict[str, str]:
+    claims = {
+        "perms": permissions_to_mask({p.value: True for p in granted}),
+        "pbv": PERMISSION_BITS_VERSION,
+        "pv": version,
+    }
+    token = create_access_token(str(user.id), str(user.school_id), user.system_role, claims)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_require_answers_from_current_token_mask(
+    client: AsyncClient, mock_redis: AsyncMock, admin_user: User
+) -> None:
+    """admin_user has no permissions in the DB — only the token grants VIEW_STAFF."""
+    r = await client.get("/api/v1/staff", headers=_bearer_with_mask(admin_user, [Permission.VIEW_STAFF]))
+    assert r.status_code == 200
+    assert not any(
+        call.args[0].startswith("perm:") and not call.args[0].startswith("perm:gen:")
+        for call in mock_redis.get.await_args_list
+    ), "a current token mask must not trigger a Redis/DB resolve"
+
+
+@pytest.mark.asyncio
+async def test_require_ignores_token_mask_after_version_moves(
+    client: AsyncClient, mock_redis: AsyncMock, admin_user: User
+) -> None:
+    mock_redis.get.side_effect = lambda key: "1" if key.startswith("perm:gen:") else None
+
+    r = await client.get("/api/v1/staff", headers=_bearer_with_mask(admin_user, [Permission.VIEW_STAFF]))
+    assert r.status_code == 403, "stale token mask must fall back to the DB, which denies"
+
+
+# ── School generation ──────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_cache_key_is_namespaced_by_school_generation(
+    mock_redis: AsyncMock, session: AsyncSession, admin_user: User
+) -> None:
+    mock_redis.get.side_effect = lambda key: "7" if key.startswith("perm:gen:") else None
+
+    await resolve_all_permissions(admin_user, mock_redis, session)
+
+    key = mock_redis.setex.await_args.args[0]
+    assert key == f"perm:{admin_user.school_id}:7:{admin_user.id}"
+
+
+@pytest.mark.asyncio
+async def test_position_edit_moves_school_generation(
+    client: AsyncClient, mock_redis: AsyncMock, admin_user_all_perms: User
+) -> None:
+    headers = {"Authorization": "Bearer " + create_access_token(
+        str(admin_user_all_perms.id), str(admin_user_all_perms.school_id), "SCHOOL_STAFF",
+    )}
+    created = await client.post("/api/v1/settings/positions", headers=headers, json={
+        "name": "Exams Officer", "code": "EXAMS", "permissions": [str(Permission.VIEW_SCORES)],
+    })
+    assert created.status_code == 201
+    mock_redis.incr.assert_not_awaited()
+
+    r = await client.patch(
+        f"/api/v1/settings/positions/{created.json()['id']}", headers=headers,
+        json={"permissions": [str(Permission.ENTER_SCORES)]},
+    )
+    assert r.status_code == 200
+    mock_redis.incr.assert_awaited_once_with(f"perm:gen:{admin_user_all_perms.school_id}")
+
+
+# ── Request-scoped memo ────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_guard_and_handler_share_one_permission_lookup(
+    client: AsyncClient, mock_redis: AsyncMock, admin_user_all_perms: User
+) -> None:
+    """require(VIEW_STUDENTS) and list_students both need the map — one lookup total."""
+    headers = {"Authorization": "Bearer " + create_access_token(
+        str(admin_user_all_perms.id), str(admin_user_all_perms.school_id), "SCHOOL_STAFF",
+    )}
+    r = await client.get("/api/v1/students", headers=headers)
+    assert r.status_code == 200
+
+    mask_reads = [
+        call.args[0] for call in mock_redis.get.await_args_list
+        if call.args[0].startswith("perm:") and not call.args[0].startswith("perm:gen:")
+    ]
+    assert len(mask_reads) == 1
+
+
+@pytest.mark.asyncio
+async def test_memo_is_not_shared_between_requests(
+    client: AsyncClient, mock_redis: AsyncMock, admin_user_all_perms: User
+) -> None:
+    headers = {"Authorization": "Bearer " + create_access_token(
+        str(admin_user_all_perms.id), str(admin_user_all_perms.school_id), "SCHOOL_STAFF",
+    )}
+    for _ in range(2):
+        assert (await client.get("/api/v1/students", headers=headers)).status_code == 200
+
+    mask_reads = [
+        call.args[0] for call in mock_redis.get.await_args_list
+        if call.args[0].startswith("perm:") and not call.args[0].startswith("perm:gen:")
+    ]
+    assert len(mask_reads) == 2
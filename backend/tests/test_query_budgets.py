@@ -0,0 +1,118 @@
+"""
+Query budgets for the hot read endpoints.
+
+Coverage:
+  - over_budget reports only the requests past their budget, with their
+    most repeated statement shapes
+  - Each endpoint below stays within a fixed statement budget for a class of
+    30 students — a per-row query loop would blow through it:
+    attendance register and term summary, dashboard summary, student list,
+    subject registration register
+  - Liveness probe runs no SQL at all
+"""
+from datetime import date
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.query_metrics import QueryStats
+from app.models.academic import ClassSubject
+from app.models.user import User
+from tests.query_budget import over_budget, query_budget
+
+TODAY = date.today()
+CLASS_SIZE = 30
+
+
+# ── Plugin ─────────────────────────────────────────────────────────────────────
+
+def test_over_budget_reports_offending_requests() -> None:
+    cheap = QueryStats(count=3)
+    loop = QueryStats(count=32)
+    loop.shapes.update({
+        "SELECT guardian.id FROM guardian WHERE guardian.student_id = ?": 30,
+        "SELECT ?": 2,
+    })
+    lines = over_budget([("/cheap", cheap), ("/loop", loop)], budget=10)
+    assert len(lines) == 1
+    assert lines[0].startswith("/loop: 32 statements (budget 10) — 30x SELECT guardian.id")
+
+
+@pytest.mark.asyncio
+@query_budget(0)
+async def test_ping_runs_no_sql(client: AsyncClient) -> None:
+    assert (await client.get("/api/v1/health/ping")).status_code == 200
+
+
+# ── Endpoints ──────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+@query_budget(15)
+async def test_attendance_register_budget(
+    client: AsyncClient, admin_user_all_perms: User, seeded_class, bearer,
+) -> None:
+    cls, enrollments = await seeded_class(CLASS_SIZE)
+    headers = bearer(admin_user_all_perms)
+    body = {
+        "class_id": str(cls.id),
+        "date": TODAY.isoformat(),
+        "records": [{"term_enrollment_id": str(e.id), "status": "PRESENT"} for e in enrollments],
+    }
+    r = await client.post("/api/v1/attendance/register", json=body, headers=headers)
+    assert r.status_code == 200, r.text
+    r = await client.get(
+        f"/api/v1/attendance/register?class_id={cls.id}&target_date={TODAY}", headers=headers,
+    )
+    assert r.status_code == 200, r.text
+
+
+@pytest.mark.asyncio
+@query_budget(15)
+async def test_attendance_summary_budget(
+    client: AsyncClient, admin_user_all_perms: User, seeded_class, bearer,
+) -> None:
+    cls, _ = await seeded_class(CLASS_SIZE)
+    r = await client.get(
+        f"/api/v1/attendance/summary?class_id={cls.id}", headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+    assert len(r.json()["students"]) == CLASS_SIZE
+
+
+@pytest.mark.asyncio
+@query_budget(15)
+async def test_dashboard_summary_budget(
+    client: AsyncClient, admin_user_all_perms: User, seeded_class, bearer,
+) -> None:
+    await seeded_class(CLASS_SIZE)
+    r = await client.get("/api/v1/dashboard/summary", headers=bearer(admin_user_all_perms))
+    assert r.status_code == 200, r.text
+
+
+@pytest.mark.asyncio
+@query_budget(15)
+async def test_student_list_budget(
+    client: AsyncClient, admin_user_all_perms: User, seeded_class, bearer,
+) -> None:
+    await seeded_class(CLASS_SIZE)
+    r = await client.get("/api/v1/students?limit=50", headers=bearer(admin_user_all_perms))
+    assert r.status_code == 200, r.text
+    assert r.json()["total"] == CLASS_SIZE
+
+
+@pytest.mark.asyncio
+@query_budget(15)
+async def test_subject_register_budget(
+    client: AsyncClient, session: AsyncSession, admin_user_all_perms: User, seeded_class,
+    bearer,
+) -> None:
+    cls, _ = await seeded_class(CLASS_SIZE)
+    cs = ClassSubject(class_id=cls.id, subject_name="Mathematics", subject_code="MATH")
+    session.add(cs)
+    await session.commit()
+    r = await client.get(
+        f"/api/v1/subject-registration/{cs.id}", headers=bearer(admin_user_all_perms),
+    )
+    assert r.status_code == 200, r.text
+    assert len(r.json()["students"]) == CLASS_SIZE
@@ -0,0 +1,132 @@
+"""
+Per-request SQL metrics tests.
+
+Coverage:
+  1. Fingerprints collapse parameters, literals and expanded IN lists.
+  2. Histograms render cumulative Prometheus buckets.
+  3. Responses carry X-DB-* headers outside production, none in production.
+  4. A statement shape repeated past N_PLUS_ONE_THRESHOLD logs a warning.
+  5. /metrics exposes per-route histograms and the password-hash queue, and
+     honours METRICS_TOKEN.
+"""
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.query_metrics import Histogram, QueryStats, fingerprint
+from app.models.user import User
+
+
+# ── Fingerprints and histograms ───────────────────────────────────────────────
+
+def test_fingerprint_normalises_parameters() -> None:
+    a = fingerprint("SELECT student.id FROM student\n  WHERE student.class_id = $1 AND age > 12")
+    b = fingerprint("SELECT student.id FROM student WHERE student.class_id = $7 AND age > 15")
+    assert a == b == "SELECT student.id FROM student WHERE student.class_id = ? AND age > ?"
+
+
+def test_fingerprint_collapses_in_lists_and_keeps_casts() -> None:
+    a = fingerprint("SELECT 1 FROM t WHERE t.id IN ($1, $2, $3) AND t.name = 'x'")
+    b = fingerprint("SELECT 1 FROM t WHERE t.id IN ($1::UUID) AND t.name = 'it''s'")
+    assert a == "SELECT ? FROM t WHERE t.id IN (?) AND t.name = ?"
+    assert b == "SELECT ? FROM t WHERE t.id IN (?::UUID) AND t.name = ?"
+
+
+def test_query_stats_repeated() -> None:
+    stats = QueryStats()
+    stats.shapes.update({"a": 12, "b": 3, "c": 11})
+    assert stats.repeated(10) == [("a", 12), ("c", 11)]
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    h = Histogram("db_queries", "Queries.", "route", (1, 5))
+    for value in (1, 3, 9):
+        h.observe("/x", value)
+    assert h.render() == [
+        "# HELP db_queries Queries.",
+        "# TYPE db_queries histogram",
+        'db_queries_bucket{route="/x",le="1"} 1',
+        'db_queries_bucket{route="/x",le="5"} 2',
+        'db_queries_bucket{route="/x",le="+Inf"} 3',
+        'db_queries_sum{route="/x"} 13',
+        'db_queries_count{route="/x"} 3',
+    ]
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_response_carries_query_headers(
+    client: AsyncClient, admin_user: User, bearer
+) -> None:
+    r = await client.get("/api/v1/settings/school", headers=bearer(admin_user))
+    assert r.status_code == 200
+    assert int(r.headers["X-DB-Query-Count"]) >= 1
+    assert float(r.headers["X-DB-Time-Ms"]) > 0
+    assert int(r.headers["X-DB-Repeated-Max"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_no_query_headers_in_production(
+    client: AsyncClient, admin_user: User, monkeypatch, bearer
+) -> None:
+    monkeypatch.setattr(settings, "APP_ENV", "production")
+    r = await client.get("/api/v1/settings/school", headers=bearer(admin_user))
+    assert r.status_code == 200
+    assert "X-DB-Query-Count" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_logs_warning(
+    client: AsyncClient, admin_user: User, monkeypatch, caplog, bearer
+) -> None:
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 0)
+    with caplog.at_level(logging.WARNING, logger="app.core.middleware"):
+        await client.get("/api/v1/settings/school", headers=bearer(admin_user))
+    assert "Possible N+1: GET /api/v1/settings/school" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_no_warning_under_threshold(
+    client: AsyncClient, admin_user: User, caplog, bearer
+) -> None:
+    with caplog.at_level(logging.WARNING, logger="app.core.middleware"):
+        await client.get("/api/v1/settings/school", headers=bearer(admin_user))
+    assert "Possible N+1" not in caplog.text
+
+
+# ── /metrics ──────────────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_metrics_exposes_route_histograms(
+    client: AsyncClient, admin_user: User, bearer
+) -> None:
+    await client.get("/api/v1/settings/school", headers=bearer(admin_user))
+    r = await client.get("/api/v1/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'http_request_db_queries_count{route="/api/v1/settings/school"}' in r.text
+    assert "# TYPE http_request_db_seconds histogram" in r.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_exposes_password_hash_queue(client: AsyncClient) -> None:
+    r = await client.get("/api/v1/metrics")
+    assert "password_hash_calls " in r.text
+    assert "# TYPE password_hash_waiting gauge" in r.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_requires_token_when_set(client: AsyncClient, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert (await client.get("/api/v1/metrics")).status_code == 401
+    r = await client.get("/api/v1/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_metrics_hidden_in_production_without_token(client: AsyncClient, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "APP_ENV", "production")
+    assert (await client.get("/api/v1/metrics")).status_code == 404
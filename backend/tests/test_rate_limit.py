@@ -0,0 +1,92 @@
+"""
+Token-bucket rate limiter (app.core.rate_limit) against mock Redis.
+
+Coverage:
+  - Allowed hit: one EVALSHA, RateLimit-* headers
+  - Denied hit: Retry-After, and repeat hits are refused without Redis
+  - NOSCRIPT falls back to EVAL once
+  - Middleware: 429 short-circuits the route; allowed responses carry headers
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from redis.exceptions import NoScriptError
+
+from app.core import rate_limit
+
+
+@pytest.mark.asyncio
+async def test_allowed_hit_is_one_round_trip(mock_redis: AsyncMock) -> None:
+    mock_redis.evalsha.return_value = [1, 299, 0, 200]
+
+    decision = await rate_limit.hit(mock_redis, "ratelimit:u:abc", 300)
+
+    assert decision.allowed
+    mock_redis.evalsha.assert_awaited_once()
+    mock_redis.incr.assert_not_awaited()
+    assert decision.headers() == {
+        "RateLimit-Limit": "300",
+        "RateLimit-Remaining": "299",
+        "RateLimit-Reset": "1",
+        "RateLimit-Policy": "300;w=60",
+    }
+
+
+@pytest.mark.asyncio
+async def test_denied_key_is_refused_locally(mock_redis: AsyncMock) -> None:
+    mock_redis.evalsha.return_value = [0, 0, 1500, 60000]
+
+    first = await rate_limit.hit(mock_redis, "ratelimit:ip:10.0.0.1", 30)
+    assert not first.allowed
+    assert first.headers()["Retry-After"] == "2"
+
+    for _ in range(50):
+        again = await rate_limit.hit(mock_redis, "ratelimit:ip:10.0.0.1", 30)
+        assert not again.allowed
+    assert mock_redis.evalsha.await_count == 1, "hot abusers must not reach Redis"
+
+    mock_redis.evalsha.return_value = [1, 29, 0, 2000]
+    other = await rate_limit.hit(mock_redis, "ratelimit:ip:10.0.0.2", 30)
+    assert other.allowed
+
+
+@pytest.mark.asyncio
+async def test_noscript_falls_back_to_eval(mock_redis: AsyncMock) -> None:
+    mock_redis.evalsha.side_effect = NoScriptError("NOSCRIPT")
+    mock_redis.eval.return_value = [1, 9, 0, 6000]
+
+    decision = await rate_limit.hit(mock_redis, "ratelimit:u:xyz", 10)
+
+    assert decision.allowed
+    assert decision.remaining == 9
+    mock_redis.eval.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_429(
+    client: AsyncClient, mock_redis: AsyncMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("app.core.redis.get_redis", lambda: mock_redis)
+    mock_redis.evalsha.return_value = [0, 0, 30000, 60000]
+
+    r = await client.post("/api/v1/auth/login", json={"email": "a@b.co", "password": "x"})
+
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "30"
+    assert r.headers["RateLimit-Remaining"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_middleware_adds_headers_to_allowed_response(
+    client: AsyncClient, mock_redis: AsyncMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("app.core.redis.get_redis", lambda: mock_redis)
+    mock_redis.evalsha.return_value = [1, 29, 0, 2000]
+
+    r = await client.post("/api/v1/auth/login", json={"email": "a@b.co", "password": "x"})
+
+    assert r.status_code == 401
+    assert r.headers["RateLimit-Limit"] == "30"
+    assert r.headers["RateLimit-Remaining"] == "29"
+    assert "X-Request-ID" in r.headers
@@ -7,12 +7,16 @@ What we test here:
   2. SUPERADMIN is exempt from the guard even with school_id=None.
   3. A user's token cannot be used to access another school's settings.
   4. Token type confusion — refresh tokens rejected as access tokens.
+  5. Lazy RLS context — set_rls_context defers set_config to the next
+     transaction and re-applies it after every commit.
 """
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.db import set_rls_context
 from app.core.security import create_access_token, create_refresh_token, hash_password
 from app.models.school import School, SchoolSchedule
 from app.models.user import User
@@ -177,3 +181,31 @@ async def test_inactive_user_token_rejected(
         headers={"Authorization": f"Bearer {token}"},
     )
     assert r.status_code == 401
+
+
+# ── Lazy RLS context ───────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_rls_context_is_applied_lazily_per_transaction(
+    session: AsyncSession, db_engine, test_school: School
+) -> None:
+    await session.commit()  # close the fixture's transaction
+    connects: list[object] = []
+
+    def on_connect(*args: object) -> None:
+        connects.append(args)
+
+    event.listen(db_engine.sync_engine, "connect", on_connect)
+    try:
+        await set_rls_context(session, str(test_school.id))
+        assert not session.in_transaction()
+        assert connects == [], "recording the context must not touch the database"
+
+        current = text("SELECT current_setting('app.school_id', true)")
+        assert await session.scalar(current) == str(test_school.id)
+        await session.commit()
+        assert await session.scalar(current) == str(test_school.id), (
+            "context must survive a commit"
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "connect", on_connect)